@@ -1,11 +1,28 @@
 import sys
 import os
-import subprocess
+import argparse
 
-def process_directory(directory):
+from videoToAudio import batchProcess, checkVariables, dedupIndex, fileAnalyzeConvert, instrumentation, loudnessAnalysis, mediaProbe, outputProfiles, pipeline, remoteInput, trackSelection, verifyFileExtension, watchFolder
+
+def process_directory(directory, args):
     print(f"Directory '{directory}' is being processed.")
-    # Process the directory (this can be extended with more logic)
-    
+    # Check the tools once, then convert every video file with a pool of workers
+    run_check_variables(args)
+    failed = batchProcess.process_directory(directory, workers=args.workers, max_encodes=args.max_encodes,
+                                            output_root=args.output_dir, options=build_convert_options(args),
+                                            metrics_jsonl=args.metrics_jsonl, metrics_prometheus=args.metrics_prometheus)
+    if failed:
+        print(f"{len(failed)} file(s) could not be processed.")
+        sys.exit(1)
+
+def watch_directory(directory, args):
+    # Check the tools once, then keep converting files as they arrive until interrupted
+    run_check_variables(args)
+    watchFolder.watch_directory(directory, workers=args.workers, max_encodes=args.max_encodes,
+                                output_root=args.output_dir, options=build_convert_options(args),
+                                settle_seconds=args.settle_seconds, poll_interval=args.poll_interval,
+                                use_inotify=not args.no_inotify, metrics_jsonl=args.metrics_jsonl)
+
 def show_readme():
     readme_path = "videoToAudio/readme.txt"
     if os.path.exists(readme_path):
@@ -15,45 +32,97 @@ def show_readme():
     else:
         print(f"Readme file not found at {readme_path}")
 
-def run_check_variables():
-    # Command words to be checked (ffmpeg, etc.)
-    command_words = ["ffmpeg", "ffprobe", "mkvextract", "mkvmerge", "magick", "mediainfo", "tone"]  # You can customize this list as needed
-
-    # Launch the checkVariables.py script and pass the command words
-    result = subprocess.run([sys.executable, "videoToAudio/checkVariables.py"] + command_words)
-    if result.returncode != 0:
-        print("Missing environment variables or shell commands. Exiting.")
-        sys.exit(1)
+def run_check_variables(args):
+    # Check the command words (ffmpeg and the probe program) in-process, exits when one is missing
+    checkVariables.check_env_and_shell(pipeline.required_commands(args.probe_backend))
 
 def verify_file_extension(file_path):
-    # Launch the verifyFileExtension.py script with the file path
-    result = subprocess.run([sys.executable, "videoToAudio/verifyFileExtension.py", file_path])
-    if result.returncode != 0:
+    # Verify the file extension in-process
+    if not verifyFileExtension.is_video_file(file_path):
         print("File is not a valid video file. Exiting.")
         sys.exit(1)
 
-def analyze_and_convert(file_path):
-    # Launch the fileAnalyzeConvert.py script with the file path
-    result = subprocess.run([sys.executable, "videoToAudio/fileAnalyzeConvert.py", file_path])
-    if result.returncode != 0:
+def build_convert_options(args):
+    # Conversion options shared by single-file and directory mode, tools and extensions are checked by main()
+    return pipeline.ConvertOptions(audio_policy=args.audio_policy, check_tools=False, verify_extension=False,
+                                   use_probe_cache=not args.no_probe_cache, probe_backend=args.probe_backend,
+                                   dump_probe_json=args.dump_probe_json, keep_subtitles=args.keep_subtitles,
+                                   use_journal=not args.no_journal, ffmpeg_timeout=args.ffmpeg_timeout,
+                                   audio_profiles=args.profiles, track_selection=trackSelection.policy_from_args(args),
+                                   dedup_mode=args.dedup, segment_encode=args.segment_encode,
+                                   spool_budget=args.spool_budget,
+                                   loudness=args.loudnorm or (loudnessAnalysis.LoudnessSettings() if args.analyze_audio else None))
+
+def analyze_and_convert(file_path, options, args):
+    result = pipeline.convert(file_path, options)
+    instrumentation.report([result], args.metrics_jsonl, args.metrics_prometheus)
+    if not result.success:
+        print(result.error)
         print("An error occurred during file analysis and conversion.")
         sys.exit(1)
 
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Extract audio, subtitles and cover images from video files.")
+    parser.add_argument("path", nargs="?", help="video file or directory of video files, or the http(s):// or s3:// URL of a video file")
+    parser.add_argument("--workers", type=int, default=batchProcess.DEFAULT_WORKERS,
+                        help="number of files processed in parallel in directory mode (default: CPU count)")
+    parser.add_argument("--max-encodes", type=int, default=batchProcess.DEFAULT_MAX_ENCODES,
+                        help="maximum number of FFmpeg runs at the same time in directory mode")
+    parser.add_argument("--output-dir", default=".",
+                        help="where directory mode writes its outputs, one folder per video")
+    parser.add_argument("--audio-policy", choices=fileAnalyzeConvert.AUDIO_POLICIES, default=fileAnalyzeConvert.DEFAULT_AUDIO_POLICY,
+                        help="'copy' remuxes AAC/Opus/MP3 tracks without re-encoding, 'mp3' always produces MP3")
+    parser.add_argument("--no-probe-cache", action="store_true", help="always probe the file, ignoring the probe cache")
+    parser.add_argument("--probe-backend", choices=mediaProbe.PROBE_BACKENDS, default=mediaProbe.DEFAULT_PROBE_BACKEND,
+                        help="how the tracks of each file are listed: native header reading (MediaInfo for other containers), mediainfo or ffprobe")
+    parser.add_argument("--dump-probe-json", action="store_true", help="save the raw probe JSON next to the outputs")
+    parser.add_argument("--keep-subtitles", action="store_true", help="also save subtitles that are converted to LRC")
+    parser.add_argument("--no-journal", action="store_true", help="redo every output, ignoring the job journal")
+    parser.add_argument("--ffmpeg-timeout", type=float, help="kill FFmpeg after this many seconds")
+    parser.add_argument("--profile", dest="profiles", action="append", type=outputProfiles.parse_profile,
+                        metavar="CODEC[:BITRATE[:RATE[:CHANNELS]]]",
+                        help="also encode every audio track to this profile, e.g. mp3:320k or opus:96k:48000:2 (repeatable)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and convert video files as they arrive in the directory")
+    parser.add_argument("--settle-seconds", type=float, default=watchFolder.DEFAULT_SETTLE_SECONDS,
+                        help="in watch mode, how long a file's size and mtime must stay unchanged before it is converted")
+    parser.add_argument("--poll-interval", type=float, default=watchFolder.DEFAULT_POLL_INTERVAL,
+                        help="in watch mode, seconds between checks of files still being written (and between rescans without inotify)")
+    parser.add_argument("--no-inotify", action="store_true", help="in watch mode, rescan the directory instead of using inotify")
+    trackSelection.add_selection_arguments(parser)
+    parser.add_argument("--dedup", choices=dedupIndex.DEDUP_MODES, default=dedupIndex.DEFAULT_DEDUP_MODE,
+                        help="reuse outputs of identical content by hard link or copy, or 'off'")
+    parser.add_argument("--segment-encode", action="store_true",
+                        help="encode long MP3 transcodes in time segments on every core, then join them gap-free")
+    parser.add_argument("--spool-budget", type=remoteInput.parse_size, default=remoteInput.DEFAULT_SPOOL_BUDGET, metavar="SIZE",
+                        help="disk space for local copies of remote files FFmpeg has to seek in, e.g. 20G")
+    parser.add_argument("--analyze-audio", action="store_true",
+                        help="measure the loudness, peaks and silences of every audio track during the extraction")
+    parser.add_argument("--loudnorm", nargs="?", const=loudnessAnalysis.LoudnessSettings(True), type=loudnessAnalysis.parse_loudnorm,
+                        metavar="LUFS[:DBTP]",
+                        help="encode the audio outputs as MP3 normalized to this integrated loudness and true peak, "
+                             "e.g. --loudnorm=-16:-1.5 (default EBU R128: -23:-1)")
+    parser.add_argument("--metrics-jsonl", help="append per-stage timing and resource metrics to this JSON lines file")
+    parser.add_argument("--metrics-prometheus", help="write stage metrics to this Prometheus textfile")
+    return parser.parse_args()
+
 def main():
-    if len(sys.argv) == 2:
-        path = sys.argv[1]
-        if os.path.isfile(path):
+    args = parse_arguments()
+    if args.path:
+        path = args.path
+        if os.path.isfile(path) or remoteInput.is_remote(path):
             print(f"File '{path}' is being processed.")
             # Run environment variable checks first
-            run_check_variables()
+            run_check_variables(args)
             # Then verify the file extension
             verify_file_extension(path)
             # Analyze the file and convert
-            analyze_and_convert(path)
+            analyze_and_convert(path, build_convert_options(args), args)
+        elif os.path.isdir(path) and args.watch:
+            watch_directory(path, args)
         elif os.path.isdir(path):
-            process_directory(path)
-            run_check_variables()
+            process_directory(path, args)
         else:
             print(f"'{path}' is neither a valid file nor a directory.")
     else:
@@ -0,0 +1,79 @@
+import os
+import re
+import threading
+import email.utils
+import http.server
+
+import pytest
+
+from videoToAudio import remoteInput
+
+class RangeHandler(http.server.SimpleHTTPRequestHandler):
+    # Static files with "Range: bytes=start-end" support and Last-Modified, like S3 or a CDN
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.translate_path(self.path.split("?")[0])
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        start, end, status = 0, size - 1, 200
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if match:
+            start, end, status = int(match.group(1)), min(int(match.group(2) or size - 1), size - 1), 206
+        self.server.requests.append((self.path, start, end))
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Last-Modified", email.utils.formatdate(os.path.getmtime(path), usegmt=True))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        with open(path, "rb") as served_file:
+            served_file.seek(start)
+            self.wfile.write(served_file.read(end - start + 1))
+
+class RangelessHandler(RangeHandler):
+    # A server that ignores Range: the whole file with status 200, of which only the first block is sent before it hangs up
+    def do_GET(self):
+        path = self.translate_path(self.path.split("?")[0])
+        self.server.requests.append((self.path, 0, os.path.getsize(path) - 1))
+        self.send_response(200)
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, "rb") as served_file:
+            self.wfile.write(served_file.read(remoteInput.READ_BLOCK))
+        self.close_connection = True
+
+def serve(tmp_path, handler_class):
+    # Serve tmp_path/"www" with handler_class, yields (directory, base URL, list of requests)
+    directory = tmp_path / "www"
+    directory.mkdir()
+    handler = lambda *args, **kwargs: handler_class(*args, directory=str(directory), **kwargs)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.requests = []  # (path, first byte, last byte) of every GET
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield directory, f"http://127.0.0.1:{server.server_address[1]}", server.requests
+    finally:
+        server.shutdown()
+        server.server_close()
+        remoteInput.remote_stats.clear()  # Sizes seen by this server must not leak into the next test
+
+@pytest.fixture
+def range_server(tmp_path):
+    """
+    HTTP server with range support serving tmp_path/"www", yields (directory, base URL, list of requests).
+    """
+    yield from serve(tmp_path, RangeHandler)
+
+@pytest.fixture
+def rangeless_server(tmp_path):
+    """
+    HTTP server that ignores Range requests, see range_server.
+    """
+    yield from serve(tmp_path, RangelessHandler)
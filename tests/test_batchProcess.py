@@ -0,0 +1,21 @@
+import os
+
+from videoToAudio import batchProcess
+
+def test_same_name_different_container_get_own_folders(tmp_path):
+    directory = str(tmp_path)
+    files = [os.path.join(directory, "show", name) for name in ("a.mkv", "a.mp4")]
+    output_dirs, clashes = batchProcess.assign_output_directories(files, directory, directory)
+    assert clashes == []
+    assert output_dirs == {files[0]: os.path.join(directory, "show", "a_mkv"),
+                           files[1]: os.path.join(directory, "show", "a_mp4")}
+    # Outputs written into the input tree never land on the input file itself
+    assert not set(output_dirs.values()) & set(files)
+
+def test_clashing_output_folder_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(batchProcess.os.path, "normcase", str.lower)  # A case-insensitive file system
+    directory = str(tmp_path)
+    files = [os.path.join(directory, "A.mkv"), os.path.join(directory, "a.mkv")]
+    output_dirs, clashes = batchProcess.assign_output_directories(files, directory, str(tmp_path / "out"))
+    assert list(output_dirs) == files[:1]
+    assert [file_path for file_path, error in clashes] == files[1:]
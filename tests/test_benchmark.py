@@ -0,0 +1,32 @@
+import io
+import os
+
+import pytest
+
+from videoToAudio import benchmark
+
+def test_planning_stages_over_the_fixtures():
+    fixtures = benchmark.load_fixtures()
+    assert [name for name, text in fixtures] == [f"sample{number}.json" for number in range(1, 7)]
+    results = benchmark.run_benchmark(fixtures, rounds=1, track_count=50, file_count=12)
+    assert set(results) == {"fixtures", "many_tracks", "many_files"}
+    for stages in results.values():
+        assert set(stages) == set(benchmark.STAGES) and all(seconds > 0 for seconds in stages.values())
+
+def test_scaled_fixture_keeps_numbering():
+    name, text = benchmark.load_fixtures()[1]
+    tracks = list(benchmark.iter_tracks(io.StringIO(benchmark.scale_fixture(text, 100))))
+    audio_orders = [int(track["@typeorder"]) for track in tracks if track["@type"] == "Audio"]
+    assert audio_orders == list(range(1, len(audio_orders) + 1))
+    assert len([track for track in tracks if track["@type"] in ("Audio", "Text")]) == 100
+
+def test_regressions_above_tolerance_and_noise():
+    baseline = {"fixtures": {"decode": 0.1, "parse": 0.001}}
+    results = {"fixtures": {"decode": 0.2, "parse": 0.0025, "plan": 1.0}}
+    # parse is 150% slower but only by 1.5 ms, plan has no baseline yet
+    assert benchmark.compare_with_baseline(results, baseline, 0.25) == ["fixtures/decode"]
+    assert benchmark.compare_with_baseline(results, baseline, 1.5) == []
+
+@pytest.mark.skipif(os.name == 'nt', reason="the fake tools are scripts")
+def test_end_to_end_writes_every_output():
+    assert benchmark.time_end_to_end(benchmark.load_fixtures(), 1) > 0
@@ -0,0 +1,60 @@
+import os
+import json
+
+import pytest
+
+from videoToAudio import checkVariables
+
+def make_tool(directory, name, version="1.0"):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, 'w') as tool_file:
+        tool_file.write(f"#!/bin/sh\necho '{name} version {version}'\n")
+    os.chmod(path, 0o755)
+    return path
+
+@pytest.fixture
+def tool_path(tmp_path, monkeypatch):
+    # Empty PATH and cache directory, the in-process cache starts over because PATH changed
+    monkeypatch.setenv(checkVariables.CACHE_DIR_VARIABLE, str(tmp_path / "cache"))
+    monkeypatch.setenv("PATH", os.pathsep.join([str(tmp_path / "first"), str(tmp_path / "missing"), str(tmp_path / "second")]))
+    return tmp_path
+
+@pytest.mark.skipif(os.name == 'nt', reason="shell script tools")
+def test_scan_path_takes_the_first_executable(tool_path):
+    first = make_tool(str(tool_path / "first"), "ffmpeg")
+    make_tool(str(tool_path / "second"), "ffmpeg")
+    mediainfo = make_tool(str(tool_path / "second"), "mediainfo")
+    os.chmod(make_tool(str(tool_path / "first"), "mediainfo"), 0o644)  # Not executable, skipped
+    assert checkVariables.scan_path(["ffmpeg", "mediainfo", "ffprobe"]) == {"ffmpeg": first, "mediainfo": mediainfo}
+
+@pytest.mark.skipif(os.name == 'nt', reason="shell script tools")
+def test_discovered_tools_are_cached_on_disk(tool_path, monkeypatch):
+    ffmpeg = make_tool(str(tool_path / "first"), "ffmpeg")
+    assert checkVariables.find_missing_commands(["ffmpeg", "ffprobe"]) == ["ffprobe"]
+    with open(tool_path / "cache" / checkVariables.TOOL_CACHE_FILENAME) as cache_file:
+        cached = json.load(cache_file)
+    assert cached["path"] == os.environ["PATH"]
+    assert cached["tools"]["ffmpeg"]["path"] == ffmpeg
+    assert cached["tools"]["ffmpeg"]["version"] == "ffmpeg version 1.0"
+
+    # A new process (empty in-process cache) trusts the file and neither scans PATH nor runs the tool
+    checkVariables.discovered_tools.clear()
+    monkeypatch.setattr(checkVariables, "scan_path", lambda commands: pytest.fail("PATH scanned again"))
+    assert checkVariables.tool_path("ffmpeg") == ffmpeg
+
+@pytest.mark.skipif(os.name == 'nt', reason="shell script tools")
+def test_replaced_tool_is_found_again(tool_path):
+    ffmpeg = make_tool(str(tool_path / "first"), "ffmpeg")
+    assert checkVariables.discover_tools(["ffmpeg"])["ffmpeg"].version == "ffmpeg version 1.0"
+    make_tool(str(tool_path / "first"), "ffmpeg", "2.0")
+    os.utime(ffmpeg, ns=(0, 1))  # Another modification time
+    checkVariables.discovered_tools.clear()
+    assert checkVariables.discover_tools(["ffmpeg"])["ffmpeg"].version == "ffmpeg version 2.0"
+
+def test_cache_of_another_path_is_ignored(tool_path):
+    os.makedirs(tool_path / "cache")
+    with open(tool_path / "cache" / checkVariables.TOOL_CACHE_FILENAME, 'w') as cache_file:
+        json.dump({"path": "/elsewhere", "tools": {"ffmpeg": {"path": "/elsewhere/ffmpeg", "mtime_ns": 0}}}, cache_file)
+    assert checkVariables.load_tool_cache(os.environ["PATH"]) == {}
+    assert checkVariables.find_missing_commands(["ffmpeg"]) == ["ffmpeg"]
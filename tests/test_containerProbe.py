@@ -0,0 +1,171 @@
+import os
+import glob
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from videoToAudio import containerProbe as cp
+from videoToAudio.containerProbe import compare_models, probe_native
+from videoToAudio.mediaInfoStream import iter_tracks
+from videoToAudio.mediaModel import LANGUAGE_ALIASES, parse_track_list
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = sorted(glob.glob(os.path.join(ROOT, "sample*.json")))
+ISO_639_2 = {short: long for long, short in LANGUAGE_ALIASES.items()}
+
+def load_golden(sample_path):
+    with open(sample_path, 'r', encoding='utf-8') as json_file:
+        return list(iter_tracks(json_file))
+
+# --- Matroska writer: the MediaInfo report of a sample written back as Matroska header elements ---
+
+def element(element_id, *children):
+    payload = b"".join(children)
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + b"\x01" + len(payload).to_bytes(7, "big") + payload
+
+def uint(element_id, value):
+    return element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+def string(element_id, value):
+    return element(element_id, value.encode("utf-8"))
+
+def float64(element_id, value):
+    return element(element_id, struct.pack(">d", value))
+
+def tag_time(seconds):
+    return f"{int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}:{seconds % 60:012.9f}"
+
+def simple_tag(name, value):
+    return element(cp.SIMPLE_TAG, string(cp.TAG_NAME, name), string(cp.TAG_STRING, value))
+
+def matroska_entry(uid, track):
+    track_type = {"Video": 1, "Audio": 2, "Text": 17}[track["@type"]]
+    children = [uint(cp.TRACK_UID, uid), uint(cp.TRACK_TYPE, track_type),
+                uint(cp.FLAG_DEFAULT, track.get("Default") == "Yes"), uint(cp.FLAG_FORCED, track.get("Forced") == "Yes"),
+                string(cp.TRACK_LANGUAGE, ISO_639_2.get(track.get("Language"), track.get("Language", "und")))]
+    if "Title" in track:
+        children.append(string(cp.TRACK_NAME, track["Title"]))
+    codec_id = track.get("CodecID", "V_VP9").split(" ")[0]
+    if track_type == 2:
+        sampling_rate, output_rate = float(track["SamplingRate"]), None
+        if codec_id.startswith("A_AAC-"):
+            # HE-AAC is stored as AAC LC at half the rate, with the output rate (SBR) doubled
+            if codec_id == "A_AAC-5":
+                sampling_rate, output_rate = sampling_rate / 2, sampling_rate
+            children.append(element(cp.CODEC_PRIVATE, bytes([2 << 3, 0x10])))
+            codec_id = "A_AAC"
+        audio = [float64(cp.SAMPLING_FREQUENCY, sampling_rate), uint(cp.CHANNELS, int(track["Channels"]))]
+        if output_rate:
+            audio.append(float64(cp.OUTPUT_SAMPLING_FREQUENCY, output_rate))
+        children.append(element(cp.AUDIO, *audio))
+    children.append(string(cp.CODEC_ID, codec_id))
+    return element(cp.TRACK_ENTRY, *children)
+
+def write_matroska(path, golden):
+    general, streams = golden[0], golden[1:]
+    info = element(cp.INFO, uint(cp.TIMESTAMP_SCALE, 1000000), float64(cp.SEGMENT_DURATION, float(general["Duration"]) * 1000),
+                   *([string(cp.SEGMENT_TITLE, general["Title"])] if "Title" in general else []))
+    tracks = element(cp.TRACKS, *(matroska_entry(uid, track) for uid, track in enumerate(streams, 1)))
+    tags = [element(cp.TAG, element(cp.TARGETS), *(simple_tag(name, value) for name, value in general.get("extra", {}).items()))]
+    for uid, track in enumerate(streams, 1):
+        statistics = [simple_tag("DURATION", tag_time(float(track["Duration"])))] if "Duration" in track else []
+        if "StreamSize" in track:
+            statistics += [simple_tag("NUMBER_OF_BYTES", track["StreamSize"]), simple_tag("BPS", track["BitRate"])]
+        if statistics:
+            tags.append(element(cp.TAG, element(cp.TARGETS, uint(cp.TAG_TRACK_UID, uid)), *statistics))
+    attachments = b""
+    if general.get("Cover") == "Yes":
+        attachments = element(cp.ATTACHMENTS, element(cp.ATTACHED_FILE, string(cp.FILE_NAME, "cover.jpg"),
+                                                      string(cp.FILE_MIME_TYPE, "image/jpeg"),
+                                                      element(cp.FILE_DATA, b"\xff\xd8\xff\xd9")))
+    header = element(0x1A45DFA3, string(0x4282, "matroska"))
+    # Segment and Cluster of unknown size, the cluster runs to the end of the (sparse) file
+    segment = bytes.fromhex("18538067") + b"\x01" + b"\xff" * 7
+    cluster = bytes.fromhex("1F43B675") + b"\x01" + b"\xff" * 7
+    with open(path, 'wb') as media_file:
+        media_file.write(header + segment + info + tracks + attachments + element(cp.TAGS, *tags) + cluster)
+        media_file.truncate(int(general["FileSize"]))
+
+# --- MP4 writer ---
+
+def box(box_type, *children):
+    payload = b"".join(children)
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+def full_box(box_type, version_flags, *children):
+    return box(box_type, struct.pack(">I", version_flags), *children)
+
+def mp4_trak(track, handler, entry, timescale, duration):
+    language = ISO_639_2.get(track.get("Language"), "und")
+    packed = sum((ord(letter) - 0x60) << shift for letter, shift in zip(language, (10, 5, 0)))
+    mdhd = full_box(b"mdhd", 0, struct.pack(">IIIIHH", 0, 0, timescale, duration, packed, 0))
+    hdlr = full_box(b"hdlr", 0, struct.pack(">I4s12x", 0, handler), track.get("Title", "").encode() + b"\0")
+    stsd = full_box(b"stsd", 0, struct.pack(">I", 1), entry)
+    stsz = full_box(b"stsz", 0, struct.pack(">II", int(track["StreamSize"]), 1))
+    tkhd = full_box(b"tkhd", 1 if track.get("Default") == "Yes" else 0, b"\0" * 80)
+    return box(b"trak", tkhd, box(b"mdia", mdhd, hdlr, box(b"minf", box(b"stbl", stsd, stsz))))
+
+def write_mp4(path, golden, audio_duration):
+    general, video, audio = golden
+    avc1 = box(b"avc1", b"\0" * 78)
+    decoder_info = bytes([0x05, 2, 2 << 3 | 4 >> 1, (4 & 1) << 7 | 2 << 3])
+    decoder_config = bytes([0x04, 13 + len(decoder_info), 0x40, 0x15]) + b"\0" * 11 + decoder_info
+    es_descriptor = bytes([0x03, 3 + len(decoder_config), 0, 1, 0]) + decoder_config
+    mp4a = box(b"mp4a", b"\0" * 6, struct.pack(">HHHIHHHHI", 1, 0, 0, 0, int(audio["Channels"]), 16, 0, 0,
+                                                 int(audio["SamplingRate"]) << 16), full_box(b"esds", 0, es_descriptor))
+    mvhd = full_box(b"mvhd", 0, struct.pack(">IIII", 0, 0, 1000, round(float(general["Duration"]) * 1000)), b"\0" * 80)
+    moov = box(b"moov", mvhd, mp4_trak(video, b"vide", avc1, 1000, round(float(video["Duration"]) * 1000)),
+               mp4_trak(audio, b"soun", mp4a, int(audio["SamplingRate"]), audio_duration))
+    ftyp = box(b"ftyp", b"isom", struct.pack(">I", 512), b"isomiso2avc1mp41")
+    with open(path, 'wb') as media_file:
+        media_file.write(ftyp + moov)
+        media_file.write(struct.pack(">I4s", int(general["FileSize"]) - len(ftyp) - len(moov), b"mdat"))
+        media_file.truncate(int(general["FileSize"]))
+
+@pytest.mark.parametrize("sample_path", [path for path in SAMPLES if load_golden(path)[0]["Format"] == "Matroska"],
+                         ids=os.path.basename)
+def test_matroska_headers_read_like_mediainfo(sample_path, tmp_path):
+    golden = load_golden(sample_path)
+    media_path = str(tmp_path / "sample.mkv")
+    write_matroska(media_path, golden)
+    reader = cp.RangeReader(open(media_path, 'rb'))
+    try:
+        tracks = cp.matroska_track_list(reader)
+    finally:
+        reader.media_file.close()
+    assert compare_models(parse_track_list(tracks), parse_track_list(golden)) == []
+    assert reader.bytes_read < 64 * 1024  # Only the header elements, never the clusters
+
+def test_mp4_headers_read_like_mediainfo(tmp_path):
+    sample_path = os.path.join(ROOT, "sample6.json")
+    golden = load_golden(sample_path)
+    media_path = str(tmp_path / "sample.mp4")
+    # 137.277 s at 44100 Hz, long enough for MediaInfo's 127999 bit/s
+    write_mp4(media_path, golden, 6053930)
+    differences = compare_models(parse_track_list(probe_native(media_path)), parse_track_list(golden))
+    assert differences == []
+
+def test_damaged_headers_raise_value_error(tmp_path):
+    media_path = tmp_path / "broken.mkv"
+    media_path.write_bytes(element(0x1A45DFA3, string(0x4282, "matroska")) + bytes.fromhex("18538067") + b"\x00")
+    with pytest.raises(ValueError):
+        probe_native(str(media_path))
+    other = tmp_path / "other.avi"
+    other.write_bytes(b"RIFF\0\0\0\0AVI LIST" + b"\0" * 100)
+    assert probe_native(str(other)) is None
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+@pytest.mark.parametrize("extension", ["mkv", "mp4"])
+def test_ffmpeg_output(extension, tmp_path):
+    media_path = str(tmp_path / f"out.{extension}")
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "sine=d=2:sample_rate=48000", "-f", "lavfi", "-i",
+                    "sine=d=2:sample_rate=22050", "-map", "0", "-map", "1", "-c:a:0", "aac", "-c:a:1", "libmp3lame",
+                    "-ac:a:0", "2", "-metadata:s:a:0", "language=jpn", "-metadata:s:a:1", "title=Commentary",
+                    media_path], check=True)
+    media = parse_track_list(probe_native(media_path))
+    first, second = media.audio
+    assert (first.format_name, first.channels, first.sampling_rate, first.language) == ("aac", 2, 48000, "ja")
+    assert (second.format_name, second.format_profile, second.sampling_rate) == ("mpeg audio", "Layer 3", 22050)
+    assert second.title == "Commentary"
@@ -0,0 +1,82 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from videoToAudio import containerProbe as cp
+from videoToAudio import coverArt
+from videoToAudio.coverArt import JPEG_MAGIC, copy_cover, extract_covers, save_cover
+from videoToAudio.errors import ConversionError
+
+from tests.test_containerProbe import element, string
+
+JPEG = b"\xff\xd8\xff\xe0 not a real picture \xff\xd9"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+def write_cover_matroska(path, data, mime_type="image/jpeg", name="cover.jpg"):
+    # EBML header, a Segment of unknown size with one attachment and an empty Cluster
+    attachment = element(cp.ATTACHED_FILE, string(cp.FILE_NAME, name), string(cp.FILE_MIME_TYPE, mime_type),
+                         element(cp.FILE_DATA, data))
+    segment = bytes.fromhex("18538067") + b"\x01" + b"\xff" * 7
+    cluster = bytes.fromhex("1F43B675") + b"\x01" + b"\xff" * 7
+    with open(path, 'wb') as media_file:
+        media_file.write(element(0x1A45DFA3, string(0x4282, "matroska")) + segment + element(cp.ATTACHMENTS, attachment)
+                         + cluster + b"\0" * 100)
+
+def make_png(tmp_path):
+    png_path = tmp_path / "cover.png"
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "color=red:s=16x16", "-frames:v", "1", str(png_path)],
+                   check=True)
+    return png_path.read_bytes()
+
+def test_jpeg_cover_is_copied_as_it_is(tmp_path):
+    write_cover_matroska(str(tmp_path / "a.mkv"), JPEG)
+    assert copy_cover(str(tmp_path / "a.mkv"), str(tmp_path / "a_cover.jpg")) is True
+    assert (tmp_path / "a_cover.jpg").read_bytes() == JPEG
+    assert save_cover(str(tmp_path / "a.mkv"), str(tmp_path / "b_cover.jpg")) == "headers"
+    assert (tmp_path / "b_cover.jpg").read_bytes() == JPEG
+
+def test_file_without_cover(tmp_path):
+    write_cover_matroska(str(tmp_path / "a.mkv"), b"not an image", "text/plain", "notes.txt")
+    assert copy_cover(str(tmp_path / "a.mkv"), str(tmp_path / "a_cover.jpg")) is None
+    with pytest.raises(ConversionError):
+        save_cover(str(tmp_path / "a.mkv"), str(tmp_path / "a_cover.jpg"))
+    assert not (tmp_path / "a_cover.jpg").exists()
+
+def test_png_cover_is_never_written_under_the_jpg_name(tmp_path, monkeypatch):
+    # Neither Pillow nor FFmpeg: the cover fails instead of being written as a misnamed PNG
+    monkeypatch.setattr(coverArt, "Image", None)
+    monkeypatch.setenv("PATH", str(tmp_path / "empty"))
+    write_cover_matroska(str(tmp_path / "a.mkv"), PNG_MAGIC + b"\0" * 64, "image/png", "cover.png")
+    with pytest.raises(ConversionError):
+        copy_cover(str(tmp_path / "a.mkv"), str(tmp_path / "a_cover.jpg"))
+    assert not (tmp_path / "a_cover.jpg").exists()
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+def test_png_cover_is_re_encoded_by_ffmpeg_without_pillow(tmp_path, monkeypatch):
+    monkeypatch.setattr(coverArt, "Image", None)
+    write_cover_matroska(str(tmp_path / "a.mkv"), make_png(tmp_path), "image/png", "cover.png")
+    assert save_cover(str(tmp_path / "a.mkv"), str(tmp_path / "a_cover.jpg")) == "headers"
+    assert (tmp_path / "a_cover.jpg").read_bytes().startswith(JPEG_MAGIC)
+    assert copy_cover(str(tmp_path / "a.mkv"), str(tmp_path / "b_cover.jpg")) is True
+    assert (tmp_path / "b_cover.jpg").read_bytes().startswith(JPEG_MAGIC)
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+def test_png_attached_picture_extracted_by_ffmpeg_becomes_jpeg(tmp_path, monkeypatch):
+    # An MP3 has no cover headers to read, FFmpeg copies the attached PNG, which is then re-encoded
+    monkeypatch.setattr(coverArt, "Image", None)
+    make_png(tmp_path)
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "sine=d=1", "-i", str(tmp_path / "cover.png"), "-map", "0",
+                    "-map", "1", "-c:v", "copy", "-disposition:v", "attached_pic", str(tmp_path / "a.mp3")], check=True)
+    assert save_cover(str(tmp_path / "a.mp3"), str(tmp_path / "a_cover.jpg")) == "ffmpeg"
+    assert (tmp_path / "a_cover.jpg").read_bytes().startswith(JPEG_MAGIC)
+
+def test_os_error_fails_only_its_own_job(tmp_path):
+    write_cover_matroska(str(tmp_path / "a.mkv"), JPEG)
+    (tmp_path / "blocked").write_text("a file where the output folder should be")
+    jobs = [(str(tmp_path / "a.mkv"), str(tmp_path / "blocked" / "a_cover.jpg")),
+            (str(tmp_path / "a.mkv"), str(tmp_path / "out" / "a_cover.jpg"))]
+    failed = extract_covers(jobs, workers=2)
+    assert [file_path for file_path, error in failed] == [str(tmp_path / "a.mkv")]
+    assert (tmp_path / "out" / "a_cover.jpg").read_bytes() == JPEG
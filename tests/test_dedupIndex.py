@@ -0,0 +1,52 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from videoToAudio.dedupIndex import DedupIndex, track_content_hashes, track_signature
+from videoToAudio.mediaModel import AudioTrack
+
+def make_track(content_hash="a" * 64, **fields):
+    fields = dict(dict(duration=5.0, stream_size=80000, channels=2, sampling_rate=44100, bit_rate=128000), **fields)
+    return AudioTrack(1, "mpeg audio", 0, content_hash=content_hash, **fields)
+
+def test_signature_needs_the_content_hash():
+    assert track_signature(make_track(None), ".mp3") is None
+    assert track_signature(make_track(), ".mp3") == track_signature(make_track(), ".mp3")
+    # Constant bit rate tracks of the same length only differ by their packets
+    assert track_signature(make_track(), ".mp3") != track_signature(make_track("b" * 64), ".mp3")
+    assert track_signature(make_track(), ".mp3") != track_signature(make_track(), "_opus_96k.opus")
+
+def test_reuse_links_recorded_output(tmp_path):
+    index = DedupIndex(str(tmp_path / "outputs.sqlite3"))
+    source = tmp_path / "first.mp3"
+    source.write_bytes(b"audio" * 100)
+    signature = track_signature(make_track(), ".mp3")
+    assert index.find(signature) is None
+    index.add(signature, str(source))
+    assert index.find(signature) == str(source)
+
+    target = tmp_path / "second.mp3"
+    assert index.reuse(str(source), str(target)) == (500, True)
+    assert os.path.samefile(source, target)
+
+    # A source changed since it was recorded is not reused
+    source.unlink()
+    source.write_bytes(b"other")
+    assert index.find(signature) is None
+    index.close()
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+def test_content_hash_survives_a_remux(tmp_path):
+    def make(name, frequency, *arguments):
+        subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", f"sine=f={frequency}:d=3", "-c:a", "libmp3lame",
+                        "-b:a", "128k", *arguments, str(tmp_path / name)], check=True)
+    make("a.mkv", 440)
+    make("b.mkv", 880)
+    subprocess.run(["ffmpeg", "-v", "error", "-i", str(tmp_path / "a.mkv"), "-c", "copy", str(tmp_path / "a.mp4")], check=True)
+
+    track = make_track(None)
+    hashes = {name: track_content_hashes(str(tmp_path / name), [track])[0] for name in ("a.mkv", "a.mp4", "b.mkv")}
+    assert hashes["a.mkv"] == hashes["a.mp4"] != hashes["b.mkv"]
+    assert track_content_hashes(str(tmp_path / "missing.mkv"), [track]) == {}
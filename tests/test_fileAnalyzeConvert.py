@@ -0,0 +1,69 @@
+import os
+import shutil
+import threading
+import subprocess
+
+import pytest
+
+from videoToAudio import fileAnalyzeConvert
+from videoToAudio.containerProbe import probe_native
+from videoToAudio.fileAnalyzeConvert import build_extraction_command, choose_audio_output, extract_streams, plan_outputs
+from videoToAudio.mediaModel import MediaInfo, parse_track_list
+
+def test_only_layer_3_is_copied_to_mp3():
+    assert choose_audio_output("MPEG Audio", "copy", False, "Layer 3") == ("copy", "mp3")
+    assert choose_audio_output("MPEG Audio", "mp3", False, "Layer 3") == ("copy", "mp3")
+    assert choose_audio_output("MPEG Audio", "copy", False, "Layer 2") == ("copy", "mka")
+    assert choose_audio_output("MPEG Audio", "mp3", False, "Layer 2") == ("transcode", "mp3")
+    assert choose_audio_output("MPEG Audio", "copy") == ("copy", "mka")  # Unknown layer
+    assert choose_audio_output("AAC", "copy") == ("copy", "m4a")
+    assert choose_audio_output("MPEG Audio", "copy", True, "Layer 3") == ("transcode", "mp3")
+
+def test_format_profile_survives_the_probe_cache():
+    media = parse_track_list([{"@type": "General"}, {"@type": "Audio", "Format": "MPEG Audio", "Format_Profile": "Layer 2"}])
+    cached = MediaInfo.from_dict(media.to_dict())
+    assert cached.audio[0].format_name == "mpeg audio"
+    assert cached.audio[0].format_profile == "Layer 2"
+
+def test_transcodes_are_encoded_straight_from_the_source():
+    media = parse_track_list([{"@type": "General"}, {"@type": "Audio", "Format": "AC-3"}, {"@type": "Audio", "Format": "AAC"}])
+    plan_outputs(media, "film", "copy", "out")
+    command = build_extraction_command("film.mkv", media.audio, [])
+    # One run reads the container once, the AC-3 track is encoded and the AAC track copied without a temporary file
+    assert command == ["ffmpeg", "-y", "-i", "film.mkv",
+                       "-map", "0:a:0", "-c:a", "libmp3lame", os.path.join("out", "film_track0.mp3"),
+                       "-map", "0:a:1", "-c:a", "copy", os.path.join("out", "film_track1.m4a")]
+
+class CountingSlot:
+    # One encode slot that records how often it was taken and never allows two holders
+    def __init__(self):
+        self.semaphore = threading.BoundedSemaphore(1)
+        self.taken = 0
+
+    def acquire(self, block=True, timeout=None):
+        acquired = self.semaphore.acquire(block, timeout)
+        self.taken += acquired
+        return acquired
+
+    def release(self):
+        self.semaphore.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+def test_segment_jobs_take_an_encode_slot_each(tmp_path, monkeypatch):
+    input_file = str(tmp_path / "a.mkv")
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "sine=d=4:sample_rate=44100", "-c:a", "flac", input_file],
+                   check=True)
+    media = parse_track_list(probe_native(input_file))
+    plan_outputs(media, "a", "mp3", str(tmp_path))
+    slot = CountingSlot()
+    monkeypatch.setattr(fileAnalyzeConvert, "encode_slots", slot)
+    monkeypatch.setattr(fileAnalyzeConvert, "segment_count", lambda duration, sample_rate: 3)
+    extract_streams(input_file, media.audio, [], segment_encode=True)
+    # Not one slot for the whole file while three encoders run
+    assert slot.taken == 3
+    assert os.path.getsize(media.audio[0].output_filename) > 0
@@ -0,0 +1,57 @@
+import json
+
+from videoToAudio import instrumentation, pipeline
+
+def make_result(input_path, *records):
+    result = pipeline.ConvertResult(input_path)
+    result.stages = list(records)
+    return result
+
+def make_record(stage, child_cpu, read_bytes, child=False):
+    record = instrumentation.StageRecord("a.mkv", stage)
+    record.child_user_cpu = child_cpu
+    record.read_bytes = read_bytes
+    record.child = child
+    return record
+
+def read_metrics(path):
+    metrics = {}
+    for line in path.read_text().splitlines():
+        if not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            metrics[name] = float(value)
+    return metrics
+
+def test_child_usage_is_not_counted_twice(tmp_path):
+    # The extract stage waited for the FFmpeg child, its usage is already in the stage totals
+    result = make_result("a.mkv", make_record("probe", 0.5, 100), make_record("extract", 4.0, 1000),
+                         make_record("ffmpeg", 4.0, 1000, child=True))
+    prometheus_path = tmp_path / "metrics.prom"
+    instrumentation.write_prometheus([result], str(prometheus_path))
+    metrics = read_metrics(prometheus_path)
+
+    stage_cpu = sum(value for name, value in metrics.items()
+                    if name.startswith("videotoaudio_stage_cpu_seconds_total") and 'process="children"' in name)
+    assert stage_cpu == 4.5
+    assert 'stage="ffmpeg"' not in "".join(metrics)
+    assert metrics['videotoaudio_child_runs_total{program="ffmpeg"}'] == 1
+    assert metrics['videotoaudio_child_cpu_seconds_total{program="ffmpeg",mode="user"}'] == 4.0
+    assert metrics['videotoaudio_child_io_bytes_total{program="ffmpeg",direction="read"}'] == 1000
+    assert metrics['videotoaudio_files_total{result="success"}'] == 1
+
+def test_stage_records_and_jsonl(tmp_path):
+    instrumentation.begin_file("b.mkv")
+    try:
+        with instrumentation.stage("lrc", "b.lrc"):
+            raise ValueError("the record is kept")
+    except ValueError:
+        pass
+    records = instrumentation.take_records()
+    assert [(record.file_path, record.stage, record.detail) for record in records] == [("b.mkv", "lrc", "b.lrc")]
+    assert records[0].wall_seconds >= 0 and instrumentation.take_records() == []
+
+    jsonl_path = tmp_path / "stages.jsonl"
+    instrumentation.write_jsonl([make_result("b.mkv", *records)], str(jsonl_path))
+    lines = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+    assert [line["stage"] for line in lines] == ["lrc", "total"]
+    assert lines[0]["child"] is False and lines[1]["success"] is True
@@ -0,0 +1,52 @@
+import os
+
+from videoToAudio.jobJournal import DONE, FAILED, JobJournal
+
+def make_journal(tmp_path):
+    return JobJournal(str(tmp_path / "jobs.sqlite3"))
+
+def states(journal):
+    return sorted(journal.connection.execute("SELECT input_path, track, kind, state FROM jobs"))
+
+def test_done_steps_are_skipped(tmp_path):
+    input_file = tmp_path / "a.mkv"
+    input_file.write_bytes(b"x" * 100)
+    output_file = tmp_path / "a.m4a"
+    output_file.write_bytes(b"audio")
+    steps = [("a:0", "audio", str(output_file)), ("s:0", "lrc", str(tmp_path / "a_track0.lrc"))]
+    journal = make_journal(tmp_path)
+
+    assert journal.plan(str(input_file), steps) == set()
+    journal.mark(str(input_file), steps[:1], DONE)
+    journal.mark(str(input_file), steps[1:], FAILED, "output was not written")
+    assert journal.plan(str(input_file), steps) == {("a:0", "audio")}
+
+def test_changed_input_or_missing_output_is_redone(tmp_path):
+    input_file = tmp_path / "a.mkv"
+    input_file.write_bytes(b"x" * 100)
+    output_file = tmp_path / "a.m4a"
+    output_file.write_bytes(b"audio")
+    steps = [("a:0", "audio", str(output_file))]
+    journal = make_journal(tmp_path)
+    journal.plan(str(input_file), steps)
+    journal.mark(str(input_file), steps, DONE)
+
+    input_file.write_bytes(b"y" * 101)
+    assert journal.plan(str(input_file), steps) == set()
+    journal.mark(str(input_file), steps, DONE)
+    os.remove(output_file)
+    assert journal.plan(str(input_file), steps) == set()
+
+def test_remote_input_resumes(tmp_path, range_server):
+    directory, base_url, requests = range_server
+    (directory / "x.mkv").write_bytes(b"\x1a\x45\xdf\xa3" + b"\0" * 1000)
+    url = f"{base_url}/x.mkv"
+    output_file = tmp_path / "x.m4a"
+    output_file.write_bytes(b"audio")
+    steps = [("a:0", "audio", str(output_file))]
+    journal = make_journal(tmp_path)
+
+    assert journal.plan(url, steps) == set()
+    journal.mark(url, steps, DONE)
+    assert states(journal) == [(url, "a:0", "audio", DONE)]
+    assert journal.plan(url, steps) == {("a:0", "audio")}
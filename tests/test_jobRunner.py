@@ -0,0 +1,64 @@
+import os
+import sys
+import subprocess
+import collections
+import multiprocessing
+
+import pytest
+
+from videoToAudio import instrumentation, jobRunner
+
+def python_job(code, **kwargs):
+    return jobRunner.Job([sys.executable, "-c", code], **kwargs)
+
+def test_exit_code_and_stderr():
+    ok, failed = jobRunner.run_jobs([python_job("import sys; sys.stderr.write('a\\nb\\n')", keep_stderr=True),
+                                     python_job("import sys; sys.stderr.write('boom\\n'); sys.exit(3)")])
+    assert ok.success and ok.returncode == 0 and ok.stderr_lines == ["a", "b"]
+    assert failed.error == "exited with code 3" and failed.stderr_tail == "boom"
+
+def test_timeout_kills_the_child():
+    result, = jobRunner.run_jobs([python_job("import time; time.sleep(30)", timeout=0.5)])
+    assert result.error == "timed out after 0.5s"
+    assert result.returncode < 0 and result.elapsed < 10
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="os.wait4 is Unix only")
+def test_rusage_is_per_child():
+    # The small child runs after the large one, RUSAGE_CHILDREN would report the large RSS for both
+    large, = jobRunner.run_jobs([python_job("x = bytearray(200 * 1024 * 1024); x[::4096] = b'1' * len(x[::4096])")])
+    small, = jobRunner.run_jobs([python_job("pass")])
+    assert large.rusage.ru_maxrss > 2 * small.rusage.ru_maxrss
+
+    instrumentation.begin_file("input.mkv")
+    instrumentation.record_jobs([large, small])
+    records = instrumentation.take_records()
+    assert [record.stage for record in records] == [os.path.basename(sys.executable)] * 2
+    assert records[0].peak_rss_bytes > 200 * 1024 * 1024 > records[1].peak_rss_bytes
+    assert records[0].file_path == "input.mkv"
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="os.wait4 is Unix only")
+def test_reaped_child_is_never_signalled(monkeypatch):
+    process = subprocess.Popen([sys.executable, "-c", "pass"], stderr=subprocess.PIPE)
+    guard = jobRunner.ReapGuard()
+    assert jobRunner.watch_child(process, guard, collections.deque()) is not None
+    assert guard.reaped and process.returncode == 0
+    # The waiter reaped the child but its future is not done yet: the PID may belong to another process now
+    monkeypatch.setattr(jobRunner.os, "kill", lambda pid, signal_number: pytest.fail("reaped PID signalled"))
+    jobRunner.kill_child(process, guard)
+
+def test_shared_slot_limits_jobs_across_resource_classes(tmp_path):
+    # Three CPU jobs may run at once, the shared slot lets only one of them hold it at a time
+    log = tmp_path / "log"
+    code = f"import time; log = open({str(log)!r}, 'a'); log.write('start\\n'); log.flush(); time.sleep(0.2); log.write('end\\n')"
+    slot = multiprocessing.BoundedSemaphore(1)
+    results = jobRunner.run_jobs([python_job(code, resource=jobRunner.CPU, slot=slot) for _ in range(3)], {jobRunner.CPU: 3})
+    assert all(result.success for result in results)
+    assert log.read_text().split() == ["start", "end"] * 3
+
+def test_cancelled_job_gives_its_slot_back():
+    slot = multiprocessing.BoundedSemaphore(1)
+    jobs = [python_job("import time, sys; time.sleep(0.3); sys.exit(1)", slot=slot), python_job("pass", slot=slot)]
+    failed, cancelled = jobRunner.run_jobs(jobs, fail_fast=True)
+    assert failed.error == "exited with code 1" and cancelled.error == "cancelled"
+    # The waiter thread of the cancelled job may still get the slot, it releases it right away
+    assert slot.acquire(timeout=2)
@@ -0,0 +1,99 @@
+import pytest
+
+from videoToAudio.fileAnalyzeConvert import plan_outputs
+from videoToAudio.loudnessAnalysis import (MEASUREMENT_SETTINGS, LoudnessSettings, is_current, parse_loudnorm,
+                                           parse_measurement, track_gain)
+from videoToAudio.mediaModel import MediaInfo, parse_track_list
+
+# Recorded stderr of FFmpeg 7.0 measuring two tracks: m0 is 3 s of sine then 3 s of silence, m1 starts silent
+RECORDED_LOG = """\
+[silencedetect @ 0x7ff5f8003040] silence_start: 3
+[ametadata@m1 @ 0x7ff5f8004100] frame:0  pts:0  pts_time:0
+[ametadata@m1 @ 0x7ff5f8004100] lavfi.silence_start=0
+[ametadata@m1 @ 0x7ff5f8004100] frame:90  pts:132300  pts_time:3
+[ametadata@m1 @ 0x7ff5f8004100] lavfi.silence_end=2.5
+[ametadata@m0 @ 0x7ff5f80033c0] frame:151  pts:218316  pts_time:4.950476
+[ametadata@m0 @ 0x7ff5f80033c0] lavfi.silence_start=3
+[silencedetect @ 0x7ff5f8003040] silence_end: 6 | silence_duration: 3
+[ebur128@m0 @ 0x7ff5f8003c80] Summary:
+
+  Integrated loudness:
+    I:         -22.0 LUFS
+    Threshold: -32.1 LUFS
+
+  Loudness range:
+    LRA:         9.9 LU
+    Threshold: -44.8 LUFS
+    LRA low:   -31.8 LUFS
+    LRA high:  -21.9 LUFS
+
+  True peak:
+    Peak:      -18.1 dBFS
+[ebur128@m1 @ 0x7ff5f8004c80] Summary:
+
+  Integrated loudness:
+    I:         -70.0 LUFS
+    Threshold:   0.0 LUFS
+
+  Loudness range:
+    LRA:         0.0 LU
+    Threshold:   0.0 LUFS
+    LRA low:     0.0 LUFS
+    LRA high:    0.0 LUFS
+
+  True peak:
+    Peak:       -inf dBFS
+[astats@m0 @ 0x7ff5f8003840] Overall
+[astats@m0 @ 0x7ff5f8003840] Peak level dB: -18.063656
+[astats@m0 @ 0x7ff5f8003840] RMS level dB: -24.084030
+[astats@m1 @ 0x7ff5f8004840] Overall
+[astats@m1 @ 0x7ff5f8004840] Peak level dB: -inf
+[astats@m1 @ 0x7ff5f8004840] RMS level dB: -inf
+[out#0/null @ 0x22376000] video:0KiB audio:517KiB subtitle:0KiB other streams:0KiB global headers:0KiB muxing overhead: unknown
+size=N/A time=00:00:06.00 bitrate=N/A speed=89.4x
+""".splitlines()
+
+def test_parse_measurement():
+    measurement = parse_measurement(RECORDED_LOG, "m0", duration=6.0)
+    assert measurement == {"settings": MEASUREMENT_SETTINGS, "integrated": -22.0, "threshold": -32.1, "loudness_range": 9.9,
+                           "true_peak": -18.1, "sample_peak": -18.063656, "rms_level": -24.08403, "silences": [[3.0, 6.0]]}
+    assert is_current(measurement)
+
+def test_parse_measurement_of_a_silent_track():
+    measurement = parse_measurement(RECORDED_LOG, "m1", duration=6.0)
+    assert measurement["integrated"] == -70.0 and measurement["threshold"] == 0.0
+    assert measurement["true_peak"] is None and measurement["sample_peak"] is None  # "-inf" stays out of the JSON cache
+    assert measurement["silences"] == [[0.0, 2.5]]
+    assert track_gain(measurement, LoudnessSettings(True)) == 0.0
+
+def test_missing_summary_is_not_a_measurement():
+    assert parse_measurement(RECORDED_LOG, "m2") is None
+    # A log line after a progress line ended with "\r" only
+    assert parse_measurement(["size=N/A time=00:00:01.00\r" + RECORDED_LOG[8]] + RECORDED_LOG[9:22], "m0")["integrated"] == -22.0
+
+def test_track_gain_is_limited_by_the_true_peak():
+    assert track_gain({"integrated": -30.0, "true_peak": -10.0}, LoudnessSettings(True)) == 7.0
+    assert track_gain({"integrated": -30.0, "true_peak": -4.0}, LoudnessSettings(True)) == 3.0
+    assert track_gain({"integrated": -14.0, "true_peak": -1.0}, LoudnessSettings(True, -16.0, -1.5)) == -2.0
+
+def test_parse_loudnorm():
+    settings = parse_loudnorm("-16:-1.5")
+    assert (settings.normalize, settings.integrated, settings.true_peak, settings.name) == (True, -16.0, -1.5, "r128_-16_-1.5")
+    assert parse_loudnorm("-20").true_peak == -1.0
+    for spec in ("loud", "16", "-16:1", "-16:-1:0"):
+        with pytest.raises(ValueError):
+            parse_loudnorm(spec)
+
+def test_probe_cache_keeps_the_measurement_not_the_plan():
+    media = parse_track_list([{"@type": "General", "Cover": "Yes"}, {"@type": "Audio", "Format": "AAC"},
+                              {"@type": "Text", "Format": "UTF-8"}])
+    plan_outputs(media, "a", "copy", "out", profiles=None, loudness=LoudnessSettings(True))
+    media.audio[0].loudness = parse_measurement(RECORDED_LOG, "m0", 6.0)
+    media.audio[0].content_hash = "abc"
+    cached = media.to_dict()
+    for field in ("output_filename", "output_mode", "profile_outputs", "normalization"):
+        assert field not in cached["audio"][0]
+    assert "lrc_filename" not in cached["text"][0] and "output_filename" not in cached["text"][0]
+    audio = MediaInfo.from_dict(cached).audio[0]
+    assert audio.loudness == media.audio[0].loudness and audio.content_hash == "abc"
+    assert (audio.output_filename, audio.output_mode, audio.profile_outputs, audio.normalization) == (None, "transcode", [], None)
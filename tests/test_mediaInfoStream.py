@@ -0,0 +1,58 @@
+import io
+import os
+import json
+
+import pytest
+
+from videoToAudio import mediaInfoStream
+from videoToAudio.mediaInfoStream import iter_tracks, reduce_fields
+from videoToAudio.mediaModel import MEDIAINFO_FIELDS
+
+from tests.test_containerProbe import SAMPLES
+
+FIELDS = {"@type": None, "Duration": None, "Delay": None, "Default": None, "Title": None, "Channels": None,
+          "extra": {"ARTIST": None, "Level": None}}
+# Numbers, literals, escapes and skipped values at every position a chunk can split them
+DOCUMENT = json.dumps({
+    "creatingLibrary": {"name": "MediaInfoLib", "version": "24.01", "url": "https://mediaarea.net/MediaInfo"},
+    "media": {"@ref": "C:\\films\\a \"b\".mkv", "track": [
+        {"@type": "General", "Duration": 1.5, "Title": "tab\there \\u00e9 \u00e9 \\\"", "extra": {"ARTIST": "A", "Level": -12.25e-3,
+                                                                                                    "Skipped": [1, {"x": "]}"}]}},
+        {"@type": "Audio", "Duration": 1e3, "Delay": -0.0, "Default": True, "Channels": 6, "Description": "{[\"\\\\"},
+        {"@type": "Text", "Duration": 12345678901234567890, "Default": False, "Title": None, "Channels": 2.5E+2},
+        "not an object",
+        {"@type": "Audio", "Duration": 0, "Delay": 7},
+    ]},
+}, ensure_ascii=False) + "\n"
+
+def expected_tracks(text, fields):
+    return [reduce_fields(track, fields) for track in json.loads(text)["media"]["track"] if isinstance(track, dict)]
+
+@pytest.fixture(params=["whole", "key by key"])
+def decode_limit(request, monkeypatch):
+    # Run each test through both decode paths: whole objects by the C decoder, or one key at a time
+    if request.param == "key by key":
+        monkeypatch.setattr(mediaInfoStream, "OBJECT_DECODE_LIMIT", 3)
+
+def test_every_chunk_size(decode_limit):
+    expected = expected_tracks(DOCUMENT, FIELDS)
+    for chunk_size in range(1, len(DOCUMENT) + 1):
+        assert list(iter_tracks(io.StringIO(DOCUMENT), FIELDS, chunk_size)) == expected, chunk_size
+
+def test_number_split_after_the_decimal_point(decode_limit):
+    document = '{"media":{"track":[{"@type":"Audio","Duration":1.5}]}}'
+    assert list(iter_tracks(io.StringIO(document), FIELDS, 1)) == [{"@type": "Audio", "Duration": 1.5}]
+
+@pytest.mark.parametrize("sample_path", SAMPLES, ids=os.path.basename)
+def test_samples(sample_path, decode_limit):
+    with open(sample_path, 'r', encoding='utf-8') as json_file:
+        text = json_file.read()
+    expected = expected_tracks(text, MEDIAINFO_FIELDS)
+    for chunk_size in (1, 2, 3, 5, 7, 64, 1000, mediaInfoStream.CHUNK_SIZE):
+        assert list(iter_tracks(io.StringIO(text), chunk_size=chunk_size)) == expected, chunk_size
+
+@pytest.mark.parametrize("document", ['{"media":{"track":[{"@type":"Audio",}]}}', '{"media":{"track":[{"@type":"Au',
+                                      '["media"]'])
+def test_invalid_documents_raise_value_error(document, decode_limit):
+    with pytest.raises(ValueError):
+        list(iter_tracks(io.StringIO(document), FIELDS, 4))
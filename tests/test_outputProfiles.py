@@ -0,0 +1,43 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from videoToAudio.outputProfiles import OutputProfile, fanout_arguments, parse_profile
+
+def test_parse_profile():
+    profile = parse_profile("Opus:96k:48000:2")
+    assert (profile.codec, profile.encoder, profile.extension) == ("opus", "libopus", "opus")
+    assert profile.name == "opus_96k_48000hz_2ch"
+    assert profile.codec_arguments() == ["-c:a", "libopus", "-b:a", "96k", "-ar", "48000", "-ac", "2"]
+    assert parse_profile("mp3::44100").name == "mp3_44100hz"
+    assert parse_profile("aac").codec_arguments() == ["-c:a", "aac"]
+
+@pytest.mark.parametrize("spec", ["flac", "mp3:128k:fast", "mp3:1:2:3:4", ""])
+def test_invalid_profiles(spec):
+    with pytest.raises(ValueError):
+        parse_profile(spec)
+
+def test_single_output_is_mapped_directly():
+    assert fanout_arguments([(1, [(OutputProfile("mp3", "320k"), "a.mp3")])]) == (
+        [], ["-map", "0:a:1", "-c:a", "libmp3lame", "-b:a", "320k", "a.mp3"])
+
+def test_several_outputs_share_one_decode():
+    mp3, opus = OutputProfile("mp3", "320k"), OutputProfile("opus", "96k")
+    filters, outputs = fanout_arguments([(0, [(mp3, "a.mp3"), (opus, "a.opus")]), (2, [(opus, "c.opus")])],
+                                        {0: "volume=-3.00dB", 2: "volume=1.00dB"})
+    assert filters == ["-filter_complex", "[0:a:0]volume=-3.00dB,asplit=2[a0p0][a0p1]"]
+    assert outputs == ["-map", "[a0p0]", "-c:a", "libmp3lame", "-b:a", "320k", "a.mp3",
+                       "-map", "[a0p1]", "-c:a", "libopus", "-b:a", "96k", "a.opus",
+                       "-map", "0:a:2", "-af", "volume=1.00dB", "-c:a", "libopus", "-b:a", "96k", "c.opus"]
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+def test_ffmpeg_writes_every_profile(tmp_path):
+    source = str(tmp_path / "in.mka")
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "sine=d=1", "-c:a", "pcm_s16le", source], check=True)
+    outputs = [(parse_profile(spec), str(tmp_path / f"out_{index}.{parse_profile(spec).extension}"))
+               for index, spec in enumerate(["mp3:128k", "aac:96k:22050:1"])]
+    filters, arguments = fanout_arguments([(0, outputs)])
+    subprocess.run(["ffmpeg", "-v", "error", "-i", source] + filters + arguments, check=True)
+    assert all(os.path.getsize(output_file) > 0 for profile, output_file in outputs)
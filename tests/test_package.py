@@ -0,0 +1,30 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ["batchProcess", "benchmark", "containerProbe", "coverArt", "fileAnalyzeConvert", "verifyFileExtension",
+           "watchFolder"]
+
+@pytest.mark.parametrize("name", SCRIPTS)
+def test_module_runs_as_a_script(name, tmp_path):
+    # From another folder, without the package on the path
+    command = [sys.executable, "-W", "error::RuntimeWarning", "-c",
+               f"import runpy, sys; sys.argv = ['{name}']; sys.path.insert(0, {os.path.join(ROOT, 'videoToAudio')!r}); "
+               f"runpy.run_path({os.path.join(ROOT, 'videoToAudio', name + '.py')!r}, run_name='imported')"]
+    completed = subprocess.run(command, cwd=tmp_path, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+
+def test_run_as_module_does_not_warn():
+    command = [sys.executable, "-W", "error::RuntimeWarning", "-m", "videoToAudio.fileAnalyzeConvert", "--help"]
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+
+def test_package_exports_convert():
+    import videoToAudio
+    from videoToAudio import pipeline
+    assert videoToAudio.convert is pipeline.convert
+    with pytest.raises(AttributeError):
+        videoToAudio.missing_name
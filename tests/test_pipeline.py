@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+from videoToAudio import benchmark, pipeline
+
+def make_input(tmp_path):
+    input_file = tmp_path / "a.mkv"
+    input_file.write_bytes(b"\x1a\x45\xdf\xa3" + b"\0" * 100)
+    return str(input_file)
+
+def test_required_commands_follow_the_probe_backend():
+    assert pipeline.required_commands("ffprobe") == ["ffmpeg", "ffprobe"]
+    assert pipeline.required_commands("mediainfo") == ["ffmpeg", "mediainfo"]
+    assert "mkvmerge" not in pipeline.required_commands()
+
+def test_os_error_is_returned_as_failure(tmp_path):
+    (tmp_path / "out").write_text("a file where the output folder should be")
+    options = pipeline.ConvertOptions(output_dir=str(tmp_path / "out"), check_tools=False, verify_extension=False,
+                                      use_probe_cache=False, use_journal=False, dedup_mode="off")
+    result = pipeline.convert(make_input(tmp_path), options)
+    assert not result.success and result.error.startswith("I/O error")
+
+def test_database_error_is_returned_as_failure(tmp_path):
+    journal = tmp_path / "jobs.sqlite3"
+    journal.write_bytes(b"not a database" * 100)
+    options = pipeline.ConvertOptions(output_dir=str(tmp_path / "out"), check_tools=False, verify_extension=False,
+                                      use_probe_cache=False, journal_path=str(journal), dedup_mode="off")
+    result = pipeline.convert(make_input(tmp_path), options)
+    assert not result.success and result.error.startswith("Cache database error")
+
+@pytest.mark.skipif(os.name == 'nt', reason="the fake tools are scripts")
+def test_missing_output_is_a_failure(tmp_path, monkeypatch):
+    # A fake ffmpeg that exits with code 0 and writes nothing
+    benchmark.write_fake_tools(str(tmp_path))
+    with open(tmp_path / "ffmpeg", 'w') as script_file:
+        script_file.write(f"#!{sys.executable}\n")
+    monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ.get("PATH", ""))
+    with open(os.path.join(benchmark.FIXTURE_DIRECTORY, "sample2.json"), 'rb') as fixture_file:
+        (tmp_path / "a.mkv").write_bytes(fixture_file.read())  # The fake mediainfo prints the file itself
+    options = pipeline.ConvertOptions(output_dir=str(tmp_path / "out"), check_tools=False, verify_extension=False,
+                                      use_probe_cache=False, use_journal=False, dedup_mode="off")
+    result = pipeline.convert(str(tmp_path / "a.mkv"), options)
+    assert not result.success and result.error.startswith("FFmpeg did not write")
@@ -0,0 +1,43 @@
+import os
+
+from videoToAudio.probeCache import PARTIAL_HASH_BLOCK, ProbeCache, partial_hash
+
+def make_cache(tmp_path, use_partial_hash=False):
+    return ProbeCache(str(tmp_path / "probes.sqlite3"), use_partial_hash)
+
+def test_entry_follows_the_file_identity(tmp_path):
+    media_path = tmp_path / "a.mkv"
+    media_path.write_bytes(b"x" * 1000)
+    cache = make_cache(tmp_path)
+    assert cache.get(str(media_path)) is None
+    cache.put(str(media_path), {"audio": [1, 2]})
+    assert cache.get(str(media_path)) == {"audio": [1, 2]}
+    # The same file under another (relative) path is the same entry
+    assert cache.get(os.path.relpath(media_path)) == {"audio": [1, 2]}
+
+    media_path.write_bytes(b"x" * 1001)
+    assert cache.get(str(media_path)) is None
+    assert (cache.hits, cache.misses) == (2, 2)
+    cache.close()
+
+def test_partial_hash_catches_rewrites_with_the_same_size_and_time(tmp_path):
+    media_path = tmp_path / "a.mkv"
+    media_path.write_bytes(b"a" * (3 * PARTIAL_HASH_BLOCK))
+    stat = os.stat(media_path)
+    cache = make_cache(tmp_path, use_partial_hash=True)
+    cache.put(str(media_path), ["tracks"])
+
+    media_path.write_bytes(b"a" * (3 * PARTIAL_HASH_BLOCK - 1) + b"b")  # Last block changed
+    os.utime(media_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert make_cache(tmp_path).get(str(media_path)) == ["tracks"]  # Size and time alone do not see it
+    assert cache.get(str(media_path)) is None
+    cache.close()
+
+def test_partial_hash_reads_both_ends(tmp_path):
+    first, second = tmp_path / "a.bin", tmp_path / "b.bin"
+    first.write_bytes(b"\0" * (4 * PARTIAL_HASH_BLOCK))
+    second.write_bytes(b"\0" * PARTIAL_HASH_BLOCK + b"\1" + b"\0" * (3 * PARTIAL_HASH_BLOCK - 1))
+    # Only the middle differs: not part of the hash
+    assert partial_hash(str(first)) == partial_hash(str(second))
+    second.write_bytes(b"\0" * (4 * PARTIAL_HASH_BLOCK - 1) + b"\1")
+    assert partial_hash(str(first)) != partial_hash(str(second))
@@ -0,0 +1,57 @@
+import struct
+
+import pytest
+
+from videoToAudio.errors import ConversionError
+from videoToAudio.segmentEncode import (LAME_DELAY_PADDING, LAME_MUSIC_LENGTH, LAME_TAG_CRC, XING_FRAMES, XING_TOC, crc16,
+                                        info_tag_offset, patch_info_frame, segment_count, split_mp3)
+
+# MPEG-1 Layer III, 128 kbit/s, 44100 Hz, joint stereo: 417 bytes, 418 with padding
+HEADER = bytes([0xFF, 0xFB, 0x90, 0x64])
+PADDED_HEADER = bytes([0xFF, 0xFB, 0x92, 0x64])
+INFO_OFFSET = 36  # Header and the 32 bytes of stereo side info
+
+def audio_frame(fill, padded=False):
+    return (PADDED_HEADER if padded else HEADER) + bytes([fill]) * (417 + padded - 4)
+
+def info_frame(frames, delay, padding):
+    info = bytearray(HEADER + b"\0" * 413)
+    info[INFO_OFFSET:INFO_OFFSET + 4] = b"Info"
+    struct.pack_into(">II", info, INFO_OFFSET + XING_FRAMES, frames, 0)
+    info[INFO_OFFSET + LAME_DELAY_PADDING:INFO_OFFSET + LAME_DELAY_PADDING + 3] = (delay << 12 | padding).to_bytes(3, "big")
+    return bytes(info)
+
+def test_crc16_arc():
+    assert crc16(b"123456789") == 0xBB3D
+
+def test_segment_count():
+    assert segment_count(600, 44100, max_segments=4) == 4
+    assert segment_count(90, 44100, max_segments=4) == 1
+    assert segment_count(600, 22050, max_segments=4) == 1  # MPEG-2 sampling rate
+    assert segment_count(None, 44100) == 1
+
+def test_split_mp3():
+    tag = b"ID3\x04\x00\x00\x00\x00\x01\x00" + b"\0" * 128  # Syncsafe size 128
+    frames = [audio_frame(1), audio_frame(2, padded=True), audio_frame(3)]
+    assert split_mp3(tag + info_frame(3, 576, 1000) + b"".join(frames)) == (tag, info_frame(3, 576, 1000), frames)
+    assert split_mp3(b"".join(frames)) == (b"", None, frames)
+    assert info_tag_offset(frames[0]) is None
+    with pytest.raises(ConversionError):
+        split_mp3(frames[0] + b"garbage!")
+
+def test_patch_info_frame():
+    frames = [audio_frame(index % 256, padded=index % 3 == 0) for index in range(200)]
+    info = patch_info_frame(info_frame(100, 576, 300), info_frame(100, 576, 1234), frames)
+    total_bytes = len(info) + sum(len(frame) for frame in frames)
+
+    assert info_tag_offset(info) == INFO_OFFSET
+    assert struct.unpack_from(">II", info, INFO_OFFSET + XING_FRAMES) == (200, total_bytes)
+    # The delay of the first segment and the padding of the last one
+    delay_padding = int.from_bytes(info[INFO_OFFSET + LAME_DELAY_PADDING:INFO_OFFSET + LAME_DELAY_PADDING + 3], "big")
+    assert (delay_padding >> 12, delay_padding & 0xFFF) == (576, 1234)
+    assert struct.unpack_from(">IH", info, INFO_OFFSET + LAME_MUSIC_LENGTH) == (total_bytes, 0)
+    assert struct.unpack_from(">H", info, INFO_OFFSET + LAME_TAG_CRC)[0] == crc16(info[:INFO_OFFSET + LAME_TAG_CRC])
+    # The seek table rises from the start to near the end of the stream
+    toc = info[INFO_OFFSET + XING_TOC:INFO_OFFSET + XING_TOC + 100]
+    assert toc[0] == 0 and list(toc) == sorted(toc) and 250 <= toc[99] < 256
+    assert toc[50] == 256 * (len(info) + sum(len(frame) for frame in frames[:100])) // total_bytes
@@ -0,0 +1,66 @@
+import io
+
+import pytest
+
+from videoToAudio.subtitleConvert import convert_file_to_lrc, convert_stream_to_lrc, format_lrc_time
+
+SRT = """1
+00:00:01,500 --> 00:00:03,000
+<i>Hello</i>
+world
+
+2
+01:02:03,040 --> 01:02:05,000
+Second cue
+"""
+
+VTT = """WEBVTT
+
+00:01.250 --> 00:02.000 align:start
+<c.yellow>First</c>
+
+intro
+00:00:04.000 --> 00:00:05.000
+Second
+"""
+
+ASS = """[Script Info]
+Title: Example
+
+[V4+ Styles]
+Format: Name, Fontname
+Style: Default,Arial
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+Dialogue: 0,0:00:01.50,0:00:03.00,Default,,0,0,0,,{\\i1}Hello{\\i0}\\Nworld, again
+Comment: 0,0:00:02.00,0:00:03.00,Default,,0,0,0,,Not shown
+Dialogue: 0,0:01:00.00,0:01:01.00,Default,,0,0,0,,{\\pos(1,1)}
+"""
+
+def convert(text, subtitle_format, tmp_path):
+    lrc_path = tmp_path / "out.lrc"
+    count = convert_stream_to_lrc(io.StringIO(text), subtitle_format, str(lrc_path))
+    return count, lrc_path.read_text(encoding="utf-8").splitlines()
+
+def test_srt(tmp_path):
+    # Minutes keep counting past the hour
+    assert convert(SRT, "srt", tmp_path) == (2, ["[00:01.50]Hello world", "[62:03.04]Second cue"])
+
+def test_vtt(tmp_path):
+    assert convert(VTT, "vtt", tmp_path) == (2, ["[00:01.25]First", "[00:04.00]Second"])
+
+def test_ass(tmp_path):
+    # Only Dialogue events with text, override blocks removed, commas in the text kept
+    assert convert(ASS, "ass", tmp_path) == (1, ["[00:01.50]Hello world, again"])
+
+def test_file_with_bom_and_crlf(tmp_path):
+    subtitle_path = tmp_path / "in.srt"
+    subtitle_path.write_bytes(b"\xef\xbb\xbf" + SRT.replace("\n", "\r\n").encode("utf-8"))
+    assert convert_file_to_lrc(str(subtitle_path), "srt", str(tmp_path / "out.lrc")) == 2
+    assert (tmp_path / "out.lrc").read_text(encoding="utf-8").startswith("[00:01.50]Hello world\n")
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        convert("", "pgs", tmp_path)
+    assert format_lrc_time(59.999) == "01:00.00"
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from videoToAudio import benchmark
+from videoToAudio.fileAnalyzeConvert import process_media
+from videoToAudio.mediaModel import parse_track_list
+from videoToAudio.trackSelection import SelectionPolicy, normalize_language, select_tracks
+
+def make_media():
+    return parse_track_list([
+        {"@type": "General"},
+        {"@type": "Audio", "Format": "AAC", "Language": "en", "Default": "Yes", "Channels": "2", "BitRate": "128000"},
+        {"@type": "Audio", "Format": "AC-3", "Language": "en", "Channels": "6", "BitRate": "448000"},
+        {"@type": "Audio", "Format": "MPEG Audio", "Format_Profile": "Layer 3", "Language": "ja", "Channels": "2"},
+        {"@type": "Audio", "Format": "Opus", "Language": "en", "Channels": "2", "Title": "Director's Commentary"},
+        {"@type": "Audio", "Format": "DTS", "Channels": "6"},
+        {"@type": "Text", "Format": "UTF-8", "Language": "en", "Forced": "Yes"},
+        {"@type": "Text", "Format": "PGS", "Language": "ja"},
+    ])
+
+def selected_orders(media, policy):
+    audio, text, skipped = select_tracks(media, policy)
+    assert len(audio) + len(text) + len(skipped) == len(media.audio) + len(media.text)
+    return [track.type_order for track in audio], [track.type_order for track in text]
+
+def test_normalize_language():
+    assert normalize_language("en-US") == normalize_language("EN") == normalize_language("eng") == "en"
+    assert normalize_language("und") is None and normalize_language("") is None
+
+def test_default_policy_selects_every_track():
+    media = make_media()
+    assert selected_orders(media, None) == ([1, 2, 3, 4, 5], [1, 2])
+
+def test_language_and_subtitle_rules():
+    media = make_media()
+    assert selected_orders(media, SelectionPolicy(languages=["eng"])) == ([1, 2, 4, 5], [1])
+    assert selected_orders(media, SelectionPolicy(languages=["en"], keep_unknown_language=False)) == ([1, 2, 4], [1])
+    assert selected_orders(media, SelectionPolicy(subtitle_languages=["ja"], forced_subtitles="exclude")) == ([1, 2, 3, 4, 5], [2])
+    assert selected_orders(media, SelectionPolicy(lrc_subtitles_only=True)) == ([1, 2, 3, 4, 5], [1])
+
+def test_audio_rules():
+    media = make_media()
+    assert selected_orders(media, SelectionPolicy(default_audio_only=True))[0] == [1]
+    assert selected_orders(media, SelectionPolicy(min_channels=6))[0] == [2, 5]
+    assert selected_orders(media, SelectionPolicy(skip_commentary=True))[0] == [1, 2, 3, 5]
+    # The 5.1 AC-3 track is the best English track, the untagged DTS track is in a language of its own
+    assert selected_orders(media, SelectionPolicy(best_per_language=True))[0] == [2, 3, 5]
+
+def test_audio_codecs_accept_ffmpeg_names():
+    media = make_media()
+    assert selected_orders(media, SelectionPolicy(audio_codecs=["mp3", "ac3", "dts"]))[0] == [2, 3, 5]
+    assert selected_orders(media, SelectionPolicy(audio_codecs=["mpeg audio", "opus"]))[0] == [3, 4]
+    assert selected_orders(media, SelectionPolicy(audio_codecs=["mp2", "eac3"]))[0] == []
+
+@pytest.mark.skipif(os.name == 'nt', reason="the fake tools are scripts")
+def test_output_names_do_not_depend_on_the_selection(tmp_path, monkeypatch):
+    benchmark.write_fake_tools(str(tmp_path))
+    monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ.get("PATH", ""))
+    (tmp_path / "a.mkv").write_bytes(b"\0" * 100)
+    (tmp_path / "out").mkdir()
+    media = make_media()
+    summary = process_media(media, str(tmp_path / "a.mkv"), "a", "copy", str(tmp_path / "out"),
+                            selection=SelectionPolicy(audio_codecs=["ac3"], subtitle_languages=["fr"]))
+    # One of five tracks is selected, it keeps the name it has when every track is extracted
+    assert [os.path.basename(audio.output_filename) for audio in summary.audio_info_list] == ["a_track1.mp3"]
+    assert os.path.exists(summary.audio_info_list[0].output_filename)
@@ -0,0 +1,39 @@
+from videoToAudio.verifyFileExtension import mpeg_audio_frame, mpeg_audio_sync, sniff_container
+
+# MPEG-1 Layer III, 128 kbit/s, 44100 Hz, no padding: 144 * 128000 // 44100 = 417 bytes
+MP3_HEADER = bytes([0xFF, 0xFB, 0x90, 0x64])
+MP3_FRAME = MP3_HEADER + b"\0" * 413
+# MPEG-1 Layer II, 192 kbit/s, 48000 Hz: 144 * 192000 // 48000 = 576 bytes
+MP2_FRAME = bytes([0xFF, 0xFD, 0xA4, 0x04]) + b"\0" * 572
+
+def adts_frame(length=200):
+    # AAC LC, 44100 Hz, stereo, no CRC
+    header = bytes([0xFF, 0xF1, 0x50, 0x80 | (length >> 11), (length >> 3) & 0xFF, (length & 0x07) << 5 | 0x1F, 0xFC])
+    return header + b"\0" * (length - len(header))
+
+def test_frame_lengths():
+    assert mpeg_audio_frame(MP3_FRAME)[:2] == ("mp3", 417)
+    assert mpeg_audio_frame(MP2_FRAME)[:2] == ("mp3", 576)
+    assert mpeg_audio_frame(adts_frame())[:2] == ("aac", 200)
+
+def test_two_consecutive_frames_are_needed():
+    assert mpeg_audio_sync(MP3_FRAME * 2) == "mp3"
+    assert mpeg_audio_sync(MP2_FRAME * 2) == "mp3"
+    assert mpeg_audio_sync(adts_frame() * 2) == "aac"
+    assert mpeg_audio_sync(MP3_FRAME) == "mp3"  # The data ends before a second header could start
+    assert mpeg_audio_sync(MP3_FRAME + b"\0" * 10) is None
+    assert mpeg_audio_sync(MP3_FRAME + MP2_FRAME) is None  # Another stream
+
+def test_reserved_fields_are_rejected():
+    assert mpeg_audio_frame(bytes([0xFF, 0xFB, 0xF0, 0x64])) is None  # Bit rate index 15
+    assert mpeg_audio_frame(bytes([0xFF, 0xFB, 0x0C, 0x64])) is None  # Free format, reserved sampling rate
+    assert mpeg_audio_frame(bytes([0xFF, 0xEB, 0x90, 0x64])) is None  # Reserved version
+    assert mpeg_audio_frame(bytes([0xFF, 0xF9, 0x90, 0x64])) is None  # Reserved layer
+
+def test_utf16_text_is_not_audio(tmp_path):
+    text_file = tmp_path / "notes.mp3"
+    text_file.write_bytes("﻿hello world text file\n".encode("utf-16-le") * 50)
+    assert sniff_container(str(text_file)) == (None, "not a known audio or video container")
+    audio_file = tmp_path / "audio.mp3"
+    audio_file.write_bytes(MP3_FRAME * 20)
+    assert sniff_container(str(audio_file)) == ("mp3", None)
@@ -0,0 +1,27 @@
+import os
+
+from videoToAudio.watchFolder import is_output_path
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb'):
+        pass
+    return path
+
+def test_outputs_in_the_watched_tree_are_recognized(tmp_path):
+    directory = os.path.realpath(tmp_path)
+    source = touch(os.path.join(directory, "show", "a.mkv"))
+    output = touch(os.path.join(directory, "show", "a_mkv", "a.m4a"))
+    assert not is_output_path(source, directory, directory)
+    assert is_output_path(output, directory, directory)
+    # A folder that only looks like an output folder holds inputs
+    unrelated = touch(os.path.join(directory, "b_mkv", "c.mp4"))
+    assert not is_output_path(unrelated, directory, directory)
+
+def test_output_root_inside_the_watched_tree_is_skipped(tmp_path):
+    directory = os.path.realpath(tmp_path)
+    output_root = os.path.join(directory, "out")
+    assert is_output_path(touch(os.path.join(output_root, "a_mkv", "a.mp3")), directory, output_root)
+    assert not is_output_path(touch(os.path.join(directory, "a.mkv")), directory, output_root)
+    # Outputs outside of the watched tree never show up in it
+    assert not is_output_path(touch(os.path.join(directory, "a.mp4")), directory, os.path.dirname(directory))
@@ -0,0 +1,15 @@
+"""
+Extract audio, subtitles and cover images from video files.
+
+Use convert(path, options) to process a single file in-process.
+"""
+
+__all__ = ["ConversionError", "ConvertOptions", "ConvertResult", "convert"]
+
+def __getattr__(name):
+    # The pipeline is imported on first use, so "python -m videoToAudio.<module>" does not import that module
+    # through the package before running it (runpy warns about it)
+    if name in __all__:
+        from videoToAudio import pipeline
+        return getattr(pipeline, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,162 @@
+import os
+import sys
+import copy
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+if __package__ in (None, ""):
+    # Run as "python videoToAudio/batchProcess.py": the package is imported from the folder above this file
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from videoToAudio import fileAnalyzeConvert, instrumentation, pipeline
+from videoToAudio.verifyFileExtension import has_media_extension, sniff_container
+
+# Default number of worker processes and concurrent FFmpeg extractions
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_MAX_ENCODES = 2
+
+def find_video_files(directory, sniff=True):
+    """
+    Function to recursively collect every video (or audio) file under a directory, in a stable order.
+
+    Files are picked by extension, then their container signature is checked
+    when sniff is set, so mislabeled, truncated and non-media files are skipped
+    without starting MediaInfo or FFmpeg for them.
+    """
+    video_files = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()  # Walk sub-directories in a predictable order
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            if not has_media_extension(file_path):
+                continue
+            if sniff:
+                container, problem = sniff_container(file_path)
+                if problem:
+                    print(f"Skipping {file_path}: {problem}")
+                    continue
+            video_files.append(file_path)
+    return video_files
+
+def output_directory_for(file_path, directory, output_root):
+    """
+    Function to choose the output folder of a file: the input tree mirrored under output_root, one folder per file.
+
+    The extension is kept in the folder name ("a.mkv" -> "a_mkv"), so "a.mkv"
+    and "a.mp4" in the same folder get their own outputs. The folder never has
+    the name of the input file itself, also when output_root is the input directory.
+    """
+    relative_path = os.path.relpath(file_path, directory)
+    stem, extension = os.path.splitext(relative_path)
+    return os.path.join(output_root, f"{stem}_{extension.lstrip('.')}" if extension else f"{stem}_out")
+
+def assign_output_directories(video_files, directory, output_root):
+    """
+    Function to map every file to its output folder, returns (dict of file -> folder, list of (file, error)).
+
+    Two files that would share a folder (e.g. "A.mkv" and "a.mkv" on a case-insensitive
+    file system) would overwrite each other's outputs from parallel workers, the later one is rejected.
+    """
+    output_dirs = {}
+    owners = {}
+    clashes = []
+    for file_path in video_files:
+        output_dir = output_directory_for(file_path, directory, output_root)
+        key = os.path.normcase(output_dir)
+        if key in owners:
+            clashes.append((file_path, f"Output folder {output_dir} is already used by {owners[key]}"))
+            continue
+        owners[key] = file_path
+        output_dirs[file_path] = output_dir
+    return output_dirs, clashes
+
+def init_worker(semaphore):
+    # Runs once in every worker process: share the FFmpeg encode limit between all workers
+    fileAnalyzeConvert.set_encode_slots(semaphore)
+
+def process_file(file_path, output_dir, options):
+    """
+    Function run inside a worker process to analyze and convert one file.
+
+    Returns the pipeline.ConvertResult of the file.
+    """
+    # Tools were checked by the caller and files were filtered by signature while scanning
+    options = copy.copy(options)
+    options.output_dir = output_dir
+    options.check_tools = False
+    options.verify_extension = False
+    try:
+        return pipeline.convert(file_path, options)
+    except Exception as e:
+        # Unexpected errors must not take the whole batch down
+        result = pipeline.ConvertResult(file_path)
+        result.error = str(e)
+        return result
+
+def process_directory(directory, workers=DEFAULT_WORKERS, max_encodes=DEFAULT_MAX_ENCODES,
+                      output_root=".", options=None, metrics_jsonl=None, metrics_prometheus=None):
+    """
+    Function to process every video file under a directory with a pool of worker processes.
+
+    Analysis runs on all workers at once, while at most max_encodes FFmpeg
+    extractions run at the same time. options is the pipeline.ConvertOptions
+    shared by every file. The stage metrics of all files are written to
+    metrics_jsonl / metrics_prometheus when given and summarized at the end.
+    Returns the list of files that failed.
+    """
+    options = options or pipeline.ConvertOptions()
+    directory = os.path.abspath(directory)
+    output_root = os.path.abspath(output_root)
+
+    video_files = find_video_files(directory)
+    if not video_files:
+        print(f"No video files found in '{directory}'.")
+        return []
+
+    output_dirs, clashes = assign_output_directories(video_files, directory, output_root)
+    workers = max(1, min(workers, len(video_files)))
+    print(f"Processing {len(video_files)} video file(s) with {workers} worker(s), at most {max_encodes} concurrent encode(s).")
+
+    semaphore = multiprocessing.BoundedSemaphore(max(1, max_encodes))
+    failed = []
+    results = []
+    for file_path, error in clashes:
+        print(f"[FAILED] {file_path}: {error}")
+        failed.append(file_path)
+        result = pipeline.ConvertResult(file_path)
+        result.error = error
+        results.append(result)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(semaphore,)) as executor:
+        futures = [
+            executor.submit(process_file, file_path, output_dirs[file_path], options)
+            for file_path in video_files if file_path in output_dirs
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result.success:
+                print(f"[OK] {result.input_path}: done in {result.elapsed:.1f}s")
+            else:
+                print(f"[FAILED] {result.input_path}: {result.error}")
+                failed.append(result.input_path)
+
+    print(f"\nBatch finished: {len(video_files) - len(failed)} succeeded, {len(failed)} failed.")
+    linked_bytes = sum(result.dedup_linked_bytes for result in results)
+    copied_bytes = sum(result.dedup_copied_bytes for result in results)
+    if linked_bytes or copied_bytes:
+        print(f"Duplicates reused: {linked_bytes / (1024 * 1024):.1f} MiB of disk space saved by links, "
+              f"{copied_bytes / (1024 * 1024):.1f} MiB copied instead of re-encoded.")
+    instrumentation.report(results, metrics_jsonl, metrics_prometheus)
+    return failed
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python -m videoToAudio.batchProcess <directory>")
+        sys.exit(1)
+
+    failed = process_directory(sys.argv[1])
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Benchmark of the planning stages over the bundled sample*.json MediaInfo dumps.
+
+Every fixture goes through the same stages as a real conversion: decoding the
+MediaInfo JSON with the streaming reader, building the media model, planning
+the outputs and building the FFmpeg command. Synthetic scenarios scale the fixtures up to thousands of
+tracks per file and thousands of files per batch. The optional end-to-end stage
+runs pipeline.convert() against fake mediainfo/ffmpeg scripts, so everything
+runs offline. The fake ffmpeg writes every output file of its command, so the
+output handling after each run is part of the timing.
+
+Results are compared with a stored baseline and the exit code is 1 when a
+stage got slower than the allowed tolerance. The baseline is kept next to the
+fixtures by default, so it can be committed and checked in CI. It records the
+machine it was measured on, a comparison with another machine is reported as such.
+"""
+import os
+import io
+import sys
+import glob
+import json
+import time
+import platform
+import argparse
+import tempfile
+import contextlib
+
+if __package__ in (None, ""):
+    # Run as "python videoToAudio/benchmark.py": the package is imported from the folder above this file
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from videoToAudio import fileAnalyzeConvert, pipeline
+from videoToAudio.checkVariables import CACHE_DIR_VARIABLE
+from videoToAudio.mediaInfoStream import iter_tracks
+from videoToAudio.mediaModel import parse_track_list
+
+# The sample*.json fixtures live next to main.py, one level above the package
+FIXTURE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILENAME = "benchmark_baseline.json"
+
+STAGES = ["decode", "parse", "plan", "command"]
+DEFAULT_ROUNDS = 5
+DEFAULT_TRACKS = 2000
+DEFAULT_FILES = 10000
+DEFAULT_TOLERANCE = 0.25
+# Differences below this many seconds are timer noise, never a regression
+NOISE_FLOOR = 0.002
+
+# Stand-ins for the real tools used by the end-to-end stage
+FAKE_MEDIAINFO = """#!{python}
+import sys
+# The benchmark input files contain the MediaInfo JSON itself
+with open(sys.argv[-1], 'r') as media_file:
+    sys.stdout.write(media_file.read())
+"""
+FAKE_FFMPEG = """#!{python}
+import sys
+# Writes a few bytes to every output file of the command, like a real run would
+FLAGS = {{"-y", "-nostdin"}}  # Options of the pipeline's commands that take no value
+arguments = sys.argv[1:]
+index = 0
+while index < len(arguments):
+    argument = arguments[index]
+    if argument in FLAGS:
+        index += 1
+    elif argument.startswith("-") and argument != "-":
+        index += 2
+    else:
+        # Every other word is an output, "-" and "pipe:N" are streams read by the caller
+        if argument != "-" and not argument.startswith("pipe:"):
+            with open(argument, 'wb') as output_file:
+                output_file.write(b"fake output")
+        index += 1
+"""
+
+def load_fixtures(directory=FIXTURE_DIRECTORY):
+    """
+    Function to read the sample*.json fixtures, returns a list of (name, json text) in name order.
+    """
+    fixtures = []
+    for fixture_path in sorted(glob.glob(os.path.join(directory, "sample*.json"))):
+        with open(fixture_path, 'r', encoding='utf-8') as fixture_file:
+            fixtures.append((os.path.basename(fixture_path), fixture_file.read()))
+    return fixtures
+
+def scale_fixture(text, track_count):
+    """
+    Function to grow a fixture to about track_count audio and subtitle tracks.
+
+    The existing audio and text tracks are repeated with renumbered type orders,
+    so the scaled file still looks like real MediaInfo output.
+    """
+    data = json.loads(text)
+    tracks = data["media"]["track"]
+    streams = [track for track in tracks if track.get("@type") in ("Audio", "Text")]
+    if not streams:
+        return text
+
+    scaled = [track for track in tracks if track.get("@type") not in ("Audio", "Text")]
+    type_orders = {"Audio": 0, "Text": 0}
+    for index in range(max(track_count, len(streams))):
+        track = dict(streams[index % len(streams)])
+        type_orders[track["@type"]] += 1
+        track["@typeorder"] = str(type_orders[track["@type"]])
+        track["StreamOrder"] = str(len(scaled))
+        scaled.append(track)
+
+    data["media"]["track"] = scaled
+    return json.dumps(data)
+
+def run_stages(texts, timings):
+    """
+    Function to push every JSON text through the planning stages, adding the time of each stage to timings.
+    """
+    for file_number, text in enumerate(texts):
+        start = time.perf_counter()
+        track_list = list(iter_tracks(io.StringIO(text)))
+        decoded = time.perf_counter()
+        media = parse_track_list(track_list)
+        parsed = time.perf_counter()
+        cover_image = fileAnalyzeConvert.plan_outputs(media, f"file{file_number}", output_dir="out")
+        planned = time.perf_counter()
+        # Number the LRC pipes like extract_streams does, without opening any
+        lrc_pipes = {id(subtitle): 3 + index for index, subtitle in enumerate(media.text) if subtitle.lrc_filename}
+        fileAnalyzeConvert.build_extraction_command("input.mkv", media.audio, media.text, cover_image, lrc_pipes)
+        built = time.perf_counter()
+
+        timings["decode"] += decoded - start
+        timings["parse"] += parsed - decoded
+        timings["plan"] += planned - parsed
+        timings["command"] += built - planned
+
+def time_scenario(texts, rounds):
+    # Best of several rounds per stage, the minimum is the least disturbed by other processes
+    best = None
+    for _ in range(rounds):
+        timings = {stage: 0.0 for stage in STAGES}
+        run_stages(texts, timings)
+        best = timings if best is None else {stage: min(best[stage], timings[stage]) for stage in STAGES}
+    return best
+
+def write_fake_tools(directory):
+    # Executable mediainfo/ffmpeg scripts that run with the current Python
+    for name, template in (("mediainfo", FAKE_MEDIAINFO), ("ffmpeg", FAKE_FFMPEG)):
+        script_path = os.path.join(directory, name)
+        with open(script_path, 'w') as script_file:
+            script_file.write(template.format(python=sys.executable))
+        os.chmod(script_path, 0o755)
+
+def time_end_to_end(fixtures, rounds):
+    """
+    Function to time pipeline.convert() for every fixture against fake mediainfo/ffmpeg tools.
+
+    Returns the best total time, or None on Windows where the fake scripts cannot run.
+    """
+    if os.name == 'nt':
+        return None
+
+    saved_environment = {name: os.environ.get(name) for name in ("PATH", CACHE_DIR_VARIABLE)}
+    with tempfile.TemporaryDirectory() as work_directory:
+        tool_directory = os.path.join(work_directory, "bin")
+        os.makedirs(tool_directory)
+        write_fake_tools(tool_directory)
+        input_files = []
+        for name, text in fixtures:
+            input_path = os.path.join(work_directory, os.path.splitext(name)[0] + ".mkv")
+            with open(input_path, 'w', encoding='utf-8') as input_file:
+                input_file.write(text)
+            input_files.append(input_path)
+
+        os.environ["PATH"] = tool_directory + os.pathsep + os.environ.get("PATH", "")
+        os.environ[CACHE_DIR_VARIABLE] = os.path.join(work_directory, "cache")
+        options = pipeline.ConvertOptions(output_dir=os.path.join(work_directory, "out"), check_tools=False,
+                                          verify_extension=False, use_probe_cache=False, use_journal=False)
+        best = None
+        try:
+            for _ in range(rounds):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for input_path in input_files:
+                        result = pipeline.convert(input_path, options)
+                        if not result.success:
+                            raise RuntimeError(f"End-to-end benchmark failed for {input_path}: {result.error}")
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+        finally:
+            for name, value in saved_environment.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+    return best
+
+def run_benchmark(fixtures, rounds=DEFAULT_ROUNDS, track_count=DEFAULT_TRACKS, file_count=DEFAULT_FILES, end_to_end=False):
+    """
+    Function to run every scenario, returns a dict of scenario -> stage -> seconds.
+    """
+    texts = [text for name, text in fixtures]
+    results = {}
+
+    results["fixtures"] = time_scenario(texts, rounds)
+    results["many_tracks"] = time_scenario([scale_fixture(text, track_count) for text in texts], rounds)
+    results["many_files"] = time_scenario([texts[index % len(texts)] for index in range(file_count)], rounds)
+    if end_to_end:
+        elapsed = time_end_to_end(fixtures, rounds)
+        if elapsed is not None:
+            results["end_to_end"] = {"convert": elapsed}
+
+    return results
+
+def machine_description():
+    # Where the timings were taken, stored with the baseline
+    return {"machine": platform.machine(), "processor": platform.processor(), "cpu_count": os.cpu_count(),
+            "system": platform.system(), "python": platform.python_version()}
+
+def compare_with_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Function to print every stage next to its baseline time, returns the list of regressed "scenario/stage" names.
+    """
+    regressions = []
+    print(f"{'stage':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for scenario, stages in results.items():
+        for stage, seconds in stages.items():
+            name = f"{scenario}/{stage}"
+            reference = baseline.get(scenario, {}).get(stage)
+            if reference is None:
+                print(f"{name:<24}{'-':>12}{seconds:>12.4f}{'new':>10}")
+                continue
+            change = (seconds - reference) / reference * 100 if reference else 0.0
+            regressed = seconds > reference * (1 + tolerance) and seconds - reference > NOISE_FLOOR
+            if regressed:
+                regressions.append(name)
+            print(f"{name:<24}{reference:>12.4f}{seconds:>12.4f}{change:>+9.1f}%{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def print_results(results):
+    print(f"{'stage':<24}{'seconds':>12}")
+    for scenario, stages in results.items():
+        for stage, seconds in stages.items():
+            print(f"{scenario + '/' + stage:<24}{seconds:>12.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m videoToAudio.benchmark",
+                                     description="Time the planning stages over the sample*.json fixtures.")
+    parser.add_argument("--fixtures", default=FIXTURE_DIRECTORY, help="directory containing the sample*.json files")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="rounds per scenario, the best one is kept")
+    parser.add_argument("--tracks", type=int, default=DEFAULT_TRACKS, help="tracks per file in the many_tracks scenario")
+    parser.add_argument("--files", type=int, default=DEFAULT_FILES, help="files in the many_files scenario")
+    parser.add_argument("--end-to-end", action="store_true", help="also time pipeline.convert() with fake mediainfo/ffmpeg")
+    parser.add_argument("--baseline", default=None, help=f"baseline JSON file (default: {BASELINE_FILENAME} next to the fixtures)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown before a stage counts as a regression")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No sample*.json fixtures found in {args.fixtures}")
+        sys.exit(1)
+
+    print(f"Benchmarking {len(fixtures)} fixture(s), best of {args.rounds} round(s)")
+    results = run_benchmark(fixtures, args.rounds, args.tracks, args.files, args.end_to_end)
+    baseline_path = args.baseline or os.path.join(args.fixtures, BASELINE_FILENAME)
+
+    if args.save_baseline:
+        print_results(results)
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        with open(baseline_path, 'w') as baseline_file:
+            json.dump({"machine": machine_description(), "results": results}, baseline_file, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return
+
+    try:
+        with open(baseline_path, 'r') as baseline_file:
+            saved = json.load(baseline_file)
+        baseline = saved["results"]
+    except (OSError, ValueError, KeyError, TypeError):
+        print_results(results)
+        print(f"No baseline at {baseline_path}, run with --save-baseline to store one.")
+        return
+
+    if saved.get("machine") != machine_description():
+        print(f"The baseline was measured on another machine ({saved.get('machine')}), differences may not be regressions.")
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions (more than {args.tolerance:.0%} slower): {', '.join(regressions)}")
+        sys.exit(1)
+    print("No regressions.")
+
+if __name__ == "__main__":
+    main()
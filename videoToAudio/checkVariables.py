@@ -1,29 +1,192 @@
 import os
 import sys
+import json
 import subprocess
 
+# Arguments that make each tool print its version; tools not listed here use "--version"
+VERSION_ARGUMENTS = {
+    "ffmpeg": ["-version"],
+    "ffprobe": ["-version"],
+    "magick": ["-version"],
+    "mediainfo": ["--Version"],
+}
+
+# Environment variable that overrides where the tool cache is stored
+CACHE_DIR_VARIABLE = "VIDEOTOAUDIO_CACHE_DIR"
+TOOL_CACHE_FILENAME = "tools.json"
+
+# Tools already discovered by this process, keyed by command word (reset when PATH changes)
+discovered_tools = {}
+discovered_for_path = None
+
+class ToolInfo:
+    def __init__(self, path, mtime_ns, version=None):
+        self.path = path  # Absolute path of the executable
+        self.mtime_ns = mtime_ns  # Modification time of the executable, used to invalidate the cache
+        self.version = version  # First line of the tool's version output
+
+    def to_dict(self):
+        return {"path": self.path, "mtime_ns": self.mtime_ns, "version": self.version}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["path"], data["mtime_ns"], data.get("version"))
+
+def cache_directory():
+    """
+    Function to return the directory used for the videoToAudio caches.
+    """
+    if os.environ.get(CACHE_DIR_VARIABLE):
+        return os.environ[CACHE_DIR_VARIABLE]
+    if os.name == 'nt':  # Windows
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:  # Unix-like (Linux, macOS)
+        base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "videoToAudio")
+
+def executable_names(command):
+    # Windows looks for command.exe, command.bat, ... while Unix only uses the bare name
+    if os.name == 'nt':
+        extensions = os.environ.get("PATHEXT", ".COM;.EXE;.BAT;.CMD").lower().split(os.pathsep)
+        return [command.lower()] + [command.lower() + extension for extension in extensions if extension]
+    return [command]
+
+def scan_path(command_words):
+    """
+    Function to resolve several commands with a single pass over the PATH directories.
+
+    Each directory is listed once instead of forking 'which'/'where' for every command.
+    Returns a dict of command word -> absolute path for the commands that were found.
+    """
+    remaining = list(command_words)
+    found = {}
+
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        if not directory or not remaining:
+            continue
+        try:
+            entries = os.listdir(directory)
+        except OSError:
+            continue  # Missing or unreadable PATH entries are skipped, like the shell does
+        if os.name == 'nt':
+            entries = {entry.lower(): entry for entry in entries}
+        else:
+            entries = {entry: entry for entry in entries}
+
+        for command in list(remaining):
+            for name in executable_names(command):
+                if name not in entries:
+                    continue
+                full_path = os.path.join(directory, entries[name])
+                if os.path.isfile(full_path) and os.access(full_path, os.X_OK):
+                    found[command] = full_path
+                    remaining.remove(command)
+                    break
+
+    return found
+
+def read_tool_version(command, path):
+    # Run the tool once to record its version, failures only leave the version empty
+    arguments = VERSION_ARGUMENTS.get(command, ["--version"])
+    try:
+        result = subprocess.run([path] + arguments, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                stdin=subprocess.DEVNULL, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    for line in result.stdout.decode("utf-8", errors="replace").splitlines():
+        if line.strip():
+            return line.strip()
+    return None
+
+def load_tool_cache(path_value):
+    # Read the cached tools for this PATH value, an unreadable cache is simply ignored
+    try:
+        with open(os.path.join(cache_directory(), TOOL_CACHE_FILENAME), 'r') as cache_file:
+            data = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    if data.get("path") != path_value:
+        return {}
+    try:
+        return {command: ToolInfo.from_dict(info) for command, info in data.get("tools", {}).items()}
+    except (KeyError, TypeError):
+        return {}
+
+def save_tool_cache(path_value, tools):
+    # Write the cache atomically so concurrent batch workers never read a half-written file
+    directory = cache_directory()
+    cache_path = os.path.join(directory, TOOL_CACHE_FILENAME)
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(temporary_path, 'w') as cache_file:
+            json.dump({"path": path_value, "tools": {command: info.to_dict() for command, info in tools.items()}}, cache_file, indent=2)
+        os.replace(temporary_path, cache_path)
+    except OSError as e:
+        print(f"Could not write the tool cache {cache_path}: {e}")
+
+def is_cache_entry_valid(info):
+    # A cached tool stays valid while its executable exists with the same modification time
+    try:
+        return os.stat(info.path).st_mtime_ns == info.mtime_ns
+    except OSError:
+        return False
+
+def discover_tools(command_words):
+    """
+    Function to find the given commands, using the in-process and on-disk caches when possible.
+
+    The on-disk cache is keyed on the PATH value and the modification time of each
+    executable, so repeated runs and batch workers skip the PATH scan and version
+    checks entirely. Returns a dict of command word -> ToolInfo, or None when missing.
+    """
+    global discovered_for_path
+    path_value = os.environ.get("PATH", "")
+    if discovered_for_path != path_value:
+        discovered_tools.clear()
+        discovered_for_path = path_value
+
+    if all(command in discovered_tools for command in command_words):
+        return {command: discovered_tools[command] for command in command_words}
+
+    cached = load_tool_cache(path_value)
+    tools = {command: info for command, info in cached.items() if is_cache_entry_valid(info)}
+
+    unknown = [command for command in command_words if command not in tools]
+    if unknown:
+        found = scan_path(unknown)
+        for command, full_path in found.items():
+            tools[command] = ToolInfo(full_path, os.stat(full_path).st_mtime_ns, read_tool_version(command, full_path))
+        # Only found tools are cached, missing ones are looked up again next time in case they get installed
+        if found or len(tools) != len(cached):
+            save_tool_cache(path_value, tools)
+
+    for command in command_words:
+        if command in tools:
+            discovered_tools[command] = tools[command]
+    return {command: tools.get(command) for command in command_words}
+
+def tool_path(command):
+    # Absolute path of a command, falls back to the bare name and lets the OS report it missing
+    info = discover_tools([command])[command]
+    return info.path if info else command
+
 def check_command_in_shell(command):
     """
     Check if a command exists in the shell (works on both Unix and Windows).
-    Uses 'which' for Unix-based systems and 'where' for Windows.
+    Resolves the command in-process from PATH (and PATHEXT on Windows).
     """
-    try:
-        # Use 'which' on Unix-like systems and 'where' on Windows to check if the command exists
-        if os.name == 'nt':  # Windows
-            subprocess.run(['where', command], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        else:  # Unix-like (Linux, macOS)
-            subprocess.run(['which', command], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        return True  # Command found
-    except subprocess.CalledProcessError:
-        return False  # Command not found
+    return discover_tools([command])[command] is not None
 
-def check_env_and_shell(command_words):
-    shell_missing = []
+def find_missing_commands(command_words):
+    # Return the command words that cannot be found in the shell, without printing or exiting
+    tools = discover_tools(command_words)
+    return [word for word in command_words if tools[word] is None]
 
-    for word in command_words:
-        # Check if the command exists in the shell using 'which' or 'where'
-        if not check_command_in_shell(word):
-            shell_missing.append(word)
+def check_env_and_shell(command_words):
+    # Check if each command exists in the shell
+    tools = discover_tools(command_words)
+    shell_missing = [word for word in command_words if tools[word] is None]
 
     print()  # Blank line to separate sections
 
@@ -36,6 +199,8 @@ def check_env_and_shell(command_words):
         sys.exit(1)  # Exit if any command is missing from the shell
     else:
         print("All shell commands are available.")
+        for word in command_words:
+            print(f"{word}: {tools[word].path} ({tools[word].version or 'unknown version'})")
 
 def main():
     if len(sys.argv) > 1:
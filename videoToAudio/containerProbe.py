@@ -0,0 +1,853 @@
+"""
+Native probe backend: reads the track list of Matroska/WebM and MP4 files from their headers.
+
+Only the elements that describe the tracks are read, with ranged reads: the
+EBML header, SeekHead, Info, Tracks, Attachments and Tags of a Matroska file,
+and the "moov" box of an MP4 file. Cluster and "mdat" payloads are skipped by
+their sizes, so a probe costs a few small reads instead of a MediaInfo process
+scanning the file. The result uses the MediaInfo track list layout (same keys,
+same string values), so it feeds the same media model as the other backends.
+
+Other containers return None, malformed headers raise ValueError; mediaProbe
+falls back to MediaInfo in both cases.
+"""
+import os
+import sys
+import json
+import struct
+from array import array
+
+if __package__ in (None, ""):
+    # Run as "python videoToAudio/containerProbe.py": the package is imported from the folder above this file
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from videoToAudio.mediaInfoStream import iter_tracks
+from videoToAudio.mediaModel import LANGUAGE_ALIASES, parse_track_list
+from videoToAudio.remoteInput import open_input
+from videoToAudio.verifyFileExtension import EBML_MAGIC, QUICKTIME_BOXES, read_ebml_number
+
+# Largest header element (or "moov" box) read into memory, anything larger is not a header
+MAX_HEADER_BYTES = 64 * 1024 * 1024
+# Attachment fields other than the file data are read only up to this size
+MAX_ATTACHMENT_FIELD = 64 * 1024
+
+# Matroska element ids
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+INFO = 0x1549A966
+TIMESTAMP_SCALE = 0x2AD7B1
+SEGMENT_DURATION = 0x4489
+SEGMENT_TITLE = 0x7BA9
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_UID = 0x73C5
+TRACK_TYPE = 0x83
+FLAG_DEFAULT = 0x88
+FLAG_FORCED = 0x55AA
+TRACK_NAME = 0x536E
+TRACK_LANGUAGE = 0x22B59C
+TRACK_LANGUAGE_BCP47 = 0x22B59D
+CODEC_ID = 0x86
+CODEC_PRIVATE = 0x63A2
+AUDIO = 0xE1
+SAMPLING_FREQUENCY = 0xB5
+OUTPUT_SAMPLING_FREQUENCY = 0x78B5
+CHANNELS = 0x9F
+ATTACHMENTS = 0x1941A469
+ATTACHED_FILE = 0x61A7
+FILE_NAME = 0x466E
+FILE_MIME_TYPE = 0x4660
+FILE_DATA = 0x465C
+TAGS = 0x1254C367
+TAG = 0x7373
+TARGETS = 0x63C0
+TAG_TRACK_UID = 0x63C5
+SIMPLE_TAG = 0x67C8
+TAG_NAME = 0x45A3
+TAG_STRING = 0x4487
+CLUSTER = 0x1F43B675
+
+# Top-level Matroska elements the probe reads
+MATROSKA_HEADER_ELEMENTS = (INFO, TRACKS, ATTACHMENTS, TAGS)
+
+# Matroska TrackType values translated to MediaInfo track types
+MATROSKA_TRACK_TYPES = {1: "Video", 2: "Audio", 17: "Text"}
+
+# Matroska CodecID prefixes translated to MediaInfo "Format" values, longest prefix first
+MATROSKA_FORMATS = [
+    ("A_AAC", "AAC"),
+    ("A_OPUS", "Opus"),
+    ("A_VORBIS", "Vorbis"),
+    ("A_FLAC", "FLAC"),
+    ("A_MPEG/L3", "MPEG Audio"),
+    ("A_MPEG/L2", "MPEG Audio"),
+    ("A_MPEG/L1", "MPEG Audio"),
+    ("A_EAC3", "E-AC-3"),
+    ("A_AC3", "AC-3"),
+    ("A_DTS", "DTS"),
+    ("A_TRUEHD", "MLP FBA"),
+    ("A_ALAC", "ALAC"),
+    ("A_PCM", "PCM"),
+    ("V_MPEG4/ISO/AVC", "AVC"),
+    ("V_MPEGH/ISO/HEVC", "HEVC"),
+    ("V_VP9", "VP9"),
+    ("V_VP8", "VP8"),
+    ("V_AV1", "AV1"),
+    ("S_TEXT/UTF8", "UTF-8"),
+    ("S_TEXT/ASS", "ASS"),
+    ("S_TEXT/SSA", "SSA"),
+    ("S_ASS", "ASS"),
+    ("S_SSA", "SSA"),
+    ("D_WEBVTT", "WebVTT"),
+    ("S_HDMV/PGS", "PGS"),
+    ("S_VOBSUB", "VobSub"),
+    ("S_DVBSUB", "DVB Subtitle"),
+]
+
+# MediaInfo "Format_Profile" of the MPEG audio codec ids, an .mp3 output can only take Layer 3
+MATROSKA_PROFILES = {"A_MPEG/L3": "Layer 3", "A_MPEG/L2": "Layer 2", "A_MPEG/L1": "Layer 1"}
+# Layer bits of an MPEG audio frame header (0 is reserved)
+MPEG_AUDIO_LAYERS = {1: "Layer 3", 2: "Layer 2", 3: "Layer 1"}
+
+# MP4 handler types translated to MediaInfo track types
+MP4_TRACK_TYPES = {b"vide": "Video", b"soun": "Audio", b"sbtl": "Text", b"subt": "Text", b"text": "Text"}
+
+# MP4 sample entry types translated to MediaInfo "Format" values ("mp4a" depends on its object type)
+MP4_FORMATS = {
+    b"Opus": "Opus", b"fLaC": "FLAC", b"ac-3": "AC-3", b"ec-3": "E-AC-3", b"alac": "ALAC", b".mp3": "MPEG Audio",
+    b"sowt": "PCM", b"twos": "PCM", b"lpcm": "PCM", b"in24": "PCM", b"in32": "PCM", b"fl32": "PCM", b"fl64": "PCM",
+    b"dtsc": "DTS", b"dtsh": "DTS", b"dtsl": "DTS", b"mlpa": "MLP FBA", b"samr": "AMR",
+    b"avc1": "AVC", b"avc3": "AVC", b"hvc1": "HEVC", b"hev1": "HEVC", b"av01": "AV1", b"vp09": "VP9",
+    b"tx3g": "Timed Text", b"wvtt": "WebVTT", b"stpp": "TTML", b"c608": "EIA-608",
+}
+
+# MPEG-4 object type indications of "mp4a" sample entries
+MP4A_FORMATS = {
+    0x40: "AAC", 0x66: "AAC", 0x67: "AAC", 0x68: "AAC", 0x69: "MPEG Audio", 0x6B: "MPEG Audio",
+    0xA5: "AC-3", 0xA6: "E-AC-3", 0xA9: "DTS", 0xAD: "Opus", 0xDD: "Vorbis",
+}
+
+# Handler names muxers write by default, MediaInfo does not report them as track titles
+GENERIC_HANDLER_NAMES = {"", "SoundHandler", "VideoHandler", "SubtitleHandler", "DataHandler", "TextHandler",
+                         "Core Media Audio", "Core Media Video", "Core Media Text"}
+
+# Matroska tags written by mkvmerge and FFmpeg with per-track statistics, as MediaInfo track fields
+STATISTICS_TAGS = {"BPS": "BitRate", "NUMBER_OF_BYTES": "StreamSize"}
+
+class RangeReader:
+    """
+    Random access to a file by (offset, size) reads, the only access the probe needs.
+    """
+
+    def __init__(self, media_file, size=None):
+        self.media_file = media_file  # Binary file object opened for reading, a local or remote file
+        self.size = size if size is not None else media_file.seek(0, os.SEEK_END)  # Size of the file in bytes
+        self.reads = 0  # Number of reads, to see how little of the file a probe touches
+        self.bytes_read = 0  # Bytes read by the probe
+
+    def read(self, offset, size):
+        # Bytes at offset, fewer at the end of the file
+        self.media_file.seek(offset)
+        data = self.media_file.read(size)
+        self.reads += 1
+        self.bytes_read += len(data)
+        return data
+
+def language_code(language):
+    # MediaInfo reports ISO 639-2 codes as ISO 639-1 and leaves out undetermined languages
+    if not language or language == "und":
+        return None
+    return LANGUAGE_ALIASES.get(language, language)
+
+def yes_no(value):
+    return "Yes" if value else "No"
+
+def set_type_orders(tracks):
+    # Number the tracks of each type like MediaInfo: "@typeorder" only when a type has more than one track
+    counts = {}
+    for track in tracks[1:]:
+        counts[track["@type"]] = counts.get(track["@type"], 0) + 1
+    seen = {}
+    for index, track in enumerate(tracks[1:], 1):
+        seen[track["@type"]] = seen.get(track["@type"], 0) + 1
+        if counts[track["@type"]] > 1:
+            tracks[index] = {"@type": track["@type"], "@typeorder": str(seen[track["@type"]]), **track}
+    for track_type in ("Video", "Audio", "Text"):
+        if counts.get(track_type):
+            tracks[0][f"{track_type}Count"] = str(counts[track_type])
+
+# --- Matroska ---
+
+def element_header(reader, position):
+    # (id, data position, size) of the element at position, size -1 when unknown
+    data = reader.read(position, 12)
+    element_id, offset = read_ebml_number(data, 0, True)
+    size, offset = read_ebml_number(data, offset, False)
+    if element_id is None or size is None:
+        raise ValueError(f"Damaged Matroska element at byte {position}")
+    return element_id, position + offset, size
+
+def ebml_children(data, start=0, end=None):
+    """
+    Function to yield (id, data start, data end) of the EBML elements between start and end of a buffer.
+    """
+    end = len(data) if end is None else end
+    position = start
+    while position < end:
+        element_id, position = read_ebml_number(data, position, True)
+        size, position = read_ebml_number(data, position, False)
+        if element_id is None or size is None:
+            raise ValueError("Damaged Matroska element")
+        element_end = end if size < 0 else position + size
+        if element_end > end:
+            raise ValueError("Matroska element runs past its parent")
+        yield element_id, position, element_end
+        position = element_end
+
+def ebml_uint(data, start, end):
+    return int.from_bytes(data[start:end], "big")
+
+def ebml_float(data, start, end):
+    if end - start == 4:
+        return struct.unpack(">f", data[start:end])[0]
+    if end - start == 8:
+        return struct.unpack(">d", data[start:end])[0]
+    return 0.0
+
+def ebml_string(data, start, end):
+    return data[start:end].rstrip(b"\0").decode("utf-8", errors="replace")
+
+def read_seek_head(reader, segment_start, position, size, positions):
+    # Add the positions of the elements listed in a SeekHead to positions
+    data = reader.read(position, min(size, MAX_HEADER_BYTES))
+    for element_id, start, end in ebml_children(data):
+        if element_id != SEEK:
+            continue
+        seek_id, seek_position = None, None
+        for child_id, child_start, child_end in ebml_children(data, start, end):
+            if child_id == SEEK_ID:
+                seek_id = ebml_uint(data, child_start, child_end)
+            elif child_id == SEEK_POSITION:
+                seek_position = ebml_uint(data, child_start, child_end)
+        if seek_id is not None and seek_position is not None:
+            positions.setdefault(seek_id, []).append(segment_start + seek_position)
+
+def find_matroska_elements(reader):
+    """
+    Function to locate the top-level header elements of a Matroska file.
+
+    The elements before the first Cluster are walked by their headers, elements
+    stored after the clusters (Tags usually are) are found through the SeekHead.
+    Returns (doc type, {element id: (data position, size)}).
+    """
+    header = reader.read(0, 64)
+    if not header.startswith(EBML_MAGIC):
+        raise ValueError("Not a Matroska file")
+    doc_type = "matroska"
+    header_size, header_start = read_ebml_number(header, 4, False)
+    if header_size is None or header_size < 0:
+        raise ValueError("Damaged EBML header")
+    header = reader.read(0, header_start + header_size)
+    for element_id, start, end in ebml_children(header, header_start):
+        if element_id == 0x4282:  # DocType
+            doc_type = ebml_string(header, start, end)
+
+    segment_id, segment_start, segment_size = element_header(reader, header_start + header_size)
+    if segment_id != SEGMENT:
+        raise ValueError("No Segment after the EBML header")
+    segment_end = reader.size if segment_size < 0 else min(segment_start + segment_size, reader.size)
+
+    found = {}
+    positions = {}
+    seek_heads_read = set()
+    position = segment_start
+    while position < segment_end:
+        element_id, data_start, size = element_header(reader, position)
+        if element_id == CLUSTER or size < 0:
+            break
+        if element_id == SEEK_HEAD:
+            seek_heads_read.add(position)
+            read_seek_head(reader, segment_start, data_start, size, positions)
+        elif element_id in MATROSKA_HEADER_ELEMENTS and element_id not in found:
+            found[element_id] = (data_start, size)
+        position = data_start + size
+
+    # A SeekHead may point to a second SeekHead at the end of the file
+    for seek_position in positions.get(SEEK_HEAD, []):
+        if seek_position not in seek_heads_read and seek_position < reader.size:
+            element_id, data_start, size = element_header(reader, seek_position)
+            if element_id == SEEK_HEAD:
+                read_seek_head(reader, segment_start, data_start, size, positions)
+    for element_id in MATROSKA_HEADER_ELEMENTS:
+        for seek_position in positions.get(element_id, []):
+            if element_id in found or seek_position >= reader.size:
+                break
+            real_id, data_start, size = element_header(reader, seek_position)
+            if real_id == element_id:
+                found[element_id] = (data_start, size)
+    return doc_type, found
+
+def read_element(reader, found, element_id):
+    # Whole data of a header element, None when the file does not have it
+    if element_id not in found:
+        return None
+    data_start, size = found[element_id]
+    if size > MAX_HEADER_BYTES:
+        raise ValueError("Matroska header element is too large")
+    return reader.read(data_start, size)
+
+def read_matroska_attachments(reader, found):
+    """
+    Function to list the attachments of a Matroska file without reading their data.
+
+    Returns a list of dicts with "name", "mime_type", "offset" and "size" of the file data.
+    """
+    attachments = []
+    if ATTACHMENTS not in found:
+        return attachments
+    data_start, size = found[ATTACHMENTS]
+    position, end = data_start, data_start + size
+    while position < end:
+        element_id, file_start, file_size = element_header(reader, position)
+        position = file_start + file_size
+        if element_id != ATTACHED_FILE:
+            continue
+        attachment = {"name": "", "mime_type": "", "offset": None, "size": 0}
+        child_position = file_start
+        while child_position < file_start + file_size:
+            child_id, child_start, child_size = element_header(reader, child_position)
+            child_position = child_start + child_size
+            if child_id == FILE_DATA:
+                attachment["offset"], attachment["size"] = child_start, child_size
+            elif child_id in (FILE_NAME, FILE_MIME_TYPE) and child_size <= MAX_ATTACHMENT_FIELD:
+                value = reader.read(child_start, child_size).rstrip(b"\0").decode("utf-8", errors="replace")
+                attachment["name" if child_id == FILE_NAME else "mime_type"] = value
+        attachments.append(attachment)
+    return attachments
+
+def read_matroska_tags(data):
+    # (global tags, {track UID: tags}) of a Tags element, tag names uppercase
+    global_tags, track_tags = {}, {}
+    for element_id, start, end in ebml_children(data):
+        if element_id != TAG:
+            continue
+        track_uids, values = [], {}
+        for child_id, child_start, child_end in ebml_children(data, start, end):
+            if child_id == TARGETS:
+                track_uids += [ebml_uint(data, uid_start, uid_end)
+                               for uid_id, uid_start, uid_end in ebml_children(data, child_start, child_end)
+                               if uid_id == TAG_TRACK_UID]
+            elif child_id == SIMPLE_TAG:
+                name, value = None, None
+                for tag_id, tag_start, tag_end in ebml_children(data, child_start, child_end):
+                    if tag_id == TAG_NAME:
+                        name = ebml_string(data, tag_start, tag_end).upper()
+                    elif tag_id == TAG_STRING:
+                        value = ebml_string(data, tag_start, tag_end)
+                if name and value is not None:
+                    values[name] = value
+        if not track_uids:
+            global_tags.update(values)
+        for uid in track_uids:
+            track_tags.setdefault(uid, {}).update(values)
+    return global_tags, track_tags
+
+def tag_duration(value):
+    # Matroska DURATION tag "01:02:03.456000000" in seconds
+    try:
+        hours, minutes, seconds = value.split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except (AttributeError, ValueError):
+        return None
+
+def matroska_codec_id(codec_id, codec_private, sampling_rate, output_sampling_rate):
+    # MediaInfo adds the AAC object type to "A_AAC": A_AAC-2 for AAC LC, A_AAC-5 for HE-AAC (SBR)
+    if codec_id != "A_AAC" or not codec_private:
+        return codec_id
+    object_type = codec_private[0] >> 3
+    if object_type == 2 and output_sampling_rate and sampling_rate and output_sampling_rate == 2 * sampling_rate:
+        object_type = 5
+    return f"{codec_id}-{object_type}"
+
+def matroska_track(data, start, end, stream_order):
+    # One TrackEntry as a MediaInfo-style track dict, None for track types FFmpeg does not map
+    fields = {"uid": None, "type": None, "default": 1, "forced": 0, "name": None, "language": "eng",
+              "language_bcp47": None, "codec_id": "", "codec_private": b"", "sampling_rate": 8000.0,
+              "output_sampling_rate": None, "channels": 1}
+    for element_id, child_start, child_end in ebml_children(data, start, end):
+        if element_id == TRACK_UID:
+            fields["uid"] = ebml_uint(data, child_start, child_end)
+        elif element_id == TRACK_TYPE:
+            fields["type"] = ebml_uint(data, child_start, child_end)
+        elif element_id == FLAG_DEFAULT:
+            fields["default"] = ebml_uint(data, child_start, child_end)
+        elif element_id == FLAG_FORCED:
+            fields["forced"] = ebml_uint(data, child_start, child_end)
+        elif element_id == TRACK_NAME:
+            fields["name"] = ebml_string(data, child_start, child_end)
+        elif element_id == TRACK_LANGUAGE:
+            fields["language"] = ebml_string(data, child_start, child_end)
+        elif element_id == TRACK_LANGUAGE_BCP47:
+            fields["language_bcp47"] = ebml_string(data, child_start, child_end)
+        elif element_id == CODEC_ID:
+            fields["codec_id"] = ebml_string(data, child_start, child_end)
+        elif element_id == CODEC_PRIVATE:
+            fields["codec_private"] = data[child_start:child_end]
+        elif element_id == AUDIO:
+            for audio_id, audio_start, audio_end in ebml_children(data, child_start, child_end):
+                if audio_id == SAMPLING_FREQUENCY:
+                    fields["sampling_rate"] = ebml_float(data, audio_start, audio_end)
+                elif audio_id == OUTPUT_SAMPLING_FREQUENCY:
+                    fields["output_sampling_rate"] = ebml_float(data, audio_start, audio_end)
+                elif audio_id == CHANNELS:
+                    fields["channels"] = ebml_uint(data, audio_start, audio_end)
+
+    track_type = MATROSKA_TRACK_TYPES.get(fields["type"])
+    if track_type is None:
+        return None, None
+    codec_id = fields["codec_id"]
+    track = {"@type": track_type, "StreamOrder": str(stream_order)}
+    track["Format"] = next((name for prefix, name in MATROSKA_FORMATS if codec_id.startswith(prefix)), codec_id)
+    if track_type == "Audio":
+        sampling_rate = fields["output_sampling_rate"] or fields["sampling_rate"]
+        track["CodecID"] = matroska_codec_id(codec_id, fields["codec_private"], fields["sampling_rate"],
+                                             fields["output_sampling_rate"])
+        track["Channels"] = str(fields["channels"])
+        track["SamplingRate"] = str(int(sampling_rate))
+        if codec_id in MATROSKA_PROFILES:
+            track["Format_Profile"] = MATROSKA_PROFILES[codec_id]
+    else:
+        track["CodecID"] = codec_id
+    if fields["name"]:
+        track["Title"] = fields["name"]
+    language = language_code(fields["language_bcp47"] or fields["language"])
+    if language:
+        track["Language"] = language
+    track["Default"] = yes_no(fields["default"])
+    track["Forced"] = yes_no(fields["forced"])
+    return fields["uid"], track
+
+def matroska_track_list(reader):
+    """
+    Function to build the MediaInfo-style track list of a Matroska/WebM file from its header elements.
+    """
+    doc_type, found = find_matroska_elements(reader)
+    general = {"@type": "General", "Format": "WebM" if doc_type == "webm" else "Matroska", "FileSize": str(reader.size)}
+    tracks = [general]
+
+    info = read_element(reader, found, INFO)
+    if info is not None:
+        timestamp_scale, duration = 1000000, None
+        for element_id, start, end in ebml_children(info):
+            if element_id == TIMESTAMP_SCALE:
+                timestamp_scale = ebml_uint(info, start, end)
+            elif element_id == SEGMENT_DURATION:
+                duration = ebml_float(info, start, end)
+            elif element_id == SEGMENT_TITLE:
+                general["Title"] = ebml_string(info, start, end)
+        if duration is not None:
+            general["Duration"] = f"{duration * timestamp_scale / 1e9:.3f}"
+
+    tracks_by_uid = {}
+    tracks_data = read_element(reader, found, TRACKS)
+    if tracks_data is None:
+        raise ValueError("Matroska file without a Tracks element")
+    stream_order = 0
+    for element_id, start, end in ebml_children(tracks_data):
+        if element_id != TRACK_ENTRY:
+            continue
+        uid, track = matroska_track(tracks_data, start, end, stream_order)
+        stream_order += 1
+        if track is not None:
+            tracks.append(track)
+            tracks_by_uid[uid] = track
+
+    # Attachments named "cover..." are reported as cover art, like MediaInfo does
+    attachments = read_matroska_attachments(reader, found)
+    if attachments:
+        general["extra"] = {"Attachments": " / ".join(attachment["name"] for attachment in attachments)}
+    if any(attachment["name"].lower().startswith("cover") and attachment["mime_type"].startswith("image/")
+           for attachment in attachments):
+        general["Cover"] = "Yes"
+
+    tags = read_element(reader, found, TAGS)
+    if tags is not None:
+        global_tags, track_tags = read_matroska_tags(tags)
+        if "TITLE" in global_tags and "Title" not in general:
+            general["Title"] = global_tags.pop("TITLE")
+        if global_tags:
+            general.setdefault("extra", {}).update(global_tags)
+        for uid, values in track_tags.items():
+            track = tracks_by_uid.get(uid)
+            if track is None:
+                continue
+            duration = tag_duration(values.get("DURATION"))
+            if duration is not None:
+                track["Duration"] = f"{duration:.9f}"
+            for tag_name, field in STATISTICS_TAGS.items():
+                if values.get(tag_name, "").isdigit():
+                    track[field] = values[tag_name]
+
+    set_type_orders(tracks)
+    return tracks
+
+# --- MP4 ---
+
+def iter_boxes(data, start=0, end=None):
+    """
+    Function to yield (type, content start, box end) of the ISO-BMFF boxes between start and end of a buffer.
+    """
+    end = len(data) if end is None else end
+    while start + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, start)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, start + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - start
+        if size < header_size or start + size > end:
+            raise ValueError(f"Damaged '{box_type.decode('latin-1')}' box")
+        yield box_type, start + header_size, start + size
+        start += size
+
+def find_box(data, start, end, *path):
+    # (content start, end) of the first box at the given path of box types, None when it is missing
+    for box_type in path:
+        for found_type, box_start, box_end in iter_boxes(data, start, end):
+            if found_type == box_type:
+                start, end = box_start, box_end
+                break
+        else:
+            return None
+    return start, end
+
+def find_top_level_box(reader, box_type):
+    # (content position, size) of a top-level box, walking the box headers only
+    position = 0
+    while position + 8 <= reader.size:
+        header = reader.read(position, 16)
+        size, found_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = reader.size - position
+        if size < header_size:
+            raise ValueError(f"Damaged box header at byte {position}")
+        if found_type == box_type:
+            return position + header_size, size - header_size
+        position += size
+    return None
+
+def descriptor(data, position):
+    # MPEG-4 descriptor at position: (tag, content start, content end)
+    tag = data[position]
+    length = 0
+    position += 1
+    for _ in range(4):
+        byte = data[position]
+        position += 1
+        length = length << 7 | (byte & 0x7F)
+        if not byte & 0x80:
+            break
+    return tag, position, min(position + length, len(data))
+
+def parse_esds(data, start, end):
+    """
+    Function to read the object type and the AAC audio object type from an "esds" box.
+
+    Returns (object type indication, audio object type or None).
+    """
+    data = data[start + 4:end]  # Skip version and flags
+    tag, position, descriptor_end = descriptor(data, 0)
+    if tag != 0x03:
+        return None, None
+    flags = data[position + 2]
+    position += 3
+    if flags & 0x80:
+        position += 2
+    if flags & 0x40:
+        position += 1 + data[position]
+    if flags & 0x20:
+        position += 2
+    tag, position, config_end = descriptor(data, position)
+    if tag != 0x04:
+        return None, None
+    object_type = data[position]
+    position += 13
+    if position < config_end:
+        tag, position, info_end = descriptor(data, position)
+        if tag == 0x05 and info_end > position:
+            audio_object_type = data[position] >> 3
+            if audio_object_type == 31 and info_end > position + 1:
+                audio_object_type = 32 + ((data[position] & 7) << 3 | data[position + 1] >> 5)
+            return object_type, audio_object_type
+    return object_type, None
+
+def mp4_audio_entry(data, start, end, entry_type, track):
+    # Channels, sampling rate, format and codec id of an audio sample entry
+    version = struct.unpack_from(">H", data, start + 8)[0]
+    if version == 2:
+        sampling_rate, channels = struct.unpack_from(">dI", data, start + 32)
+        children = start + 64
+    else:
+        channels = struct.unpack_from(">H", data, start + 16)[0]
+        sampling_rate = struct.unpack_from(">I", data, start + 24)[0] >> 16
+        children = start + (44 if version == 1 else 28)
+    track["Channels"] = str(channels)
+    track["SamplingRate"] = str(int(sampling_rate))
+    track["Format"] = MP4_FORMATS.get(entry_type, entry_type.decode("latin-1").strip())
+    track["CodecID"] = entry_type.decode("latin-1")
+    if entry_type == b".mp3":
+        track["Format_Profile"] = "Layer 3"
+    if entry_type == b"mp4a":
+        track["Format"] = "AAC"
+        esds = find_box(data, children, end, b"esds") or find_box(data, children, end, b"wave", b"esds")
+        if esds is not None:
+            object_type, audio_object_type = parse_esds(data, *esds)
+            if object_type is not None:
+                track["Format"] = MP4A_FORMATS.get(object_type, f"mp4a-{object_type:X}")
+                track["CodecID"] = f"mp4a-{object_type:X}"
+                if track["Format"] == "AAC" and audio_object_type:
+                    track["CodecID"] += f"-{audio_object_type}"
+
+def mpeg_audio_layer(reader, data, stbl_start, stbl_end):
+    """
+    Function to read the layer of an MPEG audio track from the frame header of its first sample.
+
+    The "mp4a" object types 0x69 and 0x6B cover every layer, MediaInfo reads the
+    header too. Returns a "Format_Profile" value, or None when the header is not found.
+    """
+    stco = find_box(data, stbl_start, stbl_end, b"stco")
+    co64 = find_box(data, stbl_start, stbl_end, b"co64")
+    if stco is not None and stco[1] - stco[0] >= 12 and struct.unpack_from(">I", data, stco[0] + 4)[0]:
+        offset = struct.unpack_from(">I", data, stco[0] + 8)[0]
+    elif co64 is not None and co64[1] - co64[0] >= 16 and struct.unpack_from(">I", data, co64[0] + 4)[0]:
+        offset = struct.unpack_from(">Q", data, co64[0] + 8)[0]
+    else:
+        return None
+    header = reader.read(offset, 4)
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    return MPEG_AUDIO_LAYERS.get(header[1] >> 1 & 3)
+
+def mp4_stream_size(data, start, end):
+    # Sum of the sample sizes of a "stsz" box
+    sample_size, sample_count = struct.unpack_from(">II", data, start + 4)
+    if sample_size:
+        return sample_size * sample_count
+    sizes = array("I", data[start + 12:min(start + 12 + 4 * sample_count, end)])
+    if sys.byteorder == "little":
+        sizes.byteswap()
+    return sum(sizes)
+
+def mp4_track(data, start, end, stream_order):
+    # One "trak" box as a MediaInfo-style track dict, None for track types FFmpeg does not map as audio, video or text
+    hdlr = find_box(data, start, end, b"mdia", b"hdlr")
+    if hdlr is None:
+        return None
+    track_type = MP4_TRACK_TYPES.get(data[hdlr[0] + 8:hdlr[0] + 12])
+    if track_type is None:
+        return None
+    track = {"@type": track_type, "StreamOrder": str(stream_order)}
+
+    tkhd = find_box(data, start, end, b"tkhd")
+    if tkhd is not None:
+        track["Default"] = yes_no(data[tkhd[0] + 3] & 1)  # Track enabled flag
+
+    duration = None
+    mdhd = find_box(data, start, end, b"mdia", b"mdhd")
+    if mdhd is not None:
+        if data[mdhd[0]] == 1:
+            timescale, duration, language = struct.unpack_from(">IQH", data, mdhd[0] + 20)
+        else:
+            timescale, duration, language = struct.unpack_from(">IIH", data, mdhd[0] + 12)
+        duration = duration / timescale if timescale else None
+        if duration is not None:
+            track["Duration"] = f"{duration:.3f}"
+        if language >= 0x400:  # Packed ISO 639-2 code, smaller values are old Macintosh language codes
+            code = "".join(chr((language >> shift & 0x1F) + 0x60) for shift in (10, 5, 0))
+            language = language_code(code)
+            if language:
+                track["Language"] = language
+
+    name = data[hdlr[0] + 24:hdlr[1]]
+    if name and name[0] == len(name) - 1:
+        name = name[1:]  # QuickTime stores a Pascal string
+    title = name.rstrip(b"\0").decode("utf-8", errors="replace").strip()
+    udta_name = find_box(data, start, end, b"udta", b"name")
+    if udta_name is not None:
+        title = data[udta_name[0]:udta_name[1]].rstrip(b"\0").decode("utf-8", errors="replace")
+    if title not in GENERIC_HANDLER_NAMES:
+        track["Title"] = title
+
+    stbl = find_box(data, start, end, b"mdia", b"minf", b"stbl")
+    if stbl is None:
+        return track
+    stsd = find_box(data, stbl[0], stbl[1], b"stsd")
+    if stsd is not None and stsd[1] - stsd[0] >= 16:
+        entry_type, entry_start, entry_end = next(iter_boxes(data, stsd[0] + 8, stsd[1]))
+        if track_type == "Audio":
+            mp4_audio_entry(data, entry_start, entry_end, entry_type, track)
+        else:
+            track["Format"] = MP4_FORMATS.get(entry_type, entry_type.decode("latin-1").strip())
+            track["CodecID"] = entry_type.decode("latin-1")
+    stsz = find_box(data, stbl[0], stbl[1], b"stsz")
+    if stsz is not None:
+        stream_size = mp4_stream_size(data, *stsz)
+        track["StreamSize"] = str(stream_size)
+        if duration:
+            track["BitRate"] = str(round(stream_size * 8 / duration))
+    return track
+
+def ilst_items(data, moov_start, moov_end):
+    """
+    Function to list the iTunes metadata items of a "moov" box.
+
+    Returns a dict of item type (e.g. b"\\xa9nam", b"covr") -> list of (data start, data end) of its "data" boxes.
+    """
+    meta = find_box(data, moov_start, moov_end, b"udta", b"meta")
+    if meta is None:
+        return {}
+    meta_start = meta[0] if data[meta[0] + 4:meta[0] + 8] == b"hdlr" else meta[0] + 4  # QuickTime meta has no version
+    ilst = find_box(data, meta_start, meta[1], b"ilst")
+    if ilst is None:
+        return {}
+    items = {}
+    for item_type, item_start, item_end in iter_boxes(data, *ilst):
+        items[item_type] = [(box_start + 8, box_end) for box_type, box_start, box_end in iter_boxes(data, item_start, item_end)
+                            if box_type == b"data"]
+    return items
+
+def mp4_track_list(reader):
+    """
+    Function to build the MediaInfo-style track list of an MP4/QuickTime file from its "moov" box.
+    """
+    moov = find_top_level_box(reader, b"moov")
+    if moov is None:
+        raise ValueError("MP4 file without a 'moov' box")
+    if moov[1] > MAX_HEADER_BYTES:
+        raise ValueError("MP4 'moov' box is too large")
+    data = reader.read(*moov)
+    general = {"@type": "General", "Format": "MPEG-4", "FileSize": str(reader.size)}
+    tracks = [general]
+
+    mvhd = find_box(data, 0, len(data), b"mvhd")
+    if mvhd is not None:
+        if data[mvhd[0]] == 1:
+            timescale, duration = struct.unpack_from(">IQ", data, mvhd[0] + 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", data, mvhd[0] + 12)
+        if timescale:
+            general["Duration"] = f"{duration / timescale:.3f}"
+
+    stream_order = 0
+    for box_type, start, end in iter_boxes(data):
+        if box_type != b"trak":
+            continue
+        track = mp4_track(data, start, end, stream_order)
+        stream_order += 1
+        if track is None:
+            continue
+        if track.get("Format") == "MPEG Audio" and "Format_Profile" not in track:
+            stbl = find_box(data, start, end, b"mdia", b"minf", b"stbl")
+            layer = mpeg_audio_layer(reader, data, *stbl) if stbl is not None else None
+            if layer:
+                track["Format_Profile"] = layer
+        tracks.append(track)
+
+    items = ilst_items(data, 0, len(data))
+    if items.get(b"\xa9nam"):
+        start, end = items[b"\xa9nam"][0]
+        general["Title"] = data[start:end].decode("utf-8", errors="replace")
+    if items.get(b"covr"):
+        general["Cover"] = "Yes"
+
+    set_type_orders(tracks)
+    return tracks
+
+def probe_native(file_path, dump_json=None):
+    """
+    Function to get the MediaInfo-style track list of a Matroska or MP4 file from its headers.
+
+    Returns None for other containers, raises ValueError when the headers are damaged.
+    A remote input (see remoteInput) only fetches the header bytes.
+    The track list is written to dump_json in the MediaInfo JSON layout when a path is given.
+    """
+    with open_input(file_path) as media_file:
+        reader = RangeReader(media_file)
+        start = reader.read(0, 12)
+        if start.startswith(EBML_MAGIC):
+            tracks = matroska_track_list(reader)
+        elif start[4:8] == b"ftyp" or start[4:8] in QUICKTIME_BOXES:
+            tracks = mp4_track_list(reader)
+        else:
+            return None
+
+    if dump_json:
+        with open(dump_json, 'w', encoding='utf-8') as dump_file:
+            json.dump({"media": {"@ref": file_path, "track": tracks}}, dump_file, ensure_ascii=False, indent=2)
+        print(f"Media info saved to {dump_json}")
+    return tracks
+
+def compare_models(native, golden):
+    """
+    Function to list the differences between two media models, as "field: native != golden" lines.
+    """
+    differences = []
+    native, golden = native.to_dict(), golden.to_dict()
+    for name in ("general", "audio", "text", "images", "video_count"):
+        native_value, golden_value = native[name], golden[name]
+        if name == "general":
+            native_value, golden_value = [native_value], [golden_value]
+        elif name == "video_count":
+            if native_value != golden_value:
+                differences.append(f"video_count: {native_value} != {golden_value}")
+            continue
+        if len(native_value) != len(golden_value):
+            differences.append(f"{name}: {len(native_value)} track(s) != {len(golden_value)}")
+            continue
+        for index, (native_track, golden_track) in enumerate(zip(native_value, golden_value)):
+            for field, value in native_track.items():
+                expected = golden_track.get(field)
+                if isinstance(value, float) and isinstance(expected, float) and abs(value - expected) < 0.0015:
+                    continue
+                if value != expected:
+                    differences.append(f"{name}[{index}].{field}: {value!r} != {expected!r}")
+    return differences
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m videoToAudio.containerProbe <video_file> [mediainfo_json]")
+        sys.exit(1)
+
+    file_path = sys.argv[1]
+    try:
+        tracks = probe_native(file_path)
+    except ValueError as e:
+        print(f"Cannot read the headers of {file_path}: {e}")
+        sys.exit(1)
+    if tracks is None:
+        print(f"{file_path} is not a Matroska or MP4 file.")
+        sys.exit(1)
+    if len(sys.argv) == 2:
+        print(json.dumps({"media": {"@ref": file_path, "track": tracks}}, ensure_ascii=False, indent=2))
+        return
+
+    # Compare with a MediaInfo report of the same file, e.g. one of the bundled sample JSONs
+    with open(sys.argv[2], 'r', encoding='utf-8') as json_file:
+        golden = parse_track_list(iter_tracks(json_file))
+    differences = compare_models(parse_track_list(tracks), golden)
+    for difference in differences:
+        print(difference)
+    print(f"{len(differences)} difference(s) from {sys.argv[2]}")
+    if differences:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
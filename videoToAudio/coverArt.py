@@ -0,0 +1,260 @@
+"""
+Cover art read straight from the container: Matroska attachments and MP4 "covr" items.
+
+The position of the image is found from the headers (see containerProbe) and
+only its bytes are read, FFmpeg never opens the file. JPEG covers are copied
+as they are, other image formats are re-encoded to JPEG so the file matches its
+.jpg name. Pillow is optional: without it FFmpeg re-encodes those covers from
+the bytes read, and thumbnails are not available.
+
+Run as a module to extract the covers (or thumbnails) of many files at once,
+e.g. for a thumbnail catalogue:
+
+    python -m videoToAudio.coverArt <directory or files> --output-dir covers --thumbnail 320
+"""
+import io
+import os
+import sys
+import struct
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+if __package__ in (None, ""):
+    # Run as "python videoToAudio/coverArt.py": the package is imported from the folder above this file
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from videoToAudio.errors import ConversionError
+from videoToAudio.remoteInput import open_input, resolve_url
+from videoToAudio.containerProbe import (RangeReader, find_matroska_elements, find_top_level_box, ilst_items,
+                                         read_matroska_attachments)
+from videoToAudio.verifyFileExtension import EBML_MAGIC, QUICKTIME_BOXES
+
+try:
+    from PIL import Image  # Optional, only needed for thumbnails, FFmpeg re-encodes other covers without it
+except ImportError:
+    Image = None
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # Reads are small, threads mostly wait on the disk
+THUMBNAIL_QUALITY = 85
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+# Type indicators of MP4 "data" boxes holding images
+MP4_IMAGE_TYPES = {13: "image/jpeg", 14: "image/png", 27: "image/bmp"}
+
+class CoverImage:
+    def __init__(self, offset, size, mime_type):
+        self.offset = offset  # Position of the image bytes in the file
+        self.size = size  # Size of the image in bytes
+        self.mime_type = mime_type  # MIME type declared by the container, e.g. "image/jpeg"
+
+def choose_attachment(attachments):
+    # Attachment named "cover..." first (the one MediaInfo reports as the cover), otherwise the first image
+    images = [attachment for attachment in attachments
+              if attachment["mime_type"].startswith("image/") and attachment["offset"] is not None]
+    covers = [attachment for attachment in images if attachment["name"].lower().startswith("cover")]
+    return (covers or images or [None])[0]
+
+def find_cover(reader):
+    """
+    Function to locate the cover image of a Matroska or MP4 file from its headers.
+
+    Returns a CoverImage, or None when the file has no cover. Raises ValueError
+    for other containers and damaged headers.
+    """
+    start = reader.read(0, 12)
+    if start.startswith(EBML_MAGIC):
+        doc_type, found = find_matroska_elements(reader)
+        attachment = choose_attachment(read_matroska_attachments(reader, found))
+        if attachment is not None:
+            return CoverImage(attachment["offset"], attachment["size"], attachment["mime_type"])
+    elif start[4:8] == b"ftyp" or start[4:8] in QUICKTIME_BOXES:
+        moov = find_top_level_box(reader, b"moov")
+        if moov is not None:
+            data = reader.read(*moov)
+            for data_start, data_end in ilst_items(data, 0, len(data)).get(b"covr", []):
+                image_type = int.from_bytes(data[data_start - 8:data_start - 4], "big") & 0xFFFFFF
+                return CoverImage(moov[0] + data_start, data_end - data_start, MP4_IMAGE_TYPES.get(image_type, "image/jpeg"))
+    else:
+        raise ValueError("Not a Matroska or MP4 file")
+    return None
+
+def read_cover(file_path):
+    """
+    Function to read the cover image bytes of a file from its container headers.
+
+    Returns None when the headers show there is no cover. Raises ValueError when
+    the headers cannot tell (other container or damaged headers), FFmpeg may
+    still find a cover then.
+    """
+    try:
+        with open_input(file_path) as media_file:
+            reader = RangeReader(media_file)
+            cover = find_cover(reader)
+            return reader.read(cover.offset, cover.size) if cover is not None else None
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"Damaged headers: {e}")
+    except OSError as e:
+        raise ConversionError(f"An error occurred: {e}")
+
+def write_file(output_file, data):
+    # Write through a temporary file, so an interrupted write never leaves a partial image under the final name
+    temporary_path = f"{output_file}.tmp"
+    with open(temporary_path, 'wb') as image_file:
+        image_file.write(data)
+    os.replace(temporary_path, output_file)
+
+def encode_jpeg_with_ffmpeg(data):
+    # Re-encode image bytes (PNG, BMP, ...) as JPEG when Pillow is missing, FFmpeg reads them from a pipe
+    command = ["ffmpeg", "-v", "error", "-i", "pipe:0", "-frames:v", "1", "-c:v", "mjpeg", "-q:v", "2", "-f", "image2pipe", "pipe:1"]
+    try:
+        result = subprocess.run(command, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise ConversionError(f"Covers that are not JPEG need Pillow or FFmpeg: {e}")
+    if result.returncode != 0 or not result.stdout.startswith(JPEG_MAGIC):
+        message = result.stderr.decode("utf-8", errors="replace").strip()
+        raise ConversionError(f"Cannot decode the cover image: {message}".strip())
+    return result.stdout
+
+def encode_jpeg(data, max_size=None):
+    """
+    Function to re-encode image bytes as JPEG with Pillow, downscaled to fit max_size x max_size when given.
+
+    Without Pillow, full size images are re-encoded by FFmpeg and thumbnails raise ConversionError.
+    """
+    if Image is None:
+        if max_size:
+            raise ConversionError("Pillow is required for thumbnails (pip install Pillow)")
+        return encode_jpeg_with_ffmpeg(data)
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if max_size:
+                image.draft("RGB", (max_size, max_size))  # JPEG is decoded at a reduced scale, much faster
+                image.thumbnail((max_size, max_size))
+            output = io.BytesIO()
+            image.convert("RGB").save(output, "JPEG", quality=THUMBNAIL_QUALITY)
+    except OSError as e:
+        raise ConversionError(f"Cannot decode the cover image: {e}")
+    return output.getvalue()
+
+def copy_cover(file_path, output_file):
+    """
+    Function to write the cover image of a file to a JPEG file without FFmpeg.
+
+    Returns True when the cover was written, None when the headers show the file
+    has no cover, and False when the cover cannot be read from the headers, the
+    caller then extracts it with FFmpeg. Covers that are not JPEG are re-encoded.
+    """
+    try:
+        data = read_cover(file_path)
+    except ValueError:
+        return False
+    if data is None:
+        return None
+    if not data.startswith(JPEG_MAGIC):
+        data = encode_jpeg(data)
+    write_file(output_file, data)
+    return True
+
+def extract_cover_with_ffmpeg(file_path, output_file):
+    # Fallback for containers without readable cover headers: first attached picture, FFmpeg stops after one frame
+    # A remote input is read by FFmpeg itself over HTTP, it only needs the start of the file
+    command = ["ffmpeg", "-y", "-v", "error", "-i", resolve_url(file_path), "-map", "0:v", "-map", "-0:V", "-frames:v", "1",
+               "-c:v", "copy", "-f", "image2", output_file]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL)
+    if result.returncode != 0 or not os.path.exists(output_file):
+        message = result.stderr.decode("utf-8", errors="replace").strip()
+        raise ConversionError(f"No cover image found in {file_path} {message}".strip())
+
+def save_cover(file_path, output_file, thumbnail_size=None):
+    """
+    Function to save the cover (or a thumbnail of at most thumbnail_size pixels) of one file.
+
+    Returns "headers" when the image was read from the container headers, "ffmpeg" when FFmpeg had to extract it.
+    """
+    source = "headers"
+    try:
+        data = read_cover(file_path)
+        if data is None:
+            raise ConversionError(f"No cover image in {file_path}")
+    except ValueError:
+        # The attached picture is copied as it is, it may be a PNG written under the .jpg name
+        extract_cover_with_ffmpeg(file_path, output_file)
+        with open(output_file, 'rb') as image_file:
+            data = image_file.read()
+        if not thumbnail_size and data.startswith(JPEG_MAGIC):
+            return "ffmpeg"
+        source = "ffmpeg"
+    if thumbnail_size:
+        data = encode_jpeg(data, thumbnail_size)
+    elif not data.startswith(JPEG_MAGIC):
+        data = encode_jpeg(data)
+    write_file(output_file, data)
+    return source
+
+def extract_covers(jobs, thumbnail_size=None, workers=DEFAULT_WORKERS):
+    """
+    Function to save the covers of many files at once, jobs is a list of (input file, output file).
+
+    Files are handled by a pool of threads, reading a cover is a few small reads.
+    Returns the list of (input file, error) that failed.
+    """
+    def run(job):
+        file_path, output_file = job
+        try:
+            os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+            return file_path, output_file, save_cover(file_path, output_file, thumbnail_size), None
+        except (ConversionError, OSError) as e:
+            # One unreadable file or full disk fails its own job, not the whole batch
+            return file_path, output_file, None, str(e)
+
+    failed = []
+    counts = {"headers": 0, "ffmpeg": 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for file_path, output_file, source, error in executor.map(run, jobs):
+            if error:
+                print(f"[FAILED] {file_path}: {error}")
+                failed.append((file_path, error))
+            else:
+                counts[source] += 1
+                print(f"[OK] {file_path} -> {output_file}")
+    print(f"\nCovers saved: {counts['headers']} read from the container headers, {counts['ffmpeg']} extracted by FFmpeg, "
+          f"{len(failed)} failed.")
+    return failed
+
+def cover_jobs(paths, output_dir, thumbnail_size=None):
+    # (input, output) for every file, directories are scanned like in batch mode and mirrored under output_dir
+    # Imported here: batchProcess imports the pipeline, which imports this module
+    from videoToAudio.batchProcess import find_video_files, output_directory_for
+
+    suffix = "_thumb.jpg" if thumbnail_size else "_cover.jpg"
+    jobs = []
+    for path in paths:
+        if os.path.isdir(path):
+            directory = os.path.abspath(path)
+            jobs += [(file_path, output_directory_for(file_path, directory, output_dir) + suffix)
+                     for file_path in find_video_files(directory)]
+        else:
+            jobs.append((path, os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + suffix)))
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m videoToAudio.coverArt",
+                                     description="Extract the cover images (or thumbnails) of many video files.")
+    parser.add_argument("paths", nargs="+", help="video files or directories of video files")
+    parser.add_argument("--output-dir", default=".", help="where the images are written, directories are mirrored")
+    parser.add_argument("--thumbnail", type=int, metavar="SIZE",
+                        help="write a JPEG thumbnail of at most SIZE x SIZE pixels instead of the full cover (needs Pillow)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of files handled at the same time")
+    args = parser.parse_args()
+
+    if args.thumbnail and Image is None:
+        print("Thumbnails need Pillow, install it with: pip install Pillow")
+        sys.exit(1)
+    failed = extract_covers(cover_jobs(args.paths, os.path.abspath(args.output_dir), args.thumbnail), args.thumbnail,
+                            args.workers)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
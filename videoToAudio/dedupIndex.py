@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import subprocess
+
+from videoToAudio.checkVariables import cache_directory
+from videoToAudio.remoteInput import resolve_url
+
+DEDUP_INDEX_FILENAME = "outputs.sqlite3"
+DEDUP_MODES = ["link", "copy", "off"]
+DEFAULT_DEDUP_MODE = "link"
+
+# Packets hashed from the start of each audio track, about 20 to 30 seconds of AAC, Opus or MP3
+CONTENT_HASH_PACKETS = 1024
+
+def make_signature(*parts):
+    # Stable hash of JSON-serializable parts
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+def track_content_hashes(input_file, audio_info_list):
+    """
+    Function to hash the first packets of audio tracks, in one FFmpeg run that only demuxes.
+
+    FFmpeg hashes the packets as they are, without the container framing, so
+    the same track remuxed into another container gets the same hash.
+    Returns a dict of FFmpeg track order -> hash, empty when FFmpeg failed.
+    """
+    if not audio_info_list:
+        return {}
+    command = ["ffmpeg", "-v", "error", "-nostdin", "-i", resolve_url(input_file)]
+    for audio_info in audio_info_list:
+        command += ["-map", f"0:a:{audio_info.ffmpeg_track_order}"]
+    command += ["-c", "copy", "-frames:a", str(CONTENT_HASH_PACKETS), "-f", "streamhash", "-hash", "sha256", "-"]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+    except OSError:
+        return {}
+    if result.returncode != 0:
+        return {}
+    hashes = {}
+    for line in result.stdout.decode("ascii", errors="replace").splitlines():
+        # "<output stream index>,a,SHA256=<hex>", output streams follow the -map order
+        index, _, value = line.split(",", 2) if line.count(",") >= 2 else ("", "", "")
+        if index.isdigit() and int(index) < len(audio_info_list) and "=" in value:
+            hashes[audio_info_list[int(index)].ffmpeg_track_order] = value.partition("=")[2]
+    return hashes
+
+def track_signature(audio_info, output_suffix):
+    """
+    Function to fingerprint an audio output by the content of its source track.
+
+    The same track remuxed into another container keeps its format, duration,
+    stream size, layout and packets, so it gets the same signature. The container
+    codec id is left out on purpose because it differs between Matroska and MP4.
+    The hash of the first packets (see track_content_hashes) keeps apart tracks
+    whose metadata agrees, e.g. constant bit rate tracks of the same length.
+    Returns None when the probe or the hash did not report enough to tell tracks apart.
+    """
+    if audio_info.duration is None or audio_info.stream_size is None or audio_info.content_hash is None:
+        return None
+    if audio_info.normalization:
+        # Normalized outputs only match outputs normalized the same way
+        output_suffix = f"{output_suffix}@{audio_info.normalization}"
+    return make_signature("audio", audio_info.format_name, round(audio_info.duration, 3), audio_info.stream_size,
+                          audio_info.channels, audio_info.sampling_rate, audio_info.bit_rate, audio_info.content_hash,
+                          output_suffix)
+
+class DedupIndex:
+    """
+    SQLite index of produced outputs keyed by a content signature, used to link or copy
+    an existing output instead of extracting or encoding the same content again.
+    """
+
+    def __init__(self, database_path=None, mode=DEFAULT_DEDUP_MODE):
+        self.database_path = database_path or os.path.join(cache_directory(), DEDUP_INDEX_FILENAME)
+        self.mode = mode  # "link" to hard link reused outputs (falls back to a copy), "copy" to copy them
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.database_path)), exist_ok=True)
+        # Batch workers share the index, WAL lets readers and one writer work at the same time
+        self.connection = sqlite3.connect(self.database_path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS outputs ("
+            " signature TEXT PRIMARY KEY,"
+            " output_path TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def find(self, signature):
+        """
+        Function to return the output recorded for a signature, or None when it is unknown or was changed since.
+        """
+        if signature is None:
+            return None
+        row = self.connection.execute(
+            "SELECT output_path, size, mtime_ns FROM outputs WHERE signature = ?", (signature,)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            stat = os.stat(row[0])
+        except OSError:
+            return None
+        if stat.st_size != row[1] or stat.st_mtime_ns != row[2]:
+            return None
+        return row[0]
+
+    def add(self, signature, output_path):
+        # Record a freshly written output, later duplicates are linked or copied from it
+        if signature is None or not os.path.exists(output_path):
+            return
+        output_path = os.path.abspath(output_path)
+        stat = os.stat(output_path)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO outputs (signature, output_path, size, mtime_ns, updated) VALUES (?, ?, ?, ?, ?)",
+                (signature, output_path, stat.st_size, stat.st_mtime_ns, time.time()),
+            )
+
+    def reuse(self, source_path, target_path):
+        """
+        Function to put a copy of source_path at target_path, as a hard link when possible.
+
+        Returns (bytes reused, True when hard linked so no disk space was used).
+        """
+        if os.path.exists(target_path) and os.path.samefile(source_path, target_path):
+            return 0, True
+        size = os.path.getsize(source_path)
+        temporary_path = f"{target_path}.{os.getpid()}.tmp"
+        if self.mode == "link":
+            try:
+                os.link(source_path, temporary_path)
+                os.replace(temporary_path, target_path)
+                return size, True
+            except OSError:
+                pass  # Other file system, or links not supported: copy instead
+        shutil.copy2(source_path, temporary_path)
+        os.replace(temporary_path, target_path)
+        return size, False
+
+    def close(self):
+        self.connection.close()
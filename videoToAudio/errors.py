@@ -0,0 +1,2 @@
+class ConversionError(Exception):
+    """Raised when a file cannot be analyzed or converted."""
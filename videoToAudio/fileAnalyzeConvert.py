@@ -1,336 +1,810 @@
 import sys
 import os
-import time
+import struct
 import subprocess
-import json
-
-# Define a custom class to store audio information
-class AudioInfo:
-    def __init__(self, type_order, format_name, ffmpeg_track_order, output_filename):
-        self.type_order = type_order  # Integer to store the order of the audio stream
-        self.format_name = format_name  # String to store the audio format
-        self.ffmpeg_track_order = ffmpeg_track_order  # Track order for FFmpeg (type_order - 1)
-        self.output_filename = output_filename  # Output filename for extracted audio
-
-def analyze_video(file_path):
-    # Get system time in milliseconds to generate unique JSON and output file names
-    current_millis = int(round(time.time() * 1000))
-    json_file_name = f"{current_millis}.json"
-    
-    # Command to extract media info using MediaInfo and output it to a JSON file
-    mediainfo_command = f"MediaInfo.exe --Output=JSON \"{file_path}\" > \"{json_file_name}\""
-
-    try:
-        # Run the command
-        result = subprocess.run(mediainfo_command, shell=True)
-        
-        # Check if the command was successful
-        if result.returncode == 0:
-            print(f"Media info extracted and saved to {json_file_name}")
-        else:
-            print(f"Error analyzing the file: {file_path}")
-            sys.exit(1)
+import argparse
+import threading
+import contextlib
+
+if __package__ in (None, ""):
+    # Run as "python videoToAudio/fileAnalyzeConvert.py": the package is imported from the folder above this file
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from videoToAudio import instrumentation, jobRunner
+from videoToAudio.errors import ConversionError
+from videoToAudio.containerProbe import RangeReader, find_top_level_box
+from videoToAudio.coverArt import copy_cover
+from videoToAudio.dedupIndex import (DEDUP_MODES, DEFAULT_DEDUP_MODE, DedupIndex, make_signature, track_content_hashes,
+                                     track_signature)
+from videoToAudio.jobJournal import DONE, FAILED, RUNNING, JobJournal
+from videoToAudio.loudnessAnalysis import (LoudnessSettings, describe_measurement, gain_filter, is_current, measurement_filter,
+                                           measurement_output, parse_loudnorm, parse_measurement, track_gain, track_stats)
+from videoToAudio.mediaModel import MODEL_VERSION, AudioTrack, MediaInfo, parse_track_list
+from videoToAudio.outputProfiles import fanout_arguments, parse_profile
+from videoToAudio.mediaProbe import DEFAULT_PROBE_BACKEND, PROBE_BACKENDS, probe_file
+from videoToAudio.probeCache import ProbeCache, partial_hash
+from videoToAudio.remoteInput import (DEFAULT_SPOOL_BUDGET, PipeFeeder, Spool, input_name, input_size, is_remote, open_input,
+                                      parse_size)
+from videoToAudio.segmentEncode import SegmentedEncode, segment_count
+from videoToAudio.trackSelection import add_selection_arguments, policy_from_args, select_tracks
+from videoToAudio.subtitleConvert import LRC_SOURCE_FORMATS, convert_file_to_lrc, convert_stream_to_lrc
+from videoToAudio.verifyFileExtension import CONTAINERS, sniff_container
+
+# Audio output policies:
+#   "copy" - remux AAC/Opus/MP3 tracks untouched, transcode everything else to MP3
+#   "mp3"  - always produce MP3, only MP3 sources are passed through untouched
+AUDIO_POLICIES = ["copy", "mp3"]
+DEFAULT_AUDIO_POLICY = "copy"
+
+# MediaInfo "Format" values (lowercase) that can be stream-copied, and the file extension of the container to use
+STREAM_COPY_EXTENSIONS = {
+    "aac": "m4a",
+    "opus": "opus",  # FFmpeg writes .opus files as Ogg
+    "mpeg audio": "mp3",
+    "mp3": "mp3",
+}
+# "MPEG Audio" also covers Layer I and II (MP2), only Layer III fits an .mp3 file, the others are copied into Matroska
+MP3_FORMAT_PROFILE = "Layer 3"
+MPEG_AUDIO_COPY_EXTENSION = "mka"
+
+# Containers FFmpeg demuxes front to back, a remote input in one of them is streamed over a pipe instead of spooled
+STREAMABLE_CONTAINERS = {"matroska", "webm", "mpegts", "mpegps", "flv", "asf", "ogg", "flac", "mp3", "aac", "wav"}
+
+# Optional semaphore limiting how many FFmpeg extractions run at once across batch workers
+encode_slots = None
+
+def set_encode_slots(semaphore):
+    global encode_slots
+    encode_slots = semaphore
+
+def choose_audio_output(format_name, audio_policy=DEFAULT_AUDIO_POLICY, normalize=False, format_profile=None):
+    """
+    Function to decide how an audio track is written, based on the MediaInfo "Format" and "Format_Profile" fields.
 
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        sys.exit(1)
-    
-    # After extraction, read and process the JSON file
-    process_json_file(json_file_name, file_path, current_millis)
+    MPEG audio is passed through as MP3 only when its profile is "Layer 3", other
+    or unknown layers are copied into .mka with the "copy" policy and encoded otherwise.
+    Returns a tuple of (output_mode, file_extension).
+    """
+    if normalize:
+        return "transcode", "mp3"  # The loudness gain is applied while encoding, nothing can be copied
+    extension = STREAM_COPY_EXTENSIONS.get(format_name.lower())
+    if format_name.lower() == "mpeg audio" and format_profile != MP3_FORMAT_PROFILE:
+        extension = MPEG_AUDIO_COPY_EXTENSION
+
+    if extension == "mp3":
+        return "copy", "mp3"  # MP3 passthrough, re-encoding would only lose quality
+    if extension and audio_policy == "copy":
+        return "copy", extension
+    return "transcode", "mp3"
+
+def audio_codec_arguments(audio_info):
+    # FFmpeg codec options for one audio output
+    if audio_info.output_mode == "copy":
+        return ["-c:a", "copy"]
+    return ["-c:a", "libmp3lame"]
+
+class ExtractionSummary:
+    def __init__(self):
+        self.audio_info_list = []  # AudioTrack objects for every extracted audio track
+        self.subtitle_info_list = []  # TextTrack objects for every extracted subtitle track
+        self.cover_image = None  # Filename of the extracted cover image, if any
+        self.lrc_files = []  # LRC files converted from SRT/WebVTT/ASS subtitles
+        self.saved_bytes = 0  # Input bytes not read thanks to the single-pass extraction
+        self.media = None  # Compact MediaInfo model of the input file
+        self.dedup_linked_bytes = 0  # Disk space saved by hard linking outputs of identical content
+        self.dedup_copied_bytes = 0  # Bytes copied from outputs of identical content instead of extracting them again
+        self.audio_stats = []  # Loudness statistics of every audio track, see loudnessAnalysis.track_stats
+        self.measured = False  # True when audio tracks were measured, their measurement is then saved in the probe cache
+
+def probe_media(file_path, probe_cache=None, probe_backend=DEFAULT_PROBE_BACKEND, dump_json=None):
+    """
+    Function to get the media model of a file, from the probe cache when it is still valid.
 
-class SubtitleInfo:
-    def __init__(self, type_order, format_name, ffmpeg_track_order, output_filename):
-        self.type_order = type_order  # Integer to store the order of the subtitle stream
-        self.format_name = format_name  # String to store the subtitle format
-        self.ffmpeg_track_order = ffmpeg_track_order  # FFmpeg track order (track order - 1)
-        self.output_filename = output_filename  # Filename for the extracted subtitle
+    The probe output is parsed straight from the pipe, nothing is written to disk
+    unless dump_json names a file for the raw JSON. Only the compact model is
+    kept, the raw track dicts are dropped right after parsing.
+    """
+    if probe_cache is not None:
+        cached = probe_cache.get(file_path)
+        if isinstance(cached, dict) and cached.get("version") == MODEL_VERSION:
+            print(f"Media info loaded from the probe cache for {file_path}")
+            return MediaInfo.from_dict(cached)
+
+    track_info = probe_file(file_path, probe_backend, dump_json)
+    if not isinstance(track_info, list):
+        raise ConversionError("Track information not found in JSON.")
+    media = parse_track_list(track_info)
+    print(f"Media info extracted for {file_path} with {probe_backend}")
+
+    if probe_cache is not None:
+        probe_cache.put(file_path, media.to_dict())
+    return media
+
+def output_base_name(file_path):
+    # Outputs are named after the input file, so a re-run writes to the same files and can resume
+    return os.path.splitext(input_name(file_path))[0]
+
+def analyze_video(file_path, audio_policy=DEFAULT_AUDIO_POLICY, output_dir=".", probe_cache=None,
+                  probe_backend=DEFAULT_PROBE_BACKEND, dump_probe_json=False, keep_subtitles=False, job_journal=None,
+                  ffmpeg_timeout=None, profiles=None, selection=None, dedup_index=None, segment_encode=False, spool=None,
+                  loudness=None):
+    """
+    Function to analyze a video file (from its headers, with MediaInfo or FFprobe) and extract its streams.
 
-def extract_subtitles(input_file, subtitle_info_list):
+    file_path can be a remote URL (see remoteInput), spool is the remoteInput.Spool
+    used when FFmpeg has to seek in it. Outputs already done according to job_journal are not extracted again.
+    Loudness measurements (see process_media) are saved with the media model in probe_cache.
+    Returns an ExtractionSummary, raises ConversionError on failure.
+    """
+    base_name = output_base_name(file_path)
+    dump_json = os.path.join(output_dir, f"{base_name}.probe.json") if dump_probe_json else None
+
+    with instrumentation.stage("probe"):
+        media = probe_media(file_path, probe_cache, probe_backend, dump_json)
+    summary = process_media(media, file_path, base_name, audio_policy, output_dir, keep_subtitles, job_journal, ffmpeg_timeout,
+                            profiles, selection, dedup_index, segment_encode, spool, loudness)
+    if summary.measured and probe_cache is not None:
+        # Later conversions of the file reuse the measurement instead of decoding the tracks again
+        probe_cache.put(file_path, media.to_dict())
+    return summary
+
+def plan_outputs(media, base_name, audio_policy=DEFAULT_AUDIO_POLICY, output_dir=".", keep_subtitles=False, profiles=None,
+                 loudness=None):
     """
-    Function to extract multiple subtitle streams from the video file.
+    Function to fill in the output filename (and audio output mode) of every track of the media model.
+
+    Subtitles that can become LRC are only streamed to the LRC converter, their
+    own file is written only when keep_subtitles is set. Every audio track also
+    gets one output per profile in profiles, named <track>_<profile name>.<extension>.
+    When loudness (a loudnessAnalysis.LoudnessSettings) normalizes, every audio output is encoded.
+
+    Returns the cover image filename, or None when the file has no cover.
     """
+    # All output files share this path prefix
+    base_name = os.path.join(output_dir, str(base_name))
+
+    for audio in media.audio:
+        # Decide between stream copy and transcoding, and generate the output filename
+        audio.output_mode, extension = choose_audio_output(audio.format_name, audio_policy, loudness is not None and loudness.normalize,
+                                                           audio.format_profile)
+        audio.normalization = loudness.name if loudness is not None else None
+        track_name = base_name if len(media.audio) == 1 else f"{base_name}_track{audio.ffmpeg_track_order}"
+        audio.output_filename = f"{track_name}.{extension}"
+        audio.profile_outputs = [f"{track_name}_{profile.name}.{profile.extension}" for profile in profiles or []]
+
+    for subtitle in media.text:
+        subtitle_filename = f"{base_name}_track{subtitle.ffmpeg_track_order}.{subtitle.format_name}"
+        if subtitle.format_name in LRC_SOURCE_FORMATS:
+            subtitle.lrc_filename = f"{base_name}_track{subtitle.ffmpeg_track_order}.lrc"
+            subtitle.output_filename = subtitle_filename if keep_subtitles else None
+        else:
+            subtitle.output_filename = subtitle_filename
+
+    return f"{base_name}_cover.jpg" if media.general.cover else None
+
+def journal_steps(audio_info_list, subtitle_info_list, cover_image=None):
+    # (track, kind, output file) of every output the extraction writes, as recorded in the job journal
+    steps = [("cover", "cover", cover_image)] if cover_image else []
+    for audio_info in audio_info_list:
+        # Normalized outputs are other steps than plain ones written to the same files
+        tag = f"@{audio_info.normalization}" if audio_info.normalization else ""
+        steps.append((f"a:{audio_info.ffmpeg_track_order}", f"audio{tag}", audio_info.output_filename))
+        for index, profile_output in enumerate(audio_info.profile_outputs):
+            steps.append((f"a:{audio_info.ffmpeg_track_order}", f"profile{index}{tag}", profile_output))
     for subtitle_info in subtitle_info_list:
-        # Construct FFmpeg command to extract subtitle
-        ffmpeg_command = f"ffmpeg -i \"{input_file}\" -map 0:s:{subtitle_info.ffmpeg_track_order} \"{subtitle_info.output_filename}\""
-        try:
-            print(f"Running FFmpeg command to extract subtitle: {ffmpeg_command}")
-            subprocess.run(ffmpeg_command, shell=True)
-            print(f"Subtitle extracted to {subtitle_info.output_filename}")
-        except Exception as e:
-            print(f"Error extracting subtitle: {e}")
+        if subtitle_info.output_filename:
+            steps.append((f"s:{subtitle_info.ffmpeg_track_order}", "subtitle", subtitle_info.output_filename))
+        if subtitle_info.lrc_filename:
+            steps.append((f"s:{subtitle_info.ffmpeg_track_order}", "lrc", subtitle_info.lrc_filename))
+    return steps
 
-def process_json_file(json_file_name, original_file, current_millis):
+def dedup_signatures(input_file, audio_info_list, subtitle_info_list, cover_image=None):
     """
-    Function to process the JSON file and extract audio, cover image, and subtitle information.
+    Function to compute the content signature of every planned output, returns a dict of journal step -> signature.
+
+    Audio outputs are keyed by their source track and the hash of its first
+    packets, so remuxes of the same audio in another container match. Other
+    outputs are keyed by a partial hash of the input and only match re-uploads of the same file.
     """
-    # List to store audio and subtitle information
-    audio_info_list = []
-    subtitle_info_list = []
+    input_hash = None
+    audio_by_track = {f"a:{audio_info.ffmpeg_track_order}": audio_info for audio_info in audio_info_list}
+    unhashed = [audio_info for audio_info in audio_info_list
+                if audio_info.content_hash is None and audio_info.duration is not None and audio_info.stream_size is not None]
+    for track_order, content_hash in track_content_hashes(input_file, unhashed).items():
+        audio_by_track[f"a:{track_order}"].content_hash = content_hash
+    signatures = {}
+    for step in journal_steps(audio_info_list, subtitle_info_list, cover_image):
+        track, kind, output_file = step
+        if track in audio_by_track:
+            # ".opus" for the main output, "_mp3_320k.mp3" for a profile output
+            audio_info = audio_by_track[track]
+            output_suffix = output_file[len(os.path.splitext(audio_info.output_filename)[0]):]
+            signatures[step] = track_signature(audio_info, output_suffix)
+        else:
+            input_hash = input_hash or partial_hash(input_file)
+            signatures[step] = make_signature("input", input_hash, track, kind, os.path.splitext(output_file)[1])
+    return signatures
 
-    # Read and load the JSON file
-    try:
-        with open(json_file_name, 'r') as json_file:
-            data = json.load(json_file)
-
-            # Navigate to "media" -> "track"
-            media_info = data.get("media", {})
-            track_info = media_info.get("track", [])
-            
-            # Ensure "track" is a list and process each track
-            if isinstance(track_info, list):
-                first_element_processed = False
-                audio_count = None
-                text_count = None
-                cover_image_found = False
-
-                for track in track_info:
-                    # First element: capture metadata information
-                    if not first_element_processed:
-                        first_element_processed = True
-                        # Extract "AudioCount" and "TextCount" and convert to int if they're strings
-                        audio_count = track.get("AudioCount")
-                        text_count = track.get("TextCount")
-                        if audio_count is not None:
-                            try:
-                                audio_count = int(audio_count)
-                            except ValueError:
-                                audio_count = 0  # Set to 0 if conversion fails
-
-                            print(f"AudioCount: {audio_count}")
-                        if text_count is not None:
-                            try:
-                                text_count = int(text_count)
-                            except ValueError:
-                                text_count = 0  # Set to 0 if conversion fails
-                            print(f"TextCount: {text_count}")
-                        
-                        # Check if "Cover" exists and is "Yes"
-                        cover = track.get("Cover")
-                        if cover == "Yes":
-                            cover_image_found = True
-                            cover_image_filename = f"{current_millis}_cover.jpg"
-                            print(f"Cover: {cover}, Cover Image Filename: {cover_image_filename}")
-
-                        # Check if "extra" exists in "track"
-                        extra_info = track.get("extra")
-                        if extra_info:
-                            artist = extra_info.get("ARTIST", "Unknown")
-                            date = extra_info.get("DATE", "Unknown")
-                            purl = extra_info.get("PURL", "Unknown")
-                            
-                            print(f"ARTIST: {artist}")
-                            print(f"DATE: {date}")
-                            print(f"PURL: {purl}")
-
-                # Extract the cover image if it exists
-                if cover_image_found:
-                    extract_cover_image(original_file, cover_image_filename)
-
-                # Process audio streams
-                if audio_count is None or audio_count < 1:
-                    print("No audio tracks found in the video file.")
-                elif audio_count == 1:
-                    # Only one audio track, assume type_order = 1
-                    for track in track_info:
-                        if track.get("@type") == "Audio":
-                            audio_format = track.get("Format", "Unknown Format").lower()
-                            output_filename = f"{current_millis}.{audio_format}"
-                            audio_info = AudioInfo(1, audio_format, 0, output_filename)  # ffmpeg track order is 0
-                            audio_info_list.append(audio_info)
-                            break  # Stop after processing the first (and only) audio track
-                else:
-                    # Multiple audio tracks, process with the current logic
-                    track_counter = 0
-                    for track in track_info:
-                        if track.get("@type") != "Audio":
-                            continue  # Skip non-audio tracks
-                        
-                        # Extract the format and convert it to lowercase
-                        audio_format = track.get("Format", "Unknown Format").lower()
-
-                        # Extract type_order from "@typeorder" or use the current track counter
-                        type_order = track.get("@typeorder", track_counter)
-
-                        # FFmpeg track order is track_counter since "@typeorder" might not always be present
-                        ffmpeg_track_order = track_counter
-
-                        # Generate output filename for this audio track
-                        output_filename = f"{current_millis}_track{ffmpeg_track_order}.{audio_format}"
-
-                        # Store this info in the custom datatype
-                        audio_info = AudioInfo(type_order, audio_format, ffmpeg_track_order, output_filename)
-                        audio_info_list.append(audio_info)
-
-                        # Increment track_counter
-                        track_counter += 1
-
-                # Process subtitle streams
-                if text_count is None or text_count < 1:
-                    print("No subtitle tracks found in the video file.")
-                else:
-                    track_counter = 0
-                    for track in track_info:
-                        if track.get("@type") != "Text":
-                            continue  # Skip non-subtitle tracks
-                        
-                        # Extract the format and convert it to lowercase
-                        subtitle_format = track.get("Format", "Unknown Format").lower()
-
-                        # Fix for format values: Replace "UTF8"/"UTF-8" with "SRT", and "S_TEXT/WEBVTT" with "VTT"
-                        if subtitle_format in ["utf8", "utf-8"]:
-                            subtitle_format = "srt"
-                        elif subtitle_format == "s_text/webvtt":
-                            subtitle_format = "vtt"
-
-                        # Extract type_order and ffmpeg_track_order
-                        type_order = track.get("@typeorder", track_counter)
-                        ffmpeg_track_order = track_counter
-
-                        # Generate the output filename for this subtitle track
-                        output_filename = f"{current_millis}_track{ffmpeg_track_order}.{subtitle_format}"
-
-                        # Store subtitle info in the custom datatype
-                        subtitle_info = SubtitleInfo(type_order, subtitle_format, ffmpeg_track_order, output_filename)
-                        subtitle_info_list.append(subtitle_info)
-
-                        # Increment track_counter
-                        track_counter += 1
-
-                # After processing all tracks, print audio and subtitle information and extract streams
-                if audio_info_list:
-                    print("\nAudio Streams Information:")
-                    for audio in audio_info_list:
-                        print(f"Audio Stream {audio.type_order}: Format - {audio.format_name}, FFmpeg Track Order: {audio.ffmpeg_track_order}, Output: {audio.output_filename}")
-                    extract_audio(original_file, audio_info_list)
-
-                    # Convert Audio to MP3 here
-                    convert_audio_to_mp3(audio_info_list)
-
-                if subtitle_info_list:
-                    print("\nSubtitle Streams Information:")
-                    for subtitle in subtitle_info_list:
-                        print(f"Subtitle Stream {subtitle.type_order}: Format - {subtitle.format_name}, FFmpeg Track Order: {subtitle.ffmpeg_track_order}, Output: {subtitle.output_filename}")
-                    extract_subtitles(original_file, subtitle_info_list)
-
-                    # Convert SRT to LRC here
-                    convert_srt_to_lrc(subtitle_info_list)
-            else:
-                print("Track information not found in JSON.")
+def reuse_duplicates(dedup_index, input_file, audio_info_list, subtitle_info_list, cover_image, summary):
+    """
+    Function to link or copy outputs already produced from identical content.
 
-    except FileNotFoundError:
-        print(f"JSON file {json_file_name} not found.")
-    except json.JSONDecodeError:
-        print("Error decoding the JSON file.")
+    A track is only reused when every one of its outputs is available.
+    Returns the (audio, subtitle, cover) still to extract and the reused journal steps.
+    """
+    signatures = dedup_signatures(input_file, audio_info_list, subtitle_info_list, cover_image)
+    steps_by_track = {}
+    for step in signatures:
+        steps_by_track.setdefault(step[0], []).append(step)
+
+    reused_tracks = set()
+    reused_steps = []
+    for track, steps in steps_by_track.items():
+        sources = [dedup_index.find(signatures[step]) for step in steps]
+        if not all(sources):
+            continue
+        for step, source in zip(steps, sources):
+            reused_bytes, linked = dedup_index.reuse(source, step[2])
+            if linked:
+                summary.dedup_linked_bytes += reused_bytes
+            else:
+                summary.dedup_copied_bytes += reused_bytes
+            print(f"{'Linked' if linked else 'Copied'} {source} to {step[2]} (identical content)")
+        reused_tracks.add(track)
+        reused_steps += steps
+
+    audio_info_list = [audio for audio in audio_info_list if f"a:{audio.ffmpeg_track_order}" not in reused_tracks]
+    subtitle_info_list = [subtitle for subtitle in subtitle_info_list if f"s:{subtitle.ffmpeg_track_order}" not in reused_tracks]
+    cover_image = None if "cover" in reused_tracks else cover_image
+    return audio_info_list, subtitle_info_list, cover_image, reused_steps
+
+def process_media(media, original_file, base_name, audio_policy=DEFAULT_AUDIO_POLICY, output_dir=".", keep_subtitles=False,
+                  job_journal=None, ffmpeg_timeout=None, profiles=None, selection=None, dedup_index=None, segment_encode=False,
+                  spool=None, loudness=None):
+    """
+    Function to extract the audio, cover image, and subtitle streams described by the media model.
+
+    Only the tracks chosen by the trackSelection.SelectionPolicy in selection are
+    extracted, None selects every track. Audio tracks are also encoded to every
+    outputProfiles.OutputProfile in profiles.
+
+    With a job_journal, tracks whose outputs are all done are skipped and the
+    state of every extracted output is recorded. With a dedup_index, outputs of
+    content that was already produced are linked or copied instead of being
+    extracted again. With segment_encode, long tracks transcoded to MP3 are
+    encoded in parallel segments (see extract_streams). A remote original_file is
+    streamed to FFmpeg or copied to spool, see extract_streams.
+
+    With loudness (a loudnessAnalysis.LoudnessSettings), audio tracks without a
+    measurement are measured in the extraction run, also when their outputs are
+    already done, and their statistics are reported in summary.audio_stats. When
+    it normalizes, the audio outputs are encoded with the gain that brings each
+    track to the target, see extract_normalized(). Returns an ExtractionSummary,
+    raises ConversionError when FFmpeg fails or exits without writing an output.
+    """
+    summary = ExtractionSummary()
+    summary.media = media
+    # Unselected tracks are left out of the plan, so they are never mapped, read or encoded
+    selected_audio, selected_text, skipped_tracks = select_tracks(media, selection)
+    for track, reason in skipped_tracks:
+        kind = "Audio" if track in media.audio else "Subtitle"
+        print(f"Skipping {kind} Stream {track.type_order} ({track.language or 'unknown language'}, {track.format_name}): {reason}")
+    # Every track is planned, so output names follow the file's track count and do not change with the selection
+    cover_image_filename = plan_outputs(media, base_name, audio_policy, output_dir, keep_subtitles, profiles, loudness)
+    audio_info_list = summary.audio_info_list = selected_audio
+    subtitle_info_list = summary.subtitle_info_list = selected_text
+    # An audio file copied to its own format would be written over itself
+    for step in journal_steps(audio_info_list, subtitle_info_list):
+        if not is_remote(original_file) and os.path.exists(step[2]) and os.path.samefile(step[2], original_file):
+            raise ConversionError(f"Output {step[2]} would overwrite the input file, choose another output directory")
+
+    general = media.general
+    print(f"AudioCount: {len(audio_info_list)}")
+    print(f"TextCount: {len(subtitle_info_list)}")
+    if cover_image_filename:
+        print(f"Cover: Yes, Cover Image Filename: {cover_image_filename}")
+    if general.artist or general.date or general.purl:
+        print(f"ARTIST: {general.artist or 'Unknown'}")
+        print(f"DATE: {general.date or 'Unknown'}")
+        print(f"PURL: {general.purl or 'Unknown'}")
+
+    if not audio_info_list:
+        print("No audio tracks found in the video file.")
+    if not subtitle_info_list:
+        print("No subtitle tracks found in the video file.")
+
+    # Print audio and subtitle information
+    if audio_info_list:
+        print("\nAudio Streams Information:")
+        for audio in audio_info_list:
+            print(f"Audio Stream {audio.type_order}: Format - {audio.format_name}, FFmpeg Track Order: {audio.ffmpeg_track_order}, Mode: {audio.output_mode}, Output: {audio.output_filename}")
+            for profile_output in audio.profile_outputs:
+                print(f"    Profile output: {profile_output}")
+
+    if subtitle_info_list:
+        print("\nSubtitle Streams Information:")
+        for subtitle in subtitle_info_list:
+            print(f"Subtitle Stream {subtitle.type_order}: Format - {subtitle.format_name}, FFmpeg Track Order: {subtitle.ffmpeg_track_order}, Output: {subtitle.output_filename}, LRC: {subtitle.lrc_filename}")
+
+    summary.cover_image = cover_image_filename
+    pending_audio, pending_subtitles, pending_cover = audio_info_list, subtitle_info_list, cover_image_filename
+    if job_journal is not None:
+        # A track is only extracted again when one of its outputs is not done yet
+        done = job_journal.plan(original_file, journal_steps(audio_info_list, subtitle_info_list, cover_image_filename))
+        pending_audio = [audio for audio in audio_info_list if any(step[:2] not in done for step in journal_steps([audio], []))]
+        pending_subtitles = [subtitle for subtitle in subtitle_info_list
+                             if any(step[:2] not in done for step in journal_steps([], [subtitle]))]
+        pending_cover = cover_image_filename if ("cover", "cover") not in done else None
+        skipped = len(audio_info_list) + len(subtitle_info_list) + bool(cover_image_filename) \
+            - len(pending_audio) - len(pending_subtitles) - bool(pending_cover)
+        if skipped:
+            print(f"Skipping {skipped} output track(s) already done according to the job journal")
+
+    if dedup_index is not None and (pending_audio or pending_subtitles or pending_cover):
+        pending_audio, pending_subtitles, pending_cover, reused_steps = reuse_duplicates(
+            dedup_index, original_file, pending_audio, pending_subtitles, pending_cover, summary)
+        if job_journal is not None and reused_steps:
+            job_journal.mark(original_file, reused_steps, DONE)
+        if summary.dedup_linked_bytes or summary.dedup_copied_bytes:
+            print(f"Deduplicated outputs: {summary.dedup_linked_bytes} bytes linked (disk space saved), "
+                  f"{summary.dedup_copied_bytes} bytes copied")
+
+    # Measurements in the probe cache are reused, the others are taken during the extraction run
+    measure = [audio for audio in audio_info_list if not is_current(audio.loudness)] if loudness is not None else []
+    for audio in audio_info_list:
+        if loudness is not None and audio not in measure:
+            print(f"Loudness of audio track {audio.ffmpeg_track_order} (probe cache): {describe_measurement(audio.loudness)}")
+    if not (pending_audio or pending_subtitles or pending_cover or measure):
+        print(f"Nothing left to extract from {original_file}")
+        summary.lrc_files = [subtitle.lrc_filename for subtitle in subtitle_info_list if subtitle.lrc_filename]
+        summary.audio_stats = [track_stats(audio, loudness) for audio in audio_info_list] if loudness is not None else []
+        return summary
+
+    # The cover bytes are copied straight from the container headers when possible, FFmpeg only gets the rest
+    ffmpeg_cover = pending_cover
+    if pending_cover:
+        copied = copy_cover(original_file, pending_cover)
+        if copied:
+            print(f"Cover image copied from the container to {pending_cover}")
+            ffmpeg_cover = None
+        elif copied is None:
+            print(f"No cover image in the headers of {original_file}, the cover is skipped")
+            pending_cover = ffmpeg_cover = summary.cover_image = None
+
+    # Extract the cover image, audio and subtitle streams in one pass over the input, subtitles become LRC on the fly
+    steps = journal_steps(pending_audio, pending_subtitles, pending_cover)
+    for track, kind, output_file in steps:
+        # FFmpeg truncates existing outputs in place, which would also change every hard linked duplicate
+        if os.path.exists(output_file) and os.stat(output_file).st_nlink > 1:
+            os.remove(output_file)
+    if job_journal is not None:
+        job_journal.mark(original_file, steps, RUNNING)
+    try:
+        if loudness is not None and loudness.normalize and pending_audio:
+            summary.saved_bytes = extract_normalized(original_file, pending_audio, pending_subtitles, ffmpeg_cover, ffmpeg_timeout,
+                                                     profiles, segment_encode, spool, loudness, measure)
+        elif pending_audio or pending_subtitles or ffmpeg_cover or measure:
+            summary.saved_bytes = extract_streams(original_file, pending_audio, pending_subtitles, ffmpeg_cover, ffmpeg_timeout,
+                                                  profiles, segment_encode, spool, loudness, measure)
+        summary.measured = bool(measure)
+    except ConversionError as e:
+        if job_journal is not None:
+            job_journal.mark(original_file, steps, FAILED, str(e))
+        raise
+    # LRC conversions that failed are left out, FFmpeg exiting with code 0 without writing an output is an error
+    written = set(journal_steps(pending_audio, pending_subtitles, pending_cover))
+    missing = [step[2] for step in steps if step in written and not os.path.exists(step[2])]
+    if job_journal is not None:
+        # Outputs that were not written (or LRC conversions that failed) are retried on the next run
+        job_journal.mark(original_file, [step for step in steps if step in written and os.path.exists(step[2])], DONE)
+        job_journal.mark(original_file, [step for step in steps if step not in written or not os.path.exists(step[2])], FAILED,
+                         "output was not written")
+    if missing:
+        raise ConversionError(f"FFmpeg did not write {', '.join(missing)}")
+    if dedup_index is not None:
+        # Register the new outputs so later copies of the same content can reuse them
+        for step, signature in dedup_signatures(original_file, pending_audio, pending_subtitles, pending_cover).items():
+            dedup_index.add(signature, step[2])
+    summary.lrc_files = [subtitle.lrc_filename for subtitle in subtitle_info_list if subtitle.lrc_filename]
+    summary.audio_stats = [track_stats(audio, loudness) for audio in audio_info_list] if loudness is not None else []
+
+    return summary
 
 def convert_srt_to_lrc(subtitle_info_list):
     """
-    Function to convert SRT subtitle files to LRC format.
+    Function to convert extracted SRT, WebVTT and ASS subtitle files to LRC format.
+
+    Conversion runs in Python, line by line, without starting FFmpeg.
+    Returns the list of LRC files that were written.
     """
-    srt_files = [subtitle for subtitle in subtitle_info_list if subtitle.format_name == "srt"]
+    subtitle_files = [subtitle for subtitle in subtitle_info_list
+                      if subtitle.format_name in LRC_SOURCE_FORMATS and subtitle.output_filename]
+    lrc_files = []
 
-    # If no SRT files found, exit the function
-    if not srt_files:
+    # If no convertible subtitle files found, exit the function
+    if not subtitle_files:
         print("No SRT subtitle files found for conversion.")
-        return
-
-    for i, subtitle in enumerate(srt_files):
-        # Get the filename without extension
-        srt_filename_without_ext = os.path.splitext(subtitle.output_filename)[0]
-        
-        # Handle multiple SRT files by appending a number to the output filename
-        if len(srt_files) > 1:
-            lrc_output_filename = f"{srt_filename_without_ext}_{i + 1}.lrc"
-        else:
-            lrc_output_filename = f"{srt_filename_without_ext}.lrc"
-        
-        # FFmpeg command to convert the file
-        ffmpeg_command = ["ffmpeg", "-i", f"{srt_filename_without_ext}.srt", lrc_output_filename]
-        
-        print(f"Converting {srt_filename_without_ext}.srt to {lrc_output_filename}")
-        
-        # Run the ffmpeg command using subprocess
+        return lrc_files
+
+    for subtitle in subtitle_files:
+        if not subtitle.lrc_filename:
+            subtitle.lrc_filename = f"{os.path.splitext(subtitle.output_filename)[0]}.lrc"
+
+        print(f"Converting {subtitle.output_filename} to {subtitle.lrc_filename}")
         try:
-            subprocess.run(ffmpeg_command, check=True)
-            print(f"Successfully converted to {lrc_output_filename}")
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to convert {srt_filename_without_ext}.srt to LRC. Error: {e}")
+            with instrumentation.stage("lrc", subtitle.lrc_filename):
+                convert_file_to_lrc(subtitle.output_filename, subtitle.format_name, subtitle.lrc_filename)
+            print(f"Successfully converted to {subtitle.lrc_filename}")
+            lrc_files.append(subtitle.lrc_filename)
+        except (OSError, ValueError) as e:
+            print(f"Failed to convert {subtitle.output_filename} to LRC. Error: {e}")
+            subtitle.lrc_filename = None
 
-def convert_audio_to_mp3(audio_info_list):
+    return lrc_files
+
+def stream_subtitle_to_lrc(subtitle, read_fd):
     """
-    Function to convert extracted audio files to MP3 format.
-    
-    Parameters:
-    - audio_info_list (list): A list of AudioInfo objects containing details about the extracted audio files.
+    Function run in a thread to convert a subtitle streamed by FFmpeg through a pipe to LRC.
+
+    The pipe is always read to the end so FFmpeg never blocks on a full pipe.
+    """
+    with open(read_fd, 'r', encoding='utf-8', errors='replace') as stream:
+        try:
+            line_count = convert_stream_to_lrc(stream, subtitle.format_name, subtitle.lrc_filename)
+            print(f"Subtitle converted to {subtitle.lrc_filename} ({line_count} lines)")
+        except (OSError, ValueError) as e:
+            print(f"Failed to convert subtitle track {subtitle.ffmpeg_track_order} to LRC. Error: {e}")
+            subtitle.lrc_filename = None
+        for _ in stream:
+            pass
+
+def build_extraction_command(input_file, audio_info_list, subtitle_info_list, cover_image=None, lrc_pipes=None, profiles=None,
+                             separate_audio=(), gains=None, measure=()):
+    """
+    Function to build a single FFmpeg command that writes every selected stream.
+
+    The input is opened once and each audio, subtitle and cover output gets its
+    own -map, so the container is only read a single time. lrc_pipes maps the
+    id() of a subtitle track to the pipe its text is streamed to for LRC conversion.
+    The profile outputs of each audio track (see plan_outputs) share one decode.
+    separate_audio holds the id() of audio tracks whose main output is encoded
+    by other runs (see segmentEncode), only their profile outputs are written here.
+    gains maps a track order to the loudness gain filter of all its outputs. The
+    audio tracks in measure also feed the loudness measurement filters, which
+    share the decode of their outputs (see loudnessAnalysis).
     """
-    audio_counter = 0
+    lrc_pipes = lrc_pipes or {}
+    gains = gains or {}
+    filter_arguments, profile_arguments = fanout_arguments([
+        (audio_info.ffmpeg_track_order, list(zip(profiles, audio_info.profile_outputs)))
+        for audio_info in audio_info_list if profiles and audio_info.profile_outputs
+    ], gains)
+    filters = filter_arguments[1:] + [measurement_filter(f"0:a:{audio_info.ffmpeg_track_order}", f"m{audio_info.ffmpeg_track_order}")
+                                      for audio_info in measure]
+    # -y: outputs have deterministic names, a resumed run overwrites what an interrupted one left behind
+    command = ["ffmpeg", "-y", "-i", input_file] + (["-filter_complex", ";".join(filters)] if filters else [])
+
+    # Cover image: first attached picture (video streams that are not "real" video)
+    if cover_image:
+        command += ["-map", "0:v", "-map", "-0:V", "-c:v", "copy", cover_image]
+
     for audio_info in audio_info_list:
-        if audio_info.format_name.lower() == "mp3":
-            print(f"Audio {audio_info.output_filename} is already in MP3 format. Skipping conversion.")
+        if id(audio_info) in separate_audio:
             continue
+        # Audio is remuxed or encoded to MP3 directly from the source, no intermediate file
+        command += ["-map", f"0:a:{audio_info.ffmpeg_track_order}"]
+        if audio_info.ffmpeg_track_order in gains:
+            command += ["-af", gains[audio_info.ffmpeg_track_order]]
+        command += audio_codec_arguments(audio_info) + [audio_info.output_filename]
+    command += profile_arguments
 
-        # Extract the filename without the extension
-        audio_file_no_ext = os.path.splitext(audio_info.output_filename)[0]
-
-        # Generate output filename for the MP3 file
-        if audio_counter == 0:
-            output_mp3_file = f"{audio_file_no_ext}.mp3"
-        else:
-            output_mp3_file = f"{audio_file_no_ext}_{audio_counter}.mp3"
-
-        # Build the FFmpeg command
-        command = ['ffmpeg', '-i', audio_info.output_filename, output_mp3_file]
-
-        # Execute the FFmpeg command
+    for subtitle_info in subtitle_info_list:
+        if subtitle_info.output_filename:
+            command += ["-map", f"0:s:{subtitle_info.ffmpeg_track_order}", subtitle_info.output_filename]
+        if id(subtitle_info) in lrc_pipes:
+            # Stream the subtitle text to the LRC converter instead of writing an intermediate file
+            stream_format = LRC_SOURCE_FORMATS[subtitle_info.format_name]
+            command += ["-map", f"0:s:{subtitle_info.ffmpeg_track_order}", "-c:s", "subrip" if stream_format == "srt" else "ass",
+                        "-f", stream_format, f"pipe:{lrc_pipes[id(subtitle_info)]}"]
+
+    if measure:
+        command += measurement_output([f"m{audio_info.ffmpeg_track_order}" for audio_info in measure])
+    return command
+
+def count_extraction_outputs(audio_info_list, subtitle_info_list, cover_image=None):
+    # Number of outputs written by the single-pass extraction command
+    profile_count = sum(len(audio_info.profile_outputs) for audio_info in audio_info_list)
+    return len(audio_info_list) + profile_count + len(subtitle_info_list) + (1 if cover_image else 0)
+
+def report_saved_io(input_file, output_count):
+    """
+    Function to report the input bytes saved by reading the container once
+    instead of once per extracted stream.
+    """
+    try:
+        file_size = input_size(input_file)
+    except OSError:
+        file_size = 0
+
+    saved_bytes = file_size * max(output_count - 1, 0)
+    print(f"Read {input_file} once for {output_count} output(s), saved {saved_bytes} bytes of input I/O")
+    return saved_bytes
+
+def extraction_resource(audio_info_list, measure=()):
+    # A run that encodes (or measures) any track is CPU bound, pure stream copies are I/O bound
+    if measure or any(audio_info.output_mode != "copy" or audio_info.profile_outputs for audio_info in audio_info_list):
+        return jobRunner.CPU
+    return jobRunner.IO
+
+def plan_segmented_encode(input_file, audio_info, timeout=None, audio_filter=None):
+    # SegmentedEncode for a track transcoded to MP3 that is long enough to split, None to encode it in the single pass
+    if audio_info.output_mode != "transcode":
+        return None
+    count = segment_count(audio_info.duration, audio_info.sampling_rate)
+    if count < 2:
+        return None
+    return SegmentedEncode(input_file, audio_info.ffmpeg_track_order, audio_info.output_filename, audio_codec_arguments(audio_info),
+                           audio_info.duration, audio_info.sampling_rate, count, timeout, audio_filter)
+
+def spool_reason(input_file, segmented=False):
+    """
+    Function to tell why FFmpeg needs a local, seekable copy of a remote input, None when it can read it from a pipe.
+    """
+    if segmented:
+        return "segmented encodes read the input once per segment"
+    if os.name == 'nt':
+        return "FFmpeg cannot be handed a pipe descriptor on Windows"
+    container, problem = sniff_container(input_file)
+    if container in ("mp4", "m4a"):
+        # FFmpeg needs the "moov" index before the samples, only "fast start" files can be read front to back
         try:
-            print(f"Converting {audio_info.output_filename} to MP3...")
-            subprocess.run(command, check=True)
-            print(f"Conversion complete: {output_mp3_file}")
-        except subprocess.CalledProcessError as e:
-            print(f"Error during audio conversion: {e}")
-        
-        # Increment audio counter for handling multiple files
-        audio_counter += 1
+            with open_input(input_file) as media_file:
+                reader = RangeReader(media_file)
+                moov, mdat = find_top_level_box(reader, b"moov"), find_top_level_box(reader, b"mdat")
+        except (ValueError, struct.error) as e:
+            return f"its MP4 headers cannot be read ({e})"
+        if moov is None or (mdat is not None and mdat[0] < moov[0]):
+            return "its 'moov' box comes after the media data"
+        return None
+    if container not in STREAMABLE_CONTAINERS:
+        return f"FFmpeg may seek in {CONTAINERS[container][0] if container else 'unknown'} files"
+    return None
+
+def extract_streams(input_file, audio_info_list, subtitle_info_list, cover_image=None, timeout=None, profiles=None,
+                    segment_encode=False, spool=None, loudness=None, measure=()):
+    """
+    Function to extract the cover image, audio and subtitle streams with a single FFmpeg run.
+
+    Audio tracks are also encoded to their profile outputs when profiles are
+    given. With segment_encode, long tracks transcoded to MP3 are taken out of
+    the single run and encoded in time segments by parallel FFmpeg runs, which
+    are joined afterwards. FFmpeg is killed after timeout seconds when given.
+    A remote input_file is streamed to FFmpeg over a pipe, or copied to spool
+    (a remoteInput.Spool) first when FFmpeg has to seek in it, see spool_reason().
+
+    The audio tracks in measure are measured by the same run, their loudness is
+    set from its log. Outputs of tracks to normalize (see plan_outputs) get the
+    gain computed from their measurement and the targets of loudness, a
+    loudnessAnalysis.LoudnessSettings.
+    Raises ConversionError when FFmpeg fails, times out or cannot be started.
+    """
+    # Each measured track would otherwise be read and decoded by an analysis run of its own
+    output_count = count_extraction_outputs(audio_info_list, subtitle_info_list, cover_image) + len(measure)
+    if output_count == 0:
+        print("No streams selected for extraction.")
+        return 0
+
+    source = input_file  # What FFmpeg opens: the input file, its spooled copy or "pipe:<fd>"
+    feeder = None
+    if is_remote(input_file):
+        reason = spool_reason(input_file, segment_encode and any(plan_segmented_encode(input_file, audio_info)
+                                                                  for audio_info in audio_info_list))
+        if reason:
+            source = (spool or Spool()).fetch(input_file, reason)
+        else:
+            feeder = PipeFeeder(input_file)
+            source = feeder.ffmpeg_input
+            print(f"Streaming {input_file} to FFmpeg over a pipe, nothing is written to disk")
 
+    gains = {}  # Track order -> loudness gain filter of its outputs
+    for audio_info in audio_info_list:
+        if loudness is not None and audio_info.normalization and is_current(audio_info.loudness):
+            gains[audio_info.ffmpeg_track_order] = gain_filter(track_gain(audio_info.loudness, loudness))
+
+    segmented = {}  # id() of the audio track -> SegmentedEncode of its main output
+    if segment_encode:
+        for audio_info in audio_info_list:
+            segmented_encode = plan_segmented_encode(source, audio_info, timeout, gains.get(audio_info.ffmpeg_track_order))
+            if segmented_encode:
+                segmented[id(audio_info)] = segmented_encode
+                print(f"Encoding {audio_info.output_filename} in {len(segmented_encode.start_frames)} parallel segments")
+
+    lrc_subtitles = [subtitle_info for subtitle_info in subtitle_info_list if subtitle_info.lrc_filename]
+    temporary_subtitles = []
+    if lrc_subtitles and os.name == 'nt':
+        # Windows cannot hand extra pipe descriptors to FFmpeg: extract to a file and convert it afterwards
+        for subtitle_info in lrc_subtitles:
+            if not subtitle_info.output_filename:
+                subtitle_info.output_filename = f"{os.path.splitext(subtitle_info.lrc_filename)[0]}.{subtitle_info.format_name}"
+                temporary_subtitles.append(subtitle_info)
+        lrc_subtitles = []
+
+    # One pipe per subtitle converted on the fly: FFmpeg writes to one end, a converter thread reads the other
+    pipes = [(subtitle_info,) + os.pipe() for subtitle_info in lrc_subtitles]
+    lrc_pipes = {id(subtitle_info): write_fd for subtitle_info, read_fd, write_fd in pipes}
+    ffmpeg_command = build_extraction_command(source, audio_info_list, subtitle_info_list, cover_image, lrc_pipes, profiles,
+                                              segmented, gains, measure)
+    single_pass_audio = [audio_info for audio_info in audio_info_list if id(audio_info) not in segmented]
+    pass_fds = list(lrc_pipes.values()) + ([feeder.read_fd] if feeder else [])
+    # The measurements are read back from the whole log of the run
+    job = jobRunner.Job(ffmpeg_command, input_file, extraction_resource(single_pass_audio, measure), timeout, pass_fds,
+                        keep_stderr=bool(measure))
+    # Nothing is left for the single run when every output is a segmented encode
+    jobs = [job] if output_count > len(segmented) else []
+    for segmented_encode in segmented.values():
+        jobs += segmented_encode.jobs()
+    if segmented:
+        # Every encoder of a segmented encode counts, each job waits for an encode slot of its own (there is no feeder to start)
+        for segment_job in jobs:
+            segment_job.slot = encode_slots
+    converters = [threading.Thread(target=stream_subtitle_to_lrc, args=(subtitle_info, read_fd))
+                  for subtitle_info, read_fd, write_fd in pipes]
+    for converter in converters:
+        converter.start()  # The readers own the read ends, they get EOF once FFmpeg exits
 
-def extract_audio(input_file, audio_info_list):
+    try:
+        with contextlib.ExitStack() as encode_slot:
+            # Wait for a free encode slot when running inside a batch, the wait is recorded as its own stage
+            with instrumentation.stage("wait"):
+                if not segmented:
+                    encode_slot.enter_context(encode_slots or contextlib.nullcontext())
+            with instrumentation.stage("extract"):
+                if jobs and jobs[0] is job:
+                    print(f"Running FFmpeg command: {subprocess.list2cmdline(ffmpeg_command)}")
+                if feeder:
+                    feeder.start()  # Only once an encode slot is free, so the download never waits on an idle connection
+                results = jobRunner.run_jobs(jobs, fail_fast=bool(segmented))
+                instrumentation.record_jobs(results)
+                for converter in converters:
+                    converter.join()
+                if feeder:
+                    feeder.join()
+
+        # A broken download makes FFmpeg fail too, its own error says more
+        if feeder and feeder.error:
+            raise ConversionError(f"Streaming {input_file} to FFmpeg failed: {feeder.error}")
+        for result in results:
+            if not result.success:
+                raise ConversionError(f"FFmpeg {result.error} while extracting {result.job.label}\n{result.stderr_tail}".rstrip())
+        for segmented_encode in segmented.values():
+            segmented_encode.join()
+        for audio_info in measure:
+            # measure is never empty without the single run, it is always results[0]
+            audio_info.loudness = parse_measurement(results[0].stderr_lines, f"m{audio_info.ffmpeg_track_order}",
+                                                    audio_info.duration)
+            print(f"Loudness of audio track {audio_info.ffmpeg_track_order}: {describe_measurement(audio_info.loudness)}")
+        if cover_image:
+            print(f"Cover image extracted to {cover_image}")
+        for audio_info in audio_info_list:
+            if audio_info.ffmpeg_track_order in gains:
+                print(f"Audio normalized to {audio_info.output_filename} ({gains[audio_info.ffmpeg_track_order]})")
+            else:
+                print(f"Audio extracted to {audio_info.output_filename}")
+            for profile_output in audio_info.profile_outputs:
+                print(f"Audio encoded to {profile_output}")
+        for subtitle_info in subtitle_info_list:
+            if subtitle_info.output_filename:
+                print(f"Subtitle extracted to {subtitle_info.output_filename}")
+        if feeder:
+            print(f"Streamed {feeder.bytes_sent} bytes of {input_file} to FFmpeg")
+
+        if temporary_subtitles:
+            convert_srt_to_lrc(temporary_subtitles)
+    finally:
+        jobRunner.close_fds(job)  # Only left open when the job never ran
+        if feeder:
+            feeder.join()  # Ends once FFmpeg closed the pipe, or closes the write end when it never started
+        for segmented_encode in segmented.values():
+            segmented_encode.cleanup()
+        for subtitle_info in temporary_subtitles:
+            if os.path.exists(subtitle_info.output_filename):
+                os.remove(subtitle_info.output_filename)
+            subtitle_info.output_filename = None
+
+    # Segmented encodes read the input again, only the outputs of the single run count
+    if output_count == len(segmented):
+        return 0
+    return report_saved_io(input_file, output_count - len(segmented))
+
+def extract_normalized(input_file, audio_info_list, subtitle_info_list, cover_image=None, timeout=None, profiles=None,
+                       segment_encode=False, spool=None, loudness=None, measure=()):
     """
-    Function to extract multiple audio streams from the video file
+    Function to extract the streams like extract_streams(), with every audio output normalized to the loudness targets.
+
+    Tracks already measured are encoded with their gain by the single run. The
+    others can only be encoded once they are measured: the single run copies
+    each of them, still compressed, to a temporary Matroska file next to its
+    output while measuring it, then each temporary file is encoded with the
+    gain. The source is read once either way. Returns the saved input bytes
+    reported by extract_streams().
     """
-    for audio_info in audio_info_list:
-        # Construct FFmpeg command to extract audio
-        ffmpeg_command = f"ffmpeg -i \"{input_file}\" -map 0:a:{audio_info.ffmpeg_track_order} \"{audio_info.output_filename}\""
-        try:
-            print(f"Running FFmpeg command: {ffmpeg_command}")
-            subprocess.run(ffmpeg_command, shell=True)
-            print(f"Audio extracted to {audio_info.output_filename}")
-        except Exception as e:
-            print(f"Error extracting audio: {e}")
-
-def extract_cover_image(input_file, output_image):
-    # Construct FFmpeg command to extract the cover image (assumed to be the first video stream with image data)
-    # ffmpeg_command = f"ffmpeg -i \"{input_file}\" -map 0:v -c copy -f image2 \"{output_image}\""
-    ffmpeg_command = f"ffmpeg -i \"{input_file}\" -map 0:v -map -0:V -c:v copy \"{output_image}\""
+    unmeasured = [audio_info for audio_info in audio_info_list if not is_current(audio_info.loudness)]
+    staged = []  # (track, stand-in copying it to a temporary file)
+    for audio_info in unmeasured:
+        staged_info = AudioTrack.from_dict(audio_info.to_dict())
+        staged_info.output_filename = f"{audio_info.output_filename}.measure.mka"
+        staged_info.output_mode, staged_info.profile_outputs, staged_info.normalization = "copy", [], None
+        staged.append((audio_info, staged_info))
+    measured = [audio_info for audio_info in audio_info_list if is_current(audio_info.loudness)]
+
+    staging_files = [staged_info.output_filename for audio_info, staged_info in staged]
     try:
-        print(f"Running FFmpeg command to extract cover image: {ffmpeg_command}")
-        subprocess.run(ffmpeg_command, shell=True)
-        print(f"Cover image extracted to {output_image}")
-    except Exception as e:
-        print(f"Error extracting cover image: {e}")
+        saved_bytes = extract_streams(input_file, measured + [staged_info for audio_info, staged_info in staged],
+                                      subtitle_info_list, cover_image, timeout, profiles, segment_encode, spool, loudness, measure)
+        for (audio_info, staged_info), staging_file in zip(staged, staging_files):
+            if not is_current(audio_info.loudness):
+                raise ConversionError(f"The loudness of audio track {audio_info.ffmpeg_track_order} could not be measured")
+            # The stand-in now reads the only track of the temporary file and writes the real outputs
+            staged_info.ffmpeg_track_order = 0
+            for field in ("output_filename", "output_mode", "profile_outputs", "normalization", "loudness"):
+                setattr(staged_info, field, getattr(audio_info, field))
+            extract_streams(staging_file, [staged_info], [], None, timeout, profiles, segment_encode, None, loudness)
+    finally:
+        for staging_file in staging_files:
+            if os.path.exists(staging_file):
+                os.remove(staging_file)
+    return saved_bytes
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python fileAnalyzeConvert.py <file_path>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(prog="python -m videoToAudio.fileAnalyzeConvert",
+                                     description="Analyze a video file and extract its audio, subtitles and cover image.")
+    parser.add_argument("file_path", help="video file to process, or its http(s):// or s3:// URL")
+    parser.add_argument("--audio-policy", choices=AUDIO_POLICIES, default=DEFAULT_AUDIO_POLICY,
+                        help="'copy' remuxes AAC/Opus/MP3 tracks without re-encoding, 'mp3' always produces MP3")
+    parser.add_argument("--no-probe-cache", action="store_true", help="always probe the file, ignoring the probe cache")
+    parser.add_argument("--probe-backend", choices=PROBE_BACKENDS, default=DEFAULT_PROBE_BACKEND,
+                        help="how the tracks of the file are listed: native header reading (MediaInfo for other containers), mediainfo or ffprobe")
+    parser.add_argument("--dump-probe-json", action="store_true", help="save the raw probe JSON next to the outputs")
+    parser.add_argument("--keep-subtitles", action="store_true", help="also save subtitles that are converted to LRC")
+    parser.add_argument("--no-journal", action="store_true", help="redo every output, ignoring the job journal")
+    parser.add_argument("--ffmpeg-timeout", type=float, help="kill FFmpeg after this many seconds")
+    parser.add_argument("--profile", dest="profiles", action="append", type=parse_profile, metavar="CODEC[:BITRATE[:RATE[:CHANNELS]]]",
+                        help="also encode every audio track to this profile, e.g. mp3:320k or opus:96k:48000:2 (repeatable)")
+    add_selection_arguments(parser)
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default=DEFAULT_DEDUP_MODE,
+                        help="reuse outputs of identical content by hard link or copy, or 'off'")
+    parser.add_argument("--segment-encode", action="store_true",
+                        help="encode long MP3 transcodes in time segments on every core, then join them gap-free")
+    parser.add_argument("--spool-budget", type=parse_size, default=DEFAULT_SPOOL_BUDGET, metavar="SIZE",
+                        help="disk space for local copies of remote files FFmpeg has to seek in, e.g. 20G")
+    parser.add_argument("--analyze-audio", action="store_true",
+                        help="measure the loudness, peaks and silences of every audio track during the extraction")
+    parser.add_argument("--loudnorm", nargs="?", const=LoudnessSettings(True), type=parse_loudnorm, metavar="LUFS[:DBTP]",
+                        help="encode the audio outputs as MP3 normalized to this integrated loudness and true peak, "
+                             "e.g. --loudnorm=-16:-1.5 (default EBU R128: -23:-1)")
+    args = parser.parse_args()
+
+    file_path = args.file_path
     
-    file_path = sys.argv[1]
-    
-    # Verify if the provided file exists
-    if not os.path.isfile(file_path):
+    # Verify if the provided file exists, remote files are checked when they are opened
+    if not is_remote(file_path) and not os.path.isfile(file_path):
         print(f"File not found: {file_path}")
         sys.exit(1)
     
     # Analyze the video file and extract media info
-    analyze_video(file_path)
+    try:
+        probe_cache = None if args.no_probe_cache else ProbeCache()
+        job_journal = None if args.no_journal else JobJournal()
+        analyze_video(file_path, args.audio_policy, probe_cache=probe_cache,
+                      probe_backend=args.probe_backend, dump_probe_json=args.dump_probe_json,
+                      keep_subtitles=args.keep_subtitles, job_journal=job_journal, ffmpeg_timeout=args.ffmpeg_timeout,
+                      profiles=args.profiles, selection=policy_from_args(args),
+                      dedup_index=None if args.dedup == "off" else DedupIndex(mode=args.dedup),
+                      segment_encode=args.segment_encode, spool=Spool(budget=args.spool_budget),
+                      loudness=args.loudnorm or (LoudnessSettings() if args.analyze_audio else None))
+    except ConversionError as e:
+        print(e)
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,294 @@
+"""
+Per-stage timing and resource instrumentation.
+
+Every stage of a conversion (probe, extraction, transcoding, LRC conversion)
+runs inside stage(), which records its wall time, CPU time of this process and
+of the FFmpeg children it waited for, peak RSS and bytes read and written.
+Every FFmpeg child run by jobRunner also gets its own record (stage "ffmpeg",
+see record_jobs) with the usage os.wait4 reported for that child alone. That
+usage is also part of the stage that waited for the child, reports keep the
+two apart so nothing is counted twice.
+
+The peak RSS of a stage comes from RUSAGE_CHILDREN, which the kernel keeps for
+the whole process: it is the largest RSS of this process and of every child
+reaped so far, earlier stages and files included, not of the stage's own
+children. Use the per-child records to see which FFmpeg run needed the memory.
+Records are collected per process and handed back through ConvertResult, so
+batch workers never write metrics files themselves; the parent writes them as
+JSON lines or as a Prometheus textfile and prints a summary.
+"""
+import os
+import sys
+import json
+import time
+import contextlib
+
+try:
+    import resource  # Unix only, Windows falls back to os.times() without RSS or I/O figures
+except ImportError:
+    resource = None
+
+# rusage block counts are in 512-byte units
+RUSAGE_BLOCK_SIZE = 512
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+# Stage records of the file being converted by this process
+records = []
+# File the following records belong to, set by pipeline.convert()
+current_file = None
+
+class StageRecord:
+    def __init__(self, file_path, stage, detail=None):
+        self.file_path = file_path  # Input file the stage worked on
+        self.stage = stage  # Stage name, e.g. "probe", "extract", "encode", "lrc"
+        self.detail = detail  # Optional extra label, e.g. the output file of an encode
+        self.wall_seconds = 0.0  # Wall time of the stage
+        self.user_cpu = 0.0  # User CPU seconds of this process
+        self.system_cpu = 0.0  # System CPU seconds of this process
+        self.child_user_cpu = 0.0  # User CPU seconds of the child processes (FFmpeg, MediaInfo)
+        self.child_system_cpu = 0.0  # System CPU seconds of the child processes
+        self.peak_rss_bytes = None  # Highest RSS of this process or any child reaped so far (of the child alone
+                                    # in an "ffmpeg" record), None when unknown
+        self.read_bytes = 0  # Bytes read from storage by this process and its children
+        self.write_bytes = 0  # Bytes written to storage by this process and its children
+        self.child = False  # True for the record of one child process (see record_jobs), already counted in its stage
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+def read_process_io():
+    # (read_bytes, write_bytes) of this process from /proc, zeros where it is not available
+    try:
+        with open("/proc/self/io", 'r') as io_file:
+            counters = dict(line.split(":", 1) for line in io_file if ":" in line)
+        return int(counters.get("read_bytes", 0)), int(counters.get("write_bytes", 0))
+    except (OSError, ValueError):
+        return 0, 0
+
+def snapshot():
+    # Counters at one point in time, stage() records the difference between two snapshots
+    times = os.times()
+    read_bytes, write_bytes = read_process_io()
+    counters = {
+        "wall_seconds": time.perf_counter(),
+        "user_cpu": times.user,
+        "system_cpu": times.system,
+        "child_user_cpu": times.children_user,
+        "child_system_cpu": times.children_system,
+        "read_bytes": read_bytes,
+        "write_bytes": write_bytes,
+    }
+    if resource is not None:
+        # /proc/self/io does not include children, their block I/O comes from rusage
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        counters["read_bytes"] += children.ru_inblock * RUSAGE_BLOCK_SIZE
+        counters["write_bytes"] += children.ru_oublock * RUSAGE_BLOCK_SIZE
+    return counters
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * MAXRSS_UNIT
+
+@contextlib.contextmanager
+def stage(name, detail=None):
+    """
+    Function to record the resources used by the code inside the with block as one stage.
+
+    The record is kept even when the block raises.
+    """
+    record = StageRecord(current_file, name, detail)
+    before = snapshot()
+    try:
+        yield record
+    finally:
+        after = snapshot()
+        for field, value in before.items():
+            setattr(record, field, after[field] - value)
+        record.peak_rss_bytes = peak_rss_bytes()
+        records.append(record)
+
+def record_jobs(results):
+    """
+    Function to add one "ffmpeg" record per jobRunner.JobResult, from the rusage of that child.
+
+    Jobs that never started or ran where os.wait4 is missing get no record.
+    """
+    for result in results:
+        usage = result.rusage
+        if usage is None:
+            continue
+        record = StageRecord(current_file, os.path.basename(result.job.command[0]), result.job.label)
+        record.child = True
+        record.wall_seconds = result.elapsed
+        record.child_user_cpu = usage.ru_utime
+        record.child_system_cpu = usage.ru_stime
+        record.peak_rss_bytes = usage.ru_maxrss * MAXRSS_UNIT
+        record.read_bytes = usage.ru_inblock * RUSAGE_BLOCK_SIZE
+        record.write_bytes = usage.ru_oublock * RUSAGE_BLOCK_SIZE
+        records.append(record)
+
+def begin_file(file_path):
+    # Start collecting the records of a new file
+    global current_file
+    current_file = file_path
+    del records[:]
+
+def take_records():
+    # Hand over the records collected since begin_file()
+    global current_file
+    collected = list(records)
+    del records[:]
+    current_file = None
+    return collected
+
+def write_jsonl(results, jsonl_path):
+    """
+    Function to append one JSON line per stage and one "total" line per file.
+
+    The "total" line also holds the audio statistics of the file when it was analyzed.
+    """
+    with open(jsonl_path, 'a', encoding='utf-8') as jsonl_file:
+        for result in results:
+            for record in result.stages:
+                jsonl_file.write(json.dumps(record.to_dict()) + "\n")
+            total = {"file_path": result.input_path, "stage": "total", "wall_seconds": result.elapsed, "success": result.success}
+            if result.audio_stats:
+                total["audio_stats"] = result.audio_stats  # Loudness statistics of the audio tracks, see loudnessAnalysis
+            jsonl_file.write(json.dumps(total) + "\n")
+
+def prometheus_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def sum_records(records):
+    # Totals per stage (per program for child records) of the summed fields
+    totals = {}
+    for record in records:
+        stage_totals = totals.setdefault(record.stage, {"count": 0, "wall_seconds": 0.0, "user_cpu": 0.0,
+                                                         "system_cpu": 0.0, "child_user_cpu": 0.0,
+                                                         "child_system_cpu": 0.0, "read_bytes": 0, "write_bytes": 0})
+        stage_totals["count"] += 1
+        for field in stage_totals:
+            if field != "count":
+                stage_totals[field] += getattr(record, field)
+    return totals
+
+def write_prometheus(results, prometheus_path):
+    """
+    Function to write the stage totals in the Prometheus textfile collector format.
+
+    The usage of each child process is already part of the stage that waited
+    for it, the per-child records are exported as their own videotoaudio_child_*
+    families so summing a stage family never counts a child twice.
+    The file is replaced atomically so the collector never reads half of it.
+    """
+    records = [record for result in results for record in result.stages]
+    totals = sum_records(record for record in records if not record.child)
+    child_totals = sum_records(record for record in records if record.child)
+    peak_rss = max((record.peak_rss_bytes or 0 for record in records), default=0)
+    succeeded = sum(1 for result in results if result.success)
+
+    lines = [
+        "# HELP videotoaudio_stage_runs_total Number of times each stage ran.",
+        "# TYPE videotoaudio_stage_runs_total counter",
+    ]
+    lines += [f'videotoaudio_stage_runs_total{{stage="{prometheus_label(name)}"}} {values["count"]}' for name, values in totals.items()]
+    lines += [
+        "# HELP videotoaudio_stage_wall_seconds_total Wall time spent in each stage.",
+        "# TYPE videotoaudio_stage_wall_seconds_total counter",
+    ]
+    lines += [f'videotoaudio_stage_wall_seconds_total{{stage="{prometheus_label(name)}"}} {values["wall_seconds"]:.6f}' for name, values in totals.items()]
+    lines += [
+        "# HELP videotoaudio_stage_cpu_seconds_total CPU time spent in each stage, by process and mode.",
+        "# TYPE videotoaudio_stage_cpu_seconds_total counter",
+    ]
+    for name, values in totals.items():
+        for field, process, mode in (("user_cpu", "self", "user"), ("system_cpu", "self", "system"),
+                                     ("child_user_cpu", "children", "user"), ("child_system_cpu", "children", "system")):
+            lines.append(f'videotoaudio_stage_cpu_seconds_total{{stage="{prometheus_label(name)}",process="{process}",mode="{mode}"}} {values[field]:.6f}')
+    lines += [
+        "# HELP videotoaudio_stage_io_bytes_total Bytes read and written by each stage.",
+        "# TYPE videotoaudio_stage_io_bytes_total counter",
+    ]
+    for name, values in totals.items():
+        lines.append(f'videotoaudio_stage_io_bytes_total{{stage="{prometheus_label(name)}",direction="read"}} {values["read_bytes"]}')
+        lines.append(f'videotoaudio_stage_io_bytes_total{{stage="{prometheus_label(name)}",direction="write"}} {values["write_bytes"]}')
+    lines += [
+        "# HELP videotoaudio_child_runs_total Child processes run, by program.",
+        "# TYPE videotoaudio_child_runs_total counter",
+    ]
+    lines += [f'videotoaudio_child_runs_total{{program="{prometheus_label(name)}"}} {values["count"]}' for name, values in child_totals.items()]
+    lines += [
+        "# HELP videotoaudio_child_cpu_seconds_total CPU time of the child processes by program and mode, included in the stage CPU time.",
+        "# TYPE videotoaudio_child_cpu_seconds_total counter",
+    ]
+    for name, values in child_totals.items():
+        lines.append(f'videotoaudio_child_cpu_seconds_total{{program="{prometheus_label(name)}",mode="user"}} {values["child_user_cpu"]:.6f}')
+        lines.append(f'videotoaudio_child_cpu_seconds_total{{program="{prometheus_label(name)}",mode="system"}} {values["child_system_cpu"]:.6f}')
+    lines += [
+        "# HELP videotoaudio_child_io_bytes_total Bytes read and written by the child processes by program, included in the stage I/O.",
+        "# TYPE videotoaudio_child_io_bytes_total counter",
+    ]
+    for name, values in child_totals.items():
+        lines.append(f'videotoaudio_child_io_bytes_total{{program="{prometheus_label(name)}",direction="read"}} {values["read_bytes"]}')
+        lines.append(f'videotoaudio_child_io_bytes_total{{program="{prometheus_label(name)}",direction="write"}} {values["write_bytes"]}')
+    lines += [
+        "# HELP videotoaudio_peak_rss_bytes Highest resident set size seen in any worker or FFmpeg child.",
+        "# TYPE videotoaudio_peak_rss_bytes gauge",
+        f"videotoaudio_peak_rss_bytes {peak_rss}",
+        "# HELP videotoaudio_files_total Files converted, by outcome.",
+        "# TYPE videotoaudio_files_total counter",
+        f'videotoaudio_files_total{{result="success"}} {succeeded}',
+        f'videotoaudio_files_total{{result="failed"}} {len(results) - succeeded}',
+    ]
+
+    temporary_path = f"{prometheus_path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as prometheus_file:
+        prometheus_file.write("\n".join(lines) + "\n")
+    os.replace(temporary_path, prometheus_path)
+
+def print_summary(results, top=5):
+    """
+    Function to print the time spent per stage and the slowest files and stage runs.
+    """
+    stage_records = [record for result in results for record in result.stages]
+    if not stage_records:
+        return
+
+    totals = {}
+    for record in stage_records:
+        wall, child_cpu, count = totals.get(record.stage, (0.0, 0.0, 0))
+        totals[record.stage] = (wall + record.wall_seconds, child_cpu + record.child_user_cpu + record.child_system_cpu, count + 1)
+
+    print("\nTime per stage:")
+    for name, (wall, child_cpu, count) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True):
+        print(f"  {name:<10} {wall:8.2f}s wall  {child_cpu:8.2f}s child CPU  ({count} run(s))")
+
+    if len(results) > 1:
+        print("Slowest files:")
+        for result in sorted(results, key=lambda result: result.elapsed, reverse=True)[:top]:
+            print(f"  {result.elapsed:8.2f}s  {result.input_path}")
+
+    print("Slowest stage runs:")
+    for record in sorted(stage_records, key=lambda record: record.wall_seconds, reverse=True)[:top]:
+        label = f"{record.stage} ({record.detail})" if record.detail else record.stage
+        print(f"  {record.wall_seconds:8.2f}s  {label}  {record.file_path}")
+
+    peak_rss = max((record.peak_rss_bytes or 0 for record in stage_records), default=0)
+    if peak_rss:
+        print(f"Peak RSS: {peak_rss / (1024 * 1024):.1f} MiB")
+
+def report(results, jsonl_path=None, prometheus_path=None):
+    """
+    Function to write the requested metrics files and print the summary for a list of ConvertResult.
+    """
+    if jsonl_path:
+        write_jsonl(results, jsonl_path)
+        print(f"Stage metrics appended to {jsonl_path}")
+    if prometheus_path:
+        write_prometheus(results, prometheus_path)
+        print(f"Prometheus metrics written to {prometheus_path}")
+    print_summary(results)
@@ -0,0 +1,92 @@
+import os
+import time
+import sqlite3
+
+from videoToAudio.checkVariables import cache_directory
+from videoToAudio.remoteInput import input_identity
+
+JOB_JOURNAL_FILENAME = "jobs.sqlite3"
+
+# States of a step, a step left "running" was cut off and is redone on the next run
+PLANNED = "planned"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class JobJournal:
+    """
+    SQLite journal of the steps planned for each input file, one row per (input file, track, output kind).
+
+    A step is only skipped on a later run when it is done for the same input
+    (path, size and mtime) and the same output file, and that output still exists.
+    """
+
+    def __init__(self, database_path=None):
+        self.database_path = database_path or os.path.join(cache_directory(), JOB_JOURNAL_FILENAME)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.database_path)), exist_ok=True)
+        # Batch workers share the journal, WAL lets readers and one writer work at the same time
+        self.connection = sqlite3.connect(self.database_path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " input_path TEXT NOT NULL,"
+            " track TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " output_path TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " input_size INTEGER NOT NULL,"
+            " input_mtime_ns INTEGER NOT NULL,"
+            " error TEXT,"
+            " updated REAL NOT NULL,"
+            " PRIMARY KEY (input_path, track, kind))"
+        )
+        self.connection.commit()
+
+    def input_identity(self, file_path):
+        # (path, size, mtime_ns) of the input file as it is now, a remote input is keyed by its URL
+        return input_identity(file_path)
+
+    def plan(self, file_path, steps):
+        """
+        Function to record the (track, kind, output_path) steps of a file as planned.
+
+        Steps already done for the same input and output are left alone.
+        Returns the set of (track, kind) that are done and can be skipped.
+        """
+        path, size, mtime_ns = self.input_identity(file_path)
+        rows = {
+            (track, kind): (output_path, state, input_size, input_mtime_ns)
+            for track, kind, output_path, state, input_size, input_mtime_ns in self.connection.execute(
+                "SELECT track, kind, output_path, state, input_size, input_mtime_ns FROM jobs WHERE input_path = ?", (path,)
+            )
+        }
+
+        done = set()
+        with self.connection:
+            for track, kind, output_path in steps:
+                output_path = os.path.abspath(output_path)
+                if rows.get((track, kind)) == (output_path, DONE, size, mtime_ns) and os.path.exists(output_path):
+                    done.add((track, kind))
+                    continue
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO jobs (input_path, track, kind, output_path, state, input_size, input_mtime_ns, error, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+                    (path, track, kind, output_path, PLANNED, size, mtime_ns, time.time()),
+                )
+        return done
+
+    def mark(self, file_path, steps, state, error=None):
+        """
+        Function to move the given (track, kind, output_path) steps of a file to a new state.
+        """
+        path = self.input_identity(file_path)[0]  # The key plan() used, the URL identity for a remote input
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE jobs SET state = ?, error = ?, updated = ? WHERE input_path = ? AND track = ? AND kind = ?",
+                [(state, error, time.time(), path, track, kind) for track, kind, output_path in steps],
+            )
+
+    def close(self):
+        self.connection.close()
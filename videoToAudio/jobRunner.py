@@ -0,0 +1,240 @@
+"""
+Asyncio runner for FFmpeg (and other tool) jobs.
+
+Jobs are started directly, without a shell, and run concurrently up to a
+limit per resource class: CPU-bound encodes and I/O-bound stream copies get
+separate semaphores. A job can also wait for a slot of a semaphore shared
+with other processes, e.g. the encode slots of a batch. Every job reports its real exit code and the tail of its
+stderr, or all of it when a job asks to keep it (e.g. to read filter reports). Jobs can have a timeout, a failure can cancel the jobs still waiting
+(fail_fast), and a cancelled run kills its children instead of leaving them behind.
+
+Each child is reaped with os.wait4, so its JobResult carries the resource usage
+of that child alone (CPU time, peak RSS, block I/O). RUSAGE_CHILDREN only gives
+the sum over every child reaped so far, and the largest RSS among them.
+"""
+import os
+import time
+import signal
+import asyncio
+import threading
+import subprocess
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+# Resource classes: encodes keep a core busy, stream copies and demuxing mostly wait on the disk
+CPU = "cpu"
+IO = "io"
+DEFAULT_LIMITS = {
+    CPU: os.cpu_count() or 1,
+    IO: 2,
+}
+
+# Lines of stderr kept for the error message of a failed job
+STDERR_TAIL_LINES = 20
+# Seconds between checks for cancellation while a job waits for a shared slot
+SLOT_POLL_INTERVAL = 0.1
+
+class Job:
+    def __init__(self, command, label=None, resource=IO, timeout=None, pass_fds=(), keep_stderr=False, slot=None):
+        self.command = command  # Argument list, the first item is the program
+        self.label = label or command[0]  # Name used in messages
+        self.resource = resource  # CPU or IO, selects the semaphore the job waits on
+        self.timeout = timeout  # Seconds before the job is killed, None to wait forever
+        self.pass_fds = list(pass_fds)  # Pipe ends handed to the child, closed in this process once it started
+        self.keep_stderr = keep_stderr  # Keep every stderr line in JobResult.stderr_lines, not only the tail
+        self.slot = slot  # Semaphore shared with other processes, held while the job runs, None for none
+
+class JobResult:
+    def __init__(self, job):
+        self.job = job  # The Job that ran
+        self.returncode = None  # Exit code, negative when killed by a signal, None when it never ran
+        self.error = None  # Error message, None when the job exited with code 0
+        self.stderr_tail = ""  # Last lines of the job's stderr
+        self.stderr_lines = []  # Every stderr line, only filled for jobs with keep_stderr
+        self.elapsed = 0.0  # Wall time of the job in seconds
+        self.rusage = None  # resource.struct_rusage of the child from os.wait4, None when it never ran or on Windows
+
+    @property
+    def success(self):
+        return self.error is None
+
+class ReapGuard:
+    """
+    Keeps kill_child() from signalling a PID once the waiter thread reaped the child, the PID may then be reused.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Held while the child is marked reaped, and while it is signalled
+        self.reaped = False  # True once the waiter thread started reaping the child
+
+class SlotRequest:
+    """
+    A job waiting for a shared slot in a waiter thread: whichever of the thread and a cancelled task comes last releases it.
+    """
+
+    def __init__(self, slot):
+        self.slot = slot  # The shared semaphore
+        self.lock = threading.Lock()  # Held while the slot changes hands
+        self.cancelled = False  # True once the waiting task was cancelled
+        self.acquired = False  # True while the job owns the slot
+
+    def wait(self):
+        # Runs in a waiter thread, returns True once the job owns the slot
+        while not self.slot.acquire(timeout=SLOT_POLL_INTERVAL):
+            if self.cancelled:
+                return False
+        with self.lock:
+            if self.cancelled:
+                self.slot.release()
+                return False
+            self.acquired = True
+            return True
+
+    def release(self):
+        # Give the slot back, or make the waiter thread give it back as soon as it gets it
+        with self.lock:
+            self.cancelled = True
+            if self.acquired:
+                self.acquired = False
+                self.slot.release()
+
+def close_fds(job):
+    # The child owns the pipe ends now (or never will), closing ours lets the reader see EOF
+    for fd in job.pass_fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    job.pass_fds = []
+
+def watch_child(process, guard, tail, lines=None):
+    """
+    Function to read the stderr of a child until it closes, then reap the child.
+
+    Runs in a waiter thread, os.wait4 blocks. The child is first waited for
+    without reaping it (its PID stays taken by the zombie), then marked reaped
+    in guard, a ReapGuard, before os.wait4 frees the PID. Returns the rusage of
+    the child, None where os.wait4 is not available. Sets process.returncode.
+    """
+    for line in process.stderr:
+        line = line.decode("utf-8", errors="replace").rstrip()
+        tail.append(line)
+        if lines is not None:
+            lines.append(line)
+    process.stderr.close()
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return None
+    if hasattr(os, "waitid"):
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+    with guard.lock:
+        guard.reaped = True
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+def kill_child(process, guard):
+    # Popen.kill() polls first and could reap the child before the waiter thread, os.wait4 would then fail
+    if not hasattr(os, "wait4"):
+        process.kill()
+        return
+    with guard.lock:
+        if guard.reaped:
+            return  # Exited, its PID may already belong to another process
+        try:
+            os.kill(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+async def run_job(job, semaphore, waiters):
+    """
+    Function to run one job once its resource semaphore allows it, returns a JobResult.
+
+    A job with a shared slot then waits for the slot in a thread of waiters.
+    The child's stderr is read and the child reaped by a thread of waiters.
+    The child is killed when the job times out or the task is cancelled.
+    """
+    result = JobResult(job)
+    tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+    request = SlotRequest(job.slot) if job.slot is not None else None
+    try:
+        async with semaphore:
+            if request:
+                await asyncio.shield(asyncio.get_running_loop().run_in_executor(waiters, request.wait))
+            start = time.monotonic()
+            try:
+                process = subprocess.Popen(job.command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                           stderr=subprocess.PIPE, pass_fds=job.pass_fds)
+            except OSError as e:
+                result.error = f"could not start {job.command[0]}: {e}"
+                return result
+            finally:
+                close_fds(job)
+
+            lines = result.stderr_lines if job.keep_stderr else None
+            guard = ReapGuard()
+            exited = asyncio.get_running_loop().run_in_executor(waiters, watch_child, process, guard, tail, lines)
+            try:
+                await asyncio.wait_for(asyncio.shield(exited), job.timeout)
+            except asyncio.TimeoutError:
+                result.error = f"timed out after {job.timeout}s"
+            finally:
+                if not exited.done():
+                    kill_child(process, guard)
+                result.rusage = await exited
+                result.elapsed = time.monotonic() - start
+                result.returncode = process.returncode
+                result.stderr_tail = "\n".join(tail)
+    finally:
+        if request:
+            request.release()
+        close_fds(job)
+
+    if result.error is None and result.returncode != 0:
+        if result.returncode < 0:
+            result.error = f"killed by signal {-result.returncode}"
+        else:
+            result.error = f"exited with code {result.returncode}"
+    return result
+
+async def run_jobs_async(jobs, limits=None, fail_fast=False):
+    """
+    Function to run jobs concurrently, returns their JobResult list in the order of jobs.
+
+    With fail_fast, the first failure cancels every job that has not finished yet.
+    """
+    limits = dict(DEFAULT_LIMITS, **(limits or {}))
+    semaphores = {resource: asyncio.Semaphore(max(1, limit)) for resource, limit in limits.items()}
+    # One waiter thread per job that can run at the same time
+    waiters = ThreadPoolExecutor(max_workers=max(1, sum(max(1, limit) for limit in limits.values())))
+    tasks = [asyncio.ensure_future(run_job(job, semaphores[job.resource], waiters)) for job in jobs]
+
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if fail_fast and any(not task.result().success for task in done):
+                break
+    finally:
+        # Also reached when the whole run is cancelled, e.g. by Ctrl+C
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        waiters.shutdown(wait=False)
+
+    results = []
+    for job, task in zip(jobs, tasks):
+        if task.cancelled():
+            result = JobResult(job)
+            result.error = "cancelled"
+            results.append(result)
+        else:
+            results.append(task.result())
+    return results
+
+def run_jobs(jobs, limits=None, fail_fast=False):
+    """
+    Function to run jobs from synchronous code, see run_jobs_async().
+    """
+    return asyncio.run(run_jobs_async(jobs, limits, fail_fast))
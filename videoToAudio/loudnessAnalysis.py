@@ -0,0 +1,183 @@
+"""
+Loudness analysis (EBU R128) and loudness normalization of audio tracks, fused into the FFmpeg runs.
+
+The measurement filters (silencedetect, astats, ebur128) are added to the
+graph of the run that already demuxes and decodes the track, FFmpeg decodes
+each input stream once for all its consumers, so the statistics cost no extra
+pass over the source. Each filter gets an instance name per track (e.g.
+"ebur128@m0") and reports on stderr, where its lines are found again.
+
+Normalization is linear: one gain per track, computed from the measured
+integrated loudness and true peak, applied with the volume filter before the
+encoder. A track is measured before it can be normalized, so the first
+conversion measures it while copying the compressed track to a small temporary
+file, then encodes that file. The measurement is kept on the AudioTrack and
+saved with it in the probe cache, later conversions of the same file apply
+the gain in a single run.
+"""
+
+# silencedetect settings, a measurement made with other settings is done again
+SILENCE_NOISE_DB = -50
+SILENCE_MIN_SECONDS = 2.0
+MEASUREMENT_SETTINGS = [SILENCE_NOISE_DB, SILENCE_MIN_SECONDS]
+
+# EBU R128: -23 LUFS integrated, true peak at most -1 dBTP
+DEFAULT_INTEGRATED = -23.0
+DEFAULT_TRUE_PEAK = -1.0
+# ebur128 reports the absolute gate (-70 LUFS) for silence, such tracks are left unchanged
+SILENT_LOUDNESS = -70.0
+
+class LoudnessSettings:
+    def __init__(self, normalize=False, integrated=DEFAULT_INTEGRATED, true_peak=DEFAULT_TRUE_PEAK):
+        self.normalize = normalize  # Encode the audio outputs normalized, False to only measure the tracks
+        self.integrated = integrated  # Target integrated loudness in LUFS
+        self.true_peak = true_peak  # Highest true peak allowed after the gain, in dBTP
+
+    @property
+    def name(self):
+        # Tag of normalized outputs in the job journal and the dedup index, e.g. "r128_-23_-1"
+        return f"r128_{self.integrated:g}_{self.true_peak:g}" if self.normalize else None
+
+def parse_loudnorm(spec):
+    """
+    Function to build normalizing LoudnessSettings from "integrated[:true_peak]", e.g. "-16:-1.5".
+
+    Raises ValueError for malformed numbers or targets above 0.
+    """
+    parts = spec.strip().split(":")
+    try:
+        integrated = float(parts[0])
+        true_peak = float(parts[1]) if len(parts) > 1 and parts[1] else DEFAULT_TRUE_PEAK
+    except ValueError:
+        raise ValueError(f"Invalid loudness target '{spec}', expected integrated[:true_peak], e.g. -23:-1")
+    if len(parts) > 2 or integrated >= 0 or true_peak > 0:
+        raise ValueError(f"Invalid loudness target '{spec}', expected negative LUFS and dBTP values, e.g. -23:-1")
+    return LoudnessSettings(True, integrated, true_peak)
+
+def is_current(measurement):
+    # Measurement made with the current silence settings
+    return isinstance(measurement, dict) and measurement.get("settings") == MEASUREMENT_SETTINGS
+
+def measurement_filter(track_input, label):
+    """
+    Function to build the filter chain measuring one track, from track_input (e.g. "0:a:1") to the [label] output.
+
+    The output is mapped to a null muxer, see measurement_output().
+    """
+    return (f"[{track_input}]silencedetect@{label}=n={SILENCE_NOISE_DB}dB:d={SILENCE_MIN_SECONDS},"
+            f"ametadata@{label}=mode=print,"
+            f"astats@{label}=metadata=0:measure_perchannel=none:measure_overall=Peak_level+RMS_level,"
+            f"ebur128@{label}=peak=true:framelog=quiet[{label}]")
+
+def measurement_output(labels):
+    # One null output taking every measured track, nothing is written
+    arguments = []
+    for label in labels:
+        arguments += ["-map", f"[{label}]"]
+    return arguments + ["-f", "null", "-"]
+
+def to_number(text):
+    # FFmpeg prints "-inf" for silence, kept out of the JSON cache as None
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return value if abs(value) != float("inf") else None
+
+def parse_measurement(lines, label, duration=None):
+    """
+    Function to read the measurement of one track from the stderr lines of the run.
+
+    Returns a dict with the integrated loudness, loudness range and threshold,
+    true and sample peak, RMS level and the silence ranges ([start, end] in
+    seconds, a silence running to the end of the track ends at duration).
+    Returns None when the run did not print the ebur128 summary.
+    """
+    measurement = {"settings": MEASUREMENT_SETTINGS, "integrated": None, "threshold": None, "loudness_range": None,
+                   "true_peak": None, "sample_peak": None, "rms_level": None, "silences": []}
+    prefixes = {name: f"[{name}@{label} @ " for name in ("ametadata", "astats", "ebur128")}
+    in_summary = False
+    summary_found = False
+    section = None
+    for line in lines:
+        line = line.rpartition("\r")[2]  # A log line can follow a progress line that only ended with "\r"
+        if line.startswith("["):
+            in_summary = line.startswith(prefixes["ebur128"]) and line.endswith("Summary:")
+            summary_found = summary_found or in_summary
+            message = line.partition("] ")[2]
+            if line.startswith(prefixes["ametadata"]):
+                key, _, value = message.partition("=")
+                if key == "lavfi.silence_start":
+                    measurement["silences"].append([to_number(value), None])
+                elif key == "lavfi.silence_end" and measurement["silences"]:
+                    measurement["silences"][-1][1] = to_number(value)
+            elif line.startswith(prefixes["astats"]):
+                name, _, value = message.partition(": ")
+                if name == "Peak level dB":
+                    measurement["sample_peak"] = to_number(value)
+                elif name == "RMS level dB":
+                    measurement["rms_level"] = to_number(value)
+            continue
+        if not in_summary:
+            continue
+        # Summary lines have no prefix: "Integrated loudness:", "  I: -23.0 LUFS", "  Threshold: -33.0 LUFS", ...
+        name, _, value = line.strip().partition(":")
+        if not value:
+            section = name
+            continue
+        number = to_number(value.split()[0]) if value.split() else None
+        if name == "I":
+            measurement["integrated"] = number
+        elif name == "Threshold" and section == "Integrated loudness":
+            measurement["threshold"] = number
+        elif name == "LRA":
+            measurement["loudness_range"] = number
+        elif name == "Peak":
+            measurement["true_peak"] = number
+
+    if not summary_found:
+        return None
+    for silence in measurement["silences"]:
+        if silence[1] is None:
+            silence[1] = duration
+    return measurement
+
+def describe_measurement(measurement):
+    # One line summary for the conversion log
+    if measurement is None:
+        return "not measured, FFmpeg printed no loudness summary"
+    def show(value, unit):
+        return f"{value:.1f} {unit}" if value is not None else "-inf"
+    return (f"{show(measurement['integrated'], 'LUFS')} integrated, range {show(measurement['loudness_range'], 'LU')}, "
+            f"true peak {show(measurement['true_peak'], 'dBTP')}, {len(measurement['silences'])} silence(s)")
+
+def track_gain(measurement, settings):
+    """
+    Function to compute the gain in dB that brings a measured track to the target loudness.
+
+    The gain is lowered when it would push the true peak above the target, the
+    output is then quieter than the target instead of clipped. Silent tracks get 0.
+    """
+    integrated = measurement.get("integrated")
+    if integrated is None or integrated <= SILENT_LOUDNESS:
+        return 0.0
+    gain = settings.integrated - integrated
+    if measurement.get("true_peak") is not None:
+        gain = min(gain, settings.true_peak - measurement["true_peak"])
+    return round(gain, 2)
+
+def gain_filter(gain):
+    # Filter applying a gain in dB, full precision so the gain is the same in every segment of a segmented encode
+    return f"volume={gain:.2f}dB:precision=double"
+
+def track_stats(audio_info, settings):
+    """
+    Function to build the statistics of one audio track reported in the conversion result.
+    """
+    measurement = audio_info.loudness or {}
+    stats = {key: measurement.get(key) for key in ("integrated", "threshold", "loudness_range", "true_peak",
+                                                    "sample_peak", "rms_level", "silences")}
+    stats["track"] = audio_info.ffmpeg_track_order
+    stats["output"] = audio_info.output_filename
+    stats["gain"] = track_gain(measurement, settings) if settings.normalize and measurement else None
+    return stats
@@ -0,0 +1,235 @@
+"""
+Streaming reader for MediaInfo JSON reports.
+
+The document is read in fixed-size chunks and the "media" -> "track" array is
+yielded one track dict at a time. Only the fields listed in MEDIAINFO_FIELDS
+are decoded, every other value (large "Description" tags, attachments, chapter
+lists) is skipped without being decoded or kept, so memory use stays flat
+however large the report is. Tracks smaller than OBJECT_DECODE_LIMIT are
+decoded in one go by the C JSON decoder and then reduced, which is much faster
+than walking them key by key.
+"""
+import re
+import json
+
+from videoToAudio.mediaModel import MEDIAINFO_FIELDS
+
+CHUNK_SIZE = 64 * 1024
+# Objects up to this many characters are decoded whole, larger ones are read key by key
+OBJECT_DECODE_LIMIT = 256 * 1024
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Characters that matter while skipping a value: strings and nesting
+STRUCTURE = re.compile(r'["{}\[\]]')
+SCALAR_END = re.compile(r"[,}\]\s]")
+
+decoder = json.JSONDecoder()
+
+def reduce_fields(data, fields):
+    # Keep only the keys in fields, nested field dicts filter nested objects
+    reduced = {}
+    for key, nested_fields in fields.items():
+        if key in data:
+            value = data[key]
+            if nested_fields is not None:
+                value = reduce_fields(value, nested_fields) if isinstance(value, dict) else None
+            reduced[key] = value
+    return reduced
+
+class JsonStreamReader:
+    """
+    Pull reader over a text stream: only the unread part of the current chunk is kept in the buffer.
+    """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream  # Text file object (a file or the stdout pipe of MediaInfo)
+        self.chunk_size = chunk_size  # Characters read at a time
+        self.buffer = ""  # Read but not yet consumed text starts at position
+        self.position = 0
+
+    def fill(self):
+        # Read the next chunk and drop the consumed text, returns False at the end of the stream
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self):
+        # Next non-whitespace character without consuming it, "" at the end of the stream
+        while True:
+            self.position = WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ""
+
+    def expect(self, characters):
+        # Consume one of characters, returns it
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} at {character!r}")
+        self.position += 1
+        return character
+
+    def read_value(self):
+        # Decode the next value, reading more chunks until it is complete
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number is only complete when a delimiter follows it: "1." or "1e" may go on in the next chunk
+            if isinstance(value, (str, dict, list)) or (end < len(self.buffer) and SCALAR_END.match(self.buffer, end)) \
+                    or not self.fill():
+                self.position = end
+                return value
+
+    def skip_string(self):
+        # Position is on the opening quote
+        self.position += 1
+        while True:
+            end = self.buffer.find('"', self.position)
+            if end < 0:
+                # Keep trailing backslashes, they may escape a quote at the start of the next chunk
+                self.position = max(self.position, len(self.buffer.rstrip("\\")))
+                if not self.fill():
+                    raise ValueError("Unterminated string")
+                continue
+            # A quote preceded by an odd number of backslashes is escaped
+            backslashes = 0
+            while end - backslashes - 1 >= self.position and self.buffer[end - backslashes - 1] == "\\":
+                backslashes += 1
+            if backslashes % 2:
+                self.position = end + 1
+                continue
+            self.position = end + 1
+            return
+
+    def skip_value(self):
+        """
+        Function to move past the next value without decoding it.
+        """
+        character = self.peek()
+        if character == '"':
+            self.skip_string()
+        elif character in ("{", "["):
+            depth = 0
+            while True:
+                match = STRUCTURE.search(self.buffer, self.position)
+                if match is None:
+                    self.position = len(self.buffer)
+                    if not self.fill():
+                        raise ValueError("Unterminated object or array")
+                    continue
+                self.position = match.start()
+                if match.group() == '"':
+                    self.skip_string()
+                    continue
+                self.position += 1
+                depth += 1 if match.group() in "{[" else -1
+                if depth == 0:
+                    return
+        elif character:
+            # Number, true, false or null
+            while True:
+                match = SCALAR_END.search(self.buffer, self.position)
+                if match is not None:
+                    self.position = match.start()
+                    return
+                self.position = len(self.buffer)
+                if not self.fill():
+                    return
+        else:
+            raise ValueError("Unexpected end of the document")
+
+    def object_keys(self):
+        """
+        Function to yield the keys of the object starting at the current position.
+
+        The caller must read or skip the value of each key before asking for the next one.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+    def array_items(self):
+        # Yield once per item of the array at the current position, the caller reads or skips each item
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield
+            if self.expect(",]") == "]":
+                return
+
+    def read_small_object(self):
+        # Decode the object at the current position in one go, None when it is larger than OBJECT_DECODE_LIMIT
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                # Incomplete in the buffer (or invalid, which the key by key path reports)
+                if len(self.buffer) - self.position >= OBJECT_DECODE_LIMIT or not self.fill():
+                    return None
+                continue
+            self.position = end
+            return value
+
+    def read_fields(self, fields):
+        """
+        Function to read an object keeping only the keys in fields, a dict of key -> nested fields or None.
+
+        Values of keys mapped to None are decoded whole, nested field dicts filter
+        nested objects the same way. Returns None when the value is not an object.
+        """
+        if self.peek() != "{":
+            self.skip_value()
+            return None
+        data = self.read_small_object()
+        if data is not None:
+            return reduce_fields(data, fields)
+
+        data = {}
+        for key in self.object_keys():
+            if key not in fields:
+                self.skip_value()
+            elif fields[key] is None:
+                data[key] = self.read_value()
+            else:
+                data[key] = self.read_fields(fields[key])
+        return data
+
+def iter_tracks(stream, fields=MEDIAINFO_FIELDS, chunk_size=CHUNK_SIZE):
+    """
+    Function to yield the tracks of a MediaInfo JSON report one at a time, reduced to fields.
+
+    Raises ValueError when the document is not valid JSON.
+    """
+    reader = JsonStreamReader(stream, chunk_size)
+    if reader.peek() != "{":
+        raise ValueError("MediaInfo report is not a JSON object")
+    for key in reader.object_keys():
+        if key != "media" or reader.peek() != "{":
+            reader.skip_value()
+            continue
+        for media_key in reader.object_keys():
+            if media_key != "track" or reader.peek() != "[":
+                reader.skip_value()
+                continue
+            for _ in reader.array_items():
+                track = reader.read_fields(fields)
+                if track is not None:
+                    yield track
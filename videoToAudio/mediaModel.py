@@ -0,0 +1,258 @@
+"""
+Compact media model built from a MediaInfo track list.
+
+Only the fields the pipeline uses are kept, so thousands of parsed files can
+stay in memory for reporting without holding on to the raw MediaInfo dicts.
+"""
+
+import copy
+
+# Version of the dict layout written by MediaInfo.to_dict, cached models of another version are probed again
+MODEL_VERSION = 3
+
+# ISO 639-2 codes (FFprobe tags) mapped to the ISO 639-1 codes MediaInfo reports
+LANGUAGE_ALIASES = {
+    "eng": "en", "jpn": "ja", "ger": "de", "deu": "de", "fre": "fr", "fra": "fr", "spa": "es",
+    "ita": "it", "rus": "ru", "chi": "zh", "zho": "zh", "kor": "ko", "por": "pt", "hin": "hi",
+    "ben": "bn", "ara": "ar", "dut": "nl", "nld": "nl", "pol": "pl", "tur": "tr", "swe": "sv",
+}
+
+# Subtitle "Format" values (lowercase) renamed to the file extension FFmpeg expects
+SUBTITLE_FORMATS = {
+    "utf8": "srt",
+    "utf-8": "srt",
+    "s_text/webvtt": "vtt",
+    "webvtt": "vtt",
+}
+
+def to_int(value, default=None):
+    # MediaInfo stores numbers as strings, "115.263" style values are truncated
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+def to_float(value, default=None):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+def to_flag(value):
+    # MediaInfo flags are "Yes"/"No" strings
+    return value == "Yes"
+
+class Track:
+    """Base class giving every track type a compact dict round trip for the probe cache."""
+    __slots__ = ()
+    # Slots holding the output plan of one run (see fileAnalyzeConvert.plan_outputs) and their value before planning.
+    # The plan depends on the options of the run, it is never written to the probe cache.
+    plan_fields = {}
+
+    @classmethod
+    def field_names(cls):
+        # Every slot of the class, including the inherited ones
+        return [name for klass in reversed(cls.__mro__) for name in getattr(klass, "__slots__", ())]
+
+    @classmethod
+    def plan_defaults(cls):
+        # Every plan field of the class, including the inherited ones
+        defaults = {}
+        for klass in reversed(cls.__mro__):
+            defaults.update(vars(klass).get("plan_fields", {}))
+        return defaults
+
+    def to_dict(self):
+        # Probe and measurement fields only, the output plan is left out
+        plan_defaults = self.plan_defaults()
+        return {name: getattr(self, name) for name in self.field_names() if name not in plan_defaults}
+
+    @classmethod
+    def from_dict(cls, data):
+        track = cls.__new__(cls)
+        plan_defaults = cls.plan_defaults()
+        for name in cls.field_names():
+            setattr(track, name, copy.copy(plan_defaults[name]) if name in plan_defaults else data.get(name))
+        return track
+
+class GeneralTrack(Track):
+    __slots__ = ("format_name", "file_size", "duration", "title", "cover", "artist", "date", "purl")
+
+    def __init__(self, format_name=None, file_size=None, duration=None, title=None, cover=False,
+                 artist=None, date=None, purl=None):
+        self.format_name = format_name  # Container format, e.g. "Matroska"
+        self.file_size = file_size  # Size of the file in bytes
+        self.duration = duration  # Duration in seconds
+        self.title = title  # Title of the file
+        self.cover = cover  # True when MediaInfo reports "Cover: Yes"
+        self.artist = artist  # "extra" -> ARTIST
+        self.date = date  # "extra" -> DATE
+        self.purl = purl  # "extra" -> PURL
+
+class StreamTrack(Track):
+    """Fields shared by the audio, text and image tracks."""
+    __slots__ = ("type_order", "format_name", "ffmpeg_track_order", "output_filename", "stream_order",
+                 "codec_id", "language", "title", "default", "forced", "duration", "stream_size")
+    plan_fields = {"output_filename": None}
+
+    def __init__(self, type_order, format_name, ffmpeg_track_order, output_filename=None, stream_order=None,
+                 codec_id=None, language=None, title=None, default=False, forced=False, duration=None,
+                 stream_size=None):
+        self.type_order = type_order  # Order of the stream among streams of the same type, starting at 1
+        self.format_name = format_name  # Lowercase format, e.g. "aac", "opus", "srt"
+        self.ffmpeg_track_order = ffmpeg_track_order  # Track order for FFmpeg (type_order - 1)
+        self.output_filename = output_filename  # Output filename for the extracted stream
+        self.stream_order = stream_order  # Index of the stream in the container
+        self.codec_id = codec_id  # Container codec id, e.g. "A_AAC-2"
+        self.language = language  # Language code, e.g. "en"
+        self.title = title  # Track title
+        self.default = default  # Default flag
+        self.forced = forced  # Forced flag
+        self.duration = duration  # Duration in seconds
+        self.stream_size = stream_size  # Size of the stream in bytes
+
+class AudioTrack(StreamTrack):
+    __slots__ = ("format_profile", "channels", "sampling_rate", "bit_rate", "output_mode", "profile_outputs", "loudness",
+                 "normalization", "content_hash")
+    plan_fields = {"output_mode": "transcode", "profile_outputs": [], "normalization": None}
+
+    def __init__(self, type_order, format_name, ffmpeg_track_order, output_filename=None, output_mode="transcode",
+                 format_profile=None, channels=None, sampling_rate=None, bit_rate=None, profile_outputs=None, loudness=None,
+                 normalization=None, content_hash=None, **fields):
+        super().__init__(type_order, format_name, ffmpeg_track_order, output_filename, **fields)
+        self.format_profile = format_profile  # MediaInfo "Format_Profile", e.g. "Layer 3" for MP3, None when not reported
+        self.output_mode = output_mode  # "copy" to remux the stream, "transcode" to encode it to MP3
+        self.profile_outputs = profile_outputs or []  # One output file per audio profile, in profile order
+        self.channels = channels  # Number of channels
+        self.sampling_rate = sampling_rate  # Sampling rate in Hz
+        self.bit_rate = bit_rate  # Bit rate in bits per second
+        self.loudness = loudness  # Measurement dict of loudnessAnalysis, kept in the probe cache, None until measured
+        self.normalization = normalization  # Name of the loudness normalization of the outputs, None when not normalized
+        self.content_hash = content_hash  # Hash of the first packets of the track (dedupIndex.track_content_hashes), None until hashed
+
+class TextTrack(StreamTrack):
+    __slots__ = ("lrc_filename",)
+    plan_fields = {"lrc_filename": None}
+
+    def __init__(self, type_order, format_name, ffmpeg_track_order, output_filename=None, lrc_filename=None, **fields):
+        super().__init__(type_order, format_name, ffmpeg_track_order, output_filename, **fields)
+        self.lrc_filename = lrc_filename  # LRC file converted from this subtitle, None when not converted
+
+class ImageTrack(StreamTrack):
+    __slots__ = ()
+
+class MediaInfo:
+    __slots__ = ("general", "audio", "text", "images", "video_count")
+
+    def __init__(self, general=None, audio=None, text=None, images=None, video_count=0):
+        self.general = general or GeneralTrack()  # General track
+        self.audio = audio or []  # AudioTrack list in FFmpeg order
+        self.text = text or []  # TextTrack list in FFmpeg order
+        self.images = images or []  # ImageTrack list in FFmpeg order
+        self.video_count = video_count  # Video tracks are only counted, none of their fields are used
+
+    def to_dict(self):
+        return {
+            "version": MODEL_VERSION,
+            "general": self.general.to_dict(),
+            "audio": [track.to_dict() for track in self.audio],
+            "text": [track.to_dict() for track in self.text],
+            "images": [track.to_dict() for track in self.images],
+            "video_count": self.video_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            GeneralTrack.from_dict(data.get("general", {})),
+            [AudioTrack.from_dict(track) for track in data.get("audio", [])],
+            [TextTrack.from_dict(track) for track in data.get("text", [])],
+            [ImageTrack.from_dict(track) for track in data.get("images", [])],
+            data.get("video_count", 0),
+        )
+
+# MediaInfo track keys read by parse_track, nested dicts list the keys kept inside an object.
+# The streaming reader decodes only these and skips everything else.
+MEDIAINFO_FIELDS = {
+    "@type": None, "@typeorder": None, "Format": None, "FileSize": None, "Duration": None, "Title": None,
+    "Cover": None, "StreamOrder": None, "CodecID": None, "Format_Profile": None, "Language": None, "Default": None,
+    "Forced": None,
+    "StreamSize": None, "Channels": None, "SamplingRate": None, "BitRate": None,
+    "extra": {"ARTIST": None, "DATE": None, "PURL": None},
+}
+
+def stream_fields(track):
+    # Keyword arguments shared by all StreamTrack types
+    return {
+        "stream_order": to_int(track.get("StreamOrder")),
+        "codec_id": track.get("CodecID"),
+        "language": track.get("Language"),
+        "title": track.get("Title"),
+        "default": to_flag(track.get("Default")),
+        "forced": to_flag(track.get("Forced")),
+        "duration": to_float(track.get("Duration")),
+        "stream_size": to_int(track.get("StreamSize")),
+    }
+
+def parse_general(track):
+    extra_info = track.get("extra") or {}
+    return GeneralTrack(
+        format_name=track.get("Format"),
+        file_size=to_int(track.get("FileSize")),
+        duration=to_float(track.get("Duration")),
+        title=track.get("Title"),
+        cover=to_flag(track.get("Cover")),
+        artist=extra_info.get("ARTIST"),
+        date=extra_info.get("DATE"),
+        purl=extra_info.get("PURL"),
+    )
+
+def parse_track(track, media):
+    """
+    Function to add one MediaInfo track dict to the media model.
+    """
+    track_type = track.get("@type")
+    if track_type == "General":
+        media.general = parse_general(track)
+    elif track_type == "Video":
+        media.video_count += 1
+    elif track_type == "Audio":
+        order = len(media.audio)
+        media.audio.append(AudioTrack(
+            to_int(track.get("@typeorder"), order + 1),
+            track.get("Format", "Unknown Format").lower(),
+            order,
+            format_profile=track.get("Format_Profile"),
+            channels=to_int(track.get("Channels")),
+            sampling_rate=to_int(track.get("SamplingRate")),
+            bit_rate=to_int(track.get("BitRate")),
+            **stream_fields(track),
+        ))
+    elif track_type == "Text":
+        order = len(media.text)
+        subtitle_format = track.get("Format", "Unknown Format").lower()
+        media.text.append(TextTrack(
+            to_int(track.get("@typeorder"), order + 1),
+            SUBTITLE_FORMATS.get(subtitle_format, subtitle_format),
+            order,
+            **stream_fields(track),
+        ))
+    elif track_type == "Image":
+        order = len(media.images)
+        media.images.append(ImageTrack(
+            to_int(track.get("@typeorder"), order + 1),
+            track.get("Format", "Unknown Format").lower(),
+            order,
+            **stream_fields(track),
+        ))
+
+def parse_track_list(track_list):
+    """
+    Function to build the media model from a MediaInfo track list in a single pass.
+
+    The raw dicts are not referenced afterwards and can be garbage collected.
+    """
+    media = MediaInfo()
+    for track in track_list:
+        parse_track(track, media)
+    return media
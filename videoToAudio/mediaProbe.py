@@ -0,0 +1,227 @@
+import io
+import json
+import struct
+import subprocess
+import contextlib
+
+from videoToAudio.checkVariables import tool_path
+from videoToAudio.containerProbe import probe_native
+from videoToAudio.errors import ConversionError
+from videoToAudio.mediaInfoStream import iter_tracks
+from videoToAudio.remoteInput import resolve_url
+
+# Ways to produce the track list of a file: "native" reads Matroska/MP4 headers in-process
+PROBE_BACKENDS = ["native", "mediainfo", "ffprobe"]
+DEFAULT_PROBE_BACKEND = "native"
+# Program used by the native backend for other containers or damaged headers
+NATIVE_FALLBACK_BACKEND = "mediainfo"
+# Command each backend runs, the native backend only runs its fallback's
+PROBE_COMMANDS = {"native": [NATIVE_FALLBACK_BACKEND], "mediainfo": ["mediainfo"], "ffprobe": ["ffprobe"]}
+
+# FFprobe codec names translated to the MediaInfo "Format" values used by the rest of the pipeline
+FFPROBE_FORMATS = {
+    "aac": "AAC",
+    "opus": "Opus",
+    "mp3": "MPEG Audio",
+    "mp2": "MPEG Audio",
+    "mp1": "MPEG Audio",
+    "flac": "FLAC",
+    "vorbis": "Vorbis",
+    "ac3": "AC-3",
+    "eac3": "E-AC-3",
+    "dts": "DTS",
+    "truehd": "MLP FBA",
+    "alac": "ALAC",
+    "subrip": "UTF-8",
+    "srt": "UTF-8",
+    "ass": "ASS",
+    "ssa": "SSA",
+    "webvtt": "WebVTT",
+    "mov_text": "Timed Text",
+    "h264": "AVC",
+    "hevc": "HEVC",
+    "vp9": "VP9",
+    "av1": "AV1",
+    "mpeg4": "MPEG-4 Visual",
+}
+
+# FFprobe codec names of the MPEG audio layers, as MediaInfo "Format_Profile" values
+FFPROBE_PROFILES = {"mp3": "Layer 3", "mp2": "Layer 2", "mp1": "Layer 1"}
+
+# FFprobe codec types translated to MediaInfo track types
+FFPROBE_TRACK_TYPES = {"audio": "Audio", "video": "Video", "subtitle": "Text"}
+
+def run_probe_command(command, file_path, dump_json=None):
+    """
+    Function to run a probe command and parse its JSON output straight from the pipe.
+
+    No shell and no temporary file are involved. The raw JSON is written to
+    dump_json when a path is given, for debugging.
+    """
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL)
+    except OSError as e:
+        raise ConversionError(f"An error occurred: {e}")
+
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", errors="replace").strip()
+        raise ConversionError(f"Error analyzing the file: {file_path} {message}".strip())
+
+    if dump_json:
+        with open(dump_json, 'wb') as dump_file:
+            dump_file.write(result.stdout)
+        print(f"Media info saved to {dump_json}")
+
+    try:
+        return json.loads(result.stdout)
+    except ValueError:
+        raise ConversionError("Error decoding the JSON file.")
+
+class TeeStream:
+    # Text stream that copies everything read from it to a second file, used to dump the raw report
+    def __init__(self, stream, copy_file):
+        self.stream = stream
+        self.copy_file = copy_file
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.copy_file.write(data)
+        return data
+
+def run_mediainfo(file_path, dump_json=None):
+    """
+    Function to get the MediaInfo track list, parsed from the pipe while MediaInfo writes it.
+
+    The report is read in chunks by the streaming reader, which keeps only the
+    fields the media model uses, so a report of many MB is never held in memory.
+    A remote input is opened by MediaInfo itself, from its HTTP(S) URL.
+    """
+    command = [tool_path("mediainfo"), "--Output=JSON", resolve_url(file_path)]
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL)
+    except OSError as e:
+        raise ConversionError(f"An error occurred: {e}")
+
+    decode_error = None
+    with process, contextlib.ExitStack() as stack:
+        stream = io.TextIOWrapper(process.stdout, encoding="utf-8", errors="replace")
+        if dump_json:
+            stream = TeeStream(stream, stack.enter_context(open(dump_json, 'w', encoding='utf-8')))
+        try:
+            tracks = list(iter_tracks(stream))
+            stream.read()  # Anything after the document, so MediaInfo never blocks on a full pipe
+        except ValueError as e:
+            decode_error = e
+            process.kill()
+        message = process.stderr.read().decode("utf-8", errors="replace").strip()
+        process.wait()
+
+    # A negative code after a decoding error is the kill above, not a MediaInfo failure
+    if process.returncode > 0 or (process.returncode < 0 and decode_error is None):
+        raise ConversionError(f"Error analyzing the file: {file_path} {message}".strip())
+    if decode_error is not None:
+        raise ConversionError("Error decoding the JSON file.")
+    if dump_json:
+        print(f"Media info saved to {dump_json}")
+    return tracks
+
+def run_ffprobe(file_path, dump_json=None):
+    # FFprobe JSON report, translated to a MediaInfo-style list of tracks
+    command = [tool_path("ffprobe"), "-v", "error", "-print_format", "json", "-show_format", "-show_streams",
+               resolve_url(file_path)]
+    return ffprobe_to_track_list(run_probe_command(command, file_path, dump_json))
+
+def yes_no(value):
+    return "Yes" if value else "No"
+
+def ffprobe_to_track_list(data):
+    """
+    Function to translate an FFprobe report to the track list layout of MediaInfo.
+
+    Only the fields the pipeline reads are filled in. Attached pictures become the
+    "Cover" flag of the General track, like MediaInfo reports them.
+    """
+    container = data.get("format", {})
+    container_tags = {key.upper(): value for key, value in container.get("tags", {}).items()}
+
+    general = {"@type": "General"}
+    tracks = [general]
+    counts = {"Audio": 0, "Video": 0, "Text": 0}
+    cover = False
+
+    for stream in data.get("streams", []):
+        disposition = stream.get("disposition", {})
+        if disposition.get("attached_pic"):
+            cover = True
+            continue
+
+        track_type = FFPROBE_TRACK_TYPES.get(stream.get("codec_type"))
+        if track_type is None:
+            continue  # Data and attachment streams are not used
+        counts[track_type] += 1
+
+        tags = {key.lower(): value for key, value in stream.get("tags", {}).items()}
+        codec_name = stream.get("codec_name", "")
+        track = {
+            "@type": track_type,
+            "@typeorder": str(counts[track_type]),
+            "StreamOrder": str(stream.get("index", len(tracks) - 1)),
+            "Format": FFPROBE_FORMATS.get(codec_name, codec_name.upper()),
+            "Default": yes_no(disposition.get("default")),
+            "Forced": yes_no(disposition.get("forced")),
+        }
+        if codec_name in FFPROBE_PROFILES:
+            track["Format_Profile"] = FFPROBE_PROFILES[codec_name]
+        for key, field in (("duration", "Duration"), ("bit_rate", "BitRate"), ("channels", "Channels"), ("sample_rate", "SamplingRate")):
+            if stream.get(key) is not None:
+                track[field] = str(stream[key])
+        if "language" in tags:
+            track["Language"] = tags["language"]
+        if "title" in tags:
+            track["Title"] = tags["title"]
+        tracks.append(track)
+
+    # MediaInfo only numbers tracks with "@typeorder" when there is more than one of that type
+    for track in tracks[1:]:
+        if counts[track["@type"]] == 1:
+            del track["@typeorder"]
+
+    general["Format"] = container.get("format_long_name", container.get("format_name", ""))
+    for key, field in (("size", "FileSize"), ("duration", "Duration")):
+        if container.get(key) is not None:
+            general[field] = str(container[key])
+    for track_type in ("Video", "Audio", "Text"):
+        if counts[track_type]:
+            general[f"{track_type}Count"] = str(counts[track_type])
+    if "TITLE" in container_tags:
+        general["Title"] = container_tags["TITLE"]
+    if cover:
+        general["Cover"] = "Yes"
+
+    extra = {key: container_tags[key] for key in ("ARTIST", "DATE", "PURL") if key in container_tags}
+    if extra:
+        general["extra"] = extra
+
+    return tracks
+
+def probe_file(file_path, backend=DEFAULT_PROBE_BACKEND, dump_json=None):
+    """
+    Function to get the MediaInfo-style track list of a file with the chosen backend.
+
+    The native backend falls back to NATIVE_FALLBACK_BACKEND for containers other
+    than Matroska and MP4, and for headers it cannot read.
+    """
+    if backend == "native":
+        try:
+            track_list = probe_native(file_path, dump_json)
+        except (ValueError, IndexError, struct.error) as e:
+            print(f"Cannot read the headers of {file_path} ({e}), probing it with {NATIVE_FALLBACK_BACKEND}")
+            track_list = None
+        except OSError as e:
+            raise ConversionError(f"An error occurred: {e}")
+        if track_list is not None:
+            return track_list
+        backend = NATIVE_FALLBACK_BACKEND
+    if backend == "ffprobe":
+        return run_ffprobe(file_path, dump_json)
+    return run_mediainfo(file_path, dump_json)
@@ -0,0 +1,95 @@
+"""
+Audio output profiles: one profile is one encoded output (codec, bitrate, sample rate, channels).
+
+Several profiles of the same track are encoded from a single decode: the
+decoded track is split with asplit inside one FFmpeg filter graph and each
+branch feeds its own encoder.
+"""
+
+# Codec names accepted in a profile spec -> (FFmpeg encoder, file extension)
+PROFILE_CODECS = {
+    "mp3": ("libmp3lame", "mp3"),
+    "opus": ("libopus", "opus"),
+    "aac": ("aac", "m4a"),
+}
+
+class OutputProfile:
+    def __init__(self, codec="mp3", bitrate=None, sample_rate=None, channels=None):
+        if codec not in PROFILE_CODECS:
+            raise ValueError(f"Unknown profile codec '{codec}', expected one of: {', '.join(PROFILE_CODECS)}")
+        self.codec = codec  # Key of PROFILE_CODECS, e.g. "mp3"
+        self.encoder, self.extension = PROFILE_CODECS[codec]  # FFmpeg encoder and output file extension
+        self.bitrate = bitrate  # FFmpeg bitrate, e.g. "320k", None for the encoder default
+        self.sample_rate = sample_rate  # Output sampling rate in Hz, None to keep the source rate
+        self.channels = channels  # Output channel count, None to keep the source layout
+
+    @property
+    def name(self):
+        # Used in output filenames and the job journal, e.g. "mp3_320k" or "opus_96k_48000hz_2ch"
+        parts = [self.codec]
+        if self.bitrate:
+            parts.append(self.bitrate)
+        if self.sample_rate:
+            parts.append(f"{self.sample_rate}hz")
+        if self.channels:
+            parts.append(f"{self.channels}ch")
+        return "_".join(parts)
+
+    def codec_arguments(self):
+        # FFmpeg options for one output of this profile
+        arguments = ["-c:a", self.encoder]
+        if self.bitrate:
+            arguments += ["-b:a", self.bitrate]
+        if self.sample_rate:
+            arguments += ["-ar", str(self.sample_rate)]
+        if self.channels:
+            arguments += ["-ac", str(self.channels)]
+        return arguments
+
+def parse_profile(spec):
+    """
+    Function to build an OutputProfile from "codec[:bitrate[:sample_rate[:channels]]]", e.g. "opus:96k:48000:2".
+
+    Raises ValueError for unknown codecs or malformed numbers.
+    """
+    parts = spec.strip().lower().split(":")
+    if len(parts) > 4 or not parts[0]:
+        raise ValueError(f"Invalid profile '{spec}', expected codec[:bitrate[:sample_rate[:channels]]]")
+    parts += [""] * (4 - len(parts))
+    codec, bitrate, sample_rate, channels = parts
+    try:
+        return OutputProfile(codec, bitrate or None, int(sample_rate) if sample_rate else None,
+                             int(channels) if channels else None)
+    except ValueError as e:
+        raise ValueError(f"Invalid profile '{spec}': {e}")
+
+def fanout_arguments(track_outputs, track_filters=None):
+    """
+    Function to build the FFmpeg arguments encoding each track to all of its profiles.
+
+    track_outputs is a list of (FFmpeg audio track order, [(OutputProfile, output file), ...]).
+    A track with several outputs is decoded once and split with asplit, a track
+    with a single output is mapped directly. track_filters maps a track order to
+    an audio filter applied before the encoders, e.g. a loudness gain. Returns
+    (filter arguments, output arguments): the -filter_complex part goes before the first output.
+    """
+    track_filters = track_filters or {}
+    filters = []
+    outputs = []
+    for track_order, profile_outputs in track_outputs:
+        track_filter = track_filters.get(track_order)
+        if len(profile_outputs) == 1:
+            profile, output_file = profile_outputs[0]
+            outputs += ["-map", f"0:a:{track_order}"] + (["-af", track_filter] if track_filter else [])
+            outputs += profile.codec_arguments() + [output_file]
+            continue
+
+        labels = [f"a{track_order}p{index}" for index in range(len(profile_outputs))]
+        split = f"{track_filter},asplit" if track_filter else "asplit"
+        filters.append(f"[0:a:{track_order}]{split}={len(labels)}" + "".join(f"[{label}]" for label in labels))
+        for label, (profile, output_file) in zip(labels, profile_outputs):
+            outputs += ["-map", f"[{label}]"] + profile.codec_arguments() + [output_file]
+
+    if filters:
+        return ["-filter_complex", ";".join(filters)], outputs
+    return [], outputs
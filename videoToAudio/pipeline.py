@@ -0,0 +1,180 @@
+import os
+import time
+import sqlite3
+
+from videoToAudio import checkVariables, fileAnalyzeConvert, instrumentation, mediaProbe, verifyFileExtension
+from videoToAudio.dedupIndex import DEFAULT_DEDUP_MODE, DedupIndex
+from videoToAudio.errors import ConversionError
+from videoToAudio.jobJournal import JobJournal
+from videoToAudio.probeCache import ProbeCache
+from videoToAudio.remoteInput import DEFAULT_SPOOL_BUDGET, Spool, is_remote
+
+# Command words every conversion depends on, the probe backend adds its own (see required_commands)
+REQUIRED_COMMANDS = ["ffmpeg"]
+
+# Commands already found, so a process only checks them once
+checked_commands = set()
+
+# Probe caches opened by this process, keyed by (database path, partial hash flag)
+probe_caches = {}
+
+# Job journals opened by this process, keyed by database path
+job_journals = {}
+
+# Dedup indexes opened by this process, keyed by (database path, mode)
+dedup_indexes = {}
+
+# Spools of remote inputs used by this process, keyed by (directory, budget)
+spools = {}
+
+class ConvertOptions:
+    def __init__(self, audio_policy=fileAnalyzeConvert.DEFAULT_AUDIO_POLICY, output_dir=".",
+                 check_tools=True, verify_extension=True, use_probe_cache=True, probe_cache_path=None,
+                 probe_partial_hash=False, probe_backend=mediaProbe.DEFAULT_PROBE_BACKEND, dump_probe_json=False,
+                 keep_subtitles=False, use_journal=True, journal_path=None, ffmpeg_timeout=None,
+                 audio_profiles=None, track_selection=None, dedup_mode=DEFAULT_DEDUP_MODE, dedup_index_path=None,
+                 segment_encode=False, spool_dir=None, spool_budget=DEFAULT_SPOOL_BUDGET, loudness=None):
+        self.audio_policy = audio_policy  # "copy" or "mp3", see fileAnalyzeConvert.AUDIO_POLICIES
+        self.output_dir = output_dir  # Directory the extracted files are written to
+        self.check_tools = check_tools  # Check that the required commands exist before converting
+        self.verify_extension = verify_extension  # Reject files that do not look like video files
+        self.use_probe_cache = use_probe_cache  # Reuse MediaInfo results of unchanged files
+        self.probe_cache_path = probe_cache_path  # SQLite file of the probe cache, None for the user cache directory
+        self.probe_partial_hash = probe_partial_hash  # Also compare a hash of the first/last blocks of the file
+        self.probe_backend = probe_backend  # "native", "mediainfo" or "ffprobe", see mediaProbe.PROBE_BACKENDS
+        self.dump_probe_json = dump_probe_json  # Save the raw probe JSON next to the outputs for debugging
+        self.keep_subtitles = keep_subtitles  # Also save subtitles that are converted to LRC
+        self.use_journal = use_journal  # Skip outputs the job journal records as done, so interrupted runs resume
+        self.journal_path = journal_path  # SQLite file of the job journal, None for the user cache directory
+        self.ffmpeg_timeout = ffmpeg_timeout  # Seconds after which a hung FFmpeg is killed, None to wait forever
+        self.audio_profiles = audio_profiles  # outputProfiles.OutputProfile list every audio track is also encoded to
+        self.track_selection = track_selection  # trackSelection.SelectionPolicy of the tracks to extract, None for all
+        self.dedup_mode = dedup_mode  # "link" or "copy" outputs of content already produced, "off" to always extract
+        self.dedup_index_path = dedup_index_path  # SQLite file of the dedup index, None for the user cache directory
+        self.segment_encode = segment_encode  # Encode long MP3 transcodes in parallel time segments, see segmentEncode
+        self.spool_dir = spool_dir  # Where remote inputs FFmpeg has to seek in are copied, None for the user cache directory
+        self.spool_budget = spool_budget  # Largest total size of those copies in bytes, least recently used ones are removed
+        self.loudness = loudness  # loudnessAnalysis.LoudnessSettings to measure (and normalize) the audio tracks, None to skip
+
+class ConvertResult:
+    def __init__(self, input_path):
+        self.input_path = input_path  # File (or remote URL) that was converted
+        self.error = None  # Error message, None when the conversion succeeded
+        self.audio_files = []  # Extracted audio files
+        self.subtitle_files = []  # Extracted subtitle files
+        self.lrc_files = []  # LRC files converted from SRT/WebVTT/ASS subtitles
+        self.cover_image = None  # Extracted cover image, if any
+        self.saved_bytes = 0  # Input bytes saved by the single-pass extraction
+        self.dedup_linked_bytes = 0  # Disk space saved by hard linking outputs of identical content
+        self.dedup_copied_bytes = 0  # Output bytes copied instead of extracted or encoded again
+        self.elapsed = 0.0  # Wall time of the conversion in seconds
+        self.media = None  # Compact mediaModel.MediaInfo of the input, for reporting
+        self.stages = []  # instrumentation.StageRecord list, one per stage and FFmpeg run
+        self.audio_stats = []  # Loudness, peak and silence statistics per audio track, when options.loudness is set
+
+    @property
+    def success(self):
+        return self.error is None
+
+def required_commands(probe_backend=mediaProbe.DEFAULT_PROBE_BACKEND):
+    # FFmpeg and the program the probe backend runs
+    return REQUIRED_COMMANDS + mediaProbe.PROBE_COMMANDS[probe_backend]
+
+def ensure_tools(probe_backend=mediaProbe.DEFAULT_PROBE_BACKEND):
+    """
+    Function to check the required commands once per process.
+    """
+    commands = [command for command in required_commands(probe_backend) if command not in checked_commands]
+    if not commands:
+        return
+
+    missing = checkVariables.find_missing_commands(commands)
+    if missing:
+        raise ConversionError(f"Missing shell commands: {', '.join(missing)}")
+    checked_commands.update(commands)
+
+def get_probe_cache(options):
+    # Open the probe cache once per process and keep it open for the following files
+    if not options.use_probe_cache:
+        return None
+    key = (options.probe_cache_path, options.probe_partial_hash)
+    if key not in probe_caches:
+        probe_caches[key] = ProbeCache(options.probe_cache_path, options.probe_partial_hash)
+    return probe_caches[key]
+
+def get_job_journal(options):
+    # Open the job journal once per process, like the probe cache
+    if not options.use_journal:
+        return None
+    if options.journal_path not in job_journals:
+        job_journals[options.journal_path] = JobJournal(options.journal_path)
+    return job_journals[options.journal_path]
+
+def get_dedup_index(options):
+    # Open the dedup index once per process, like the probe cache
+    if options.dedup_mode == "off":
+        return None
+    key = (options.dedup_index_path, options.dedup_mode)
+    if key not in dedup_indexes:
+        dedup_indexes[key] = DedupIndex(options.dedup_index_path, options.dedup_mode)
+    return dedup_indexes[key]
+
+def get_spool(options):
+    # One spool per directory and budget, like the caches
+    key = (options.spool_dir, options.spool_budget)
+    if key not in spools:
+        spools[key] = Spool(options.spool_dir, options.spool_budget)
+    return spools[key]
+
+def convert(path, options=None):
+    """
+    Function to analyze a video file and extract its audio, subtitles and cover image in-process.
+
+    path can also be an http(s):// or s3:// URL, see remoteInput.
+
+    Never raises for conversion problems: failures, including I/O errors, cache
+    database errors and malformed probe output, are reported through ConvertResult.error.
+    """
+    options = options or ConvertOptions()
+    result = ConvertResult(path)
+    start_time = time.monotonic()
+    instrumentation.begin_file(path)
+
+    try:
+        if options.check_tools:
+            ensure_tools(options.probe_backend)
+        if not is_remote(path) and not os.path.isfile(path):
+            raise ConversionError(f"File not found: {path}")
+        if options.verify_extension and not verifyFileExtension.is_video_file(path):
+            raise ConversionError(f"File is not a valid video file: {path}")
+
+        os.makedirs(options.output_dir, exist_ok=True)
+        summary = fileAnalyzeConvert.analyze_video(path, options.audio_policy, options.output_dir, get_probe_cache(options),
+                                                   options.probe_backend, options.dump_probe_json, options.keep_subtitles,
+                                                   get_job_journal(options), options.ffmpeg_timeout, options.audio_profiles,
+                                                   options.track_selection, get_dedup_index(options), options.segment_encode,
+                                                   get_spool(options), options.loudness)
+
+        result.audio_files = [output_file for audio_info in summary.audio_info_list
+                              for output_file in [audio_info.output_filename] + audio_info.profile_outputs]
+        result.subtitle_files = [subtitle_info.output_filename for subtitle_info in summary.subtitle_info_list
+                                 if subtitle_info.output_filename]
+        result.lrc_files = summary.lrc_files
+        result.cover_image = summary.cover_image
+        result.saved_bytes = summary.saved_bytes
+        result.dedup_linked_bytes = summary.dedup_linked_bytes
+        result.dedup_copied_bytes = summary.dedup_copied_bytes
+        result.media = summary.media
+        result.audio_stats = summary.audio_stats
+    except ConversionError as e:
+        result.error = str(e)
+    except OSError as e:
+        result.error = f"I/O error while converting {path}: {e}"
+    except sqlite3.Error as e:
+        result.error = f"Cache database error while converting {path}: {e}"
+    except ValueError as e:
+        result.error = f"Invalid data while converting {path}: {e}"
+
+    result.elapsed = time.monotonic() - start_time
+    result.stages = instrumentation.take_records()
+    return result
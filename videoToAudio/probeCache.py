@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+from videoToAudio.checkVariables import cache_directory
+from videoToAudio.remoteInput import input_identity, open_input
+
+PROBE_CACHE_FILENAME = "probes.sqlite3"
+
+# Bytes read from the start and the end of a file for the optional partial hash
+PARTIAL_HASH_BLOCK = 64 * 1024
+
+def partial_hash(file_path):
+    """
+    Function to hash the first and last blocks of a file together with its size.
+
+    Cheap compared to hashing the whole file, and catches files rewritten in place
+    with the same size and modification time.
+    """
+    digest = hashlib.sha1()
+    with open_input(file_path) as media_file:
+        size = media_file.seek(0, os.SEEK_END)
+        media_file.seek(0)
+        digest.update(str(size).encode())
+        digest.update(media_file.read(PARTIAL_HASH_BLOCK))
+        if size > PARTIAL_HASH_BLOCK:
+            media_file.seek(max(size - PARTIAL_HASH_BLOCK, PARTIAL_HASH_BLOCK))
+            digest.update(media_file.read(PARTIAL_HASH_BLOCK))
+    return digest.hexdigest()
+
+class ProbeCache:
+    """
+    SQLite cache of parsed probe results keyed by file identity (path, size, mtime and an optional partial hash).
+
+    A lookup only costs a stat call; the entry is ignored as soon as the file changes.
+    """
+
+    def __init__(self, database_path=None, use_partial_hash=False):
+        self.database_path = database_path or os.path.join(cache_directory(), PROBE_CACHE_FILENAME)
+        self.use_partial_hash = use_partial_hash
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.database_path)), exist_ok=True)
+        # Batch workers share the database, WAL lets readers and one writer work at the same time
+        self.connection = sqlite3.connect(self.database_path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS probes ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " partial_hash TEXT,"
+            " tracks TEXT NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def file_identity(self, file_path):
+        # (path, size, mtime_ns, partial hash or None) of a file as it is now, see remoteInput for URLs
+        path, size, mtime_ns = input_identity(file_path)
+        file_hash = partial_hash(file_path) if self.use_partial_hash else None
+        return path, size, mtime_ns, file_hash
+
+    def get(self, file_path):
+        """
+        Function to return the cached probe result of a file, or None when it is missing or stale.
+        """
+        path, size, mtime_ns, file_hash = self.file_identity(file_path)
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, partial_hash, tracks FROM probes WHERE path = ?", (path,)
+        ).fetchone()
+
+        if row is None or row[0] != size or row[1] != mtime_ns or (self.use_partial_hash and row[2] != file_hash):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[3])
+
+    def put(self, file_path, probe_result):
+        """
+        Function to store the probe result of a file (any JSON value), replacing any older entry for the same path.
+        """
+        path, size, mtime_ns, file_hash = self.file_identity(file_path)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO probes (path, size, mtime_ns, partial_hash, tracks, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, file_hash, json.dumps(probe_result), time.time()),
+            )
+
+    def close(self):
+        self.connection.close()
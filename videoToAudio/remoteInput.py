@@ -0,0 +1,431 @@
+"""
+Remote inputs: video files read over HTTP(S), from a web server or an S3-compatible object store.
+
+Sniffing, probing and cover reads only fetch the bytes they look at, with
+ranged GET requests over one kept-alive connection (RemoteFile). FFmpeg gets
+the file over a pipe, written by a thread that streams a single GET request
+(PipeFeeder), so nothing is copied to disk when the container can be demuxed
+front to back. Only inputs FFmpeg has to seek in are downloaded to the spool,
+a directory in the cache directory that keeps the most recently used copies
+within a byte budget.
+
+s3://bucket/key inputs are read from VIDEOTOAUDIO_S3_ENDPOINT (path-style
+addressing, e.g. http://localhost:9000 for MinIO) through presigned URLs, so
+the same URL also works for MediaInfo and FFmpeg. Credentials come from
+AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY and AWS_SESSION_TOKEN, without them
+the bucket is read anonymously.
+"""
+import io
+import os
+import hmac
+import time
+import errno
+import hashlib
+import datetime
+import threading
+import http.client
+import email.utils
+import urllib.parse
+
+from videoToAudio.checkVariables import cache_directory
+from videoToAudio.errors import ConversionError
+
+REMOTE_SCHEMES = ("http", "https", "s3")
+
+# Environment variables of the S3-compatible store
+S3_ENDPOINT_VARIABLE = "VIDEOTOAUDIO_S3_ENDPOINT"
+DEFAULT_S3_ENDPOINT = "https://s3.amazonaws.com"
+DEFAULT_S3_REGION = "us-east-1"
+PRESIGN_EXPIRES = 6 * 3600  # Seconds a presigned URL stays valid, long enough for a slow FFmpeg run
+
+# Smallest ranged read: header reads are tiny and close together, one request serves many of them
+READ_BLOCK = 64 * 1024
+STREAM_CHUNK = 1024 * 1024
+REQUEST_TIMEOUT = 60
+
+SPOOL_DIRECTORY = "spool"
+DEFAULT_SPOOL_BUDGET = 20 * 1024 ** 3
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+# (size, mtime_ns) of the remote files opened by this process, refreshed every time a file is opened
+remote_stats = {}
+
+def is_remote(path):
+    # URL of a remote input rather than a local path
+    return urllib.parse.urlsplit(path).scheme.lower() in REMOTE_SCHEMES
+
+def input_name(path):
+    # File name of an input, for a URL the last part of its path without the query (s3:// keys are not encoded)
+    parts = urllib.parse.urlsplit(path)
+    if parts.scheme.lower() in ("http", "https"):
+        path = urllib.parse.unquote(parts.path)
+    elif parts.scheme.lower() == "s3":
+        path = parts.path
+    return os.path.basename(path)
+
+def parse_size(text):
+    """
+    Function to parse a byte count like "500M" or "20G" (binary units), used by --spool-budget.
+    """
+    text = text.strip().upper().rstrip("B").rstrip("I")
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ""
+    try:
+        return int(float(text[:len(text) - len(unit)]) * SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"invalid size: {text!r}, use e.g. 500M or 20G")
+
+def sign(key, message):
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+def presign_url(url, access_key, secret_key, region=DEFAULT_S3_REGION, expires=PRESIGN_EXPIRES, session_token=None,
+                now=None):
+    """
+    Function to presign a GET request for an S3 object URL (AWS Signature Version 4, query string authentication).
+
+    Only the host header is signed, so any client (ranged reads, MediaInfo, FFmpeg) can use the URL.
+    """
+    parts = urllib.parse.urlsplit(url)
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    timestamp = now.strftime("%Y%m%dT%H%M%SZ")
+    scope = f"{now:%Y%m%d}/{region}/s3/aws4_request"
+    query = {
+        "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+        "X-Amz-Credential": f"{access_key}/{scope}",
+        "X-Amz-Date": timestamp,
+        "X-Amz-Expires": str(expires),
+        "X-Amz-SignedHeaders": "host",
+    }
+    if session_token:
+        query["X-Amz-Security-Token"] = session_token
+    canonical_query = "&".join(f"{urllib.parse.quote(name, safe='~')}={urllib.parse.quote(value, safe='~')}"
+                               for name, value in sorted(query.items()))
+    canonical_request = "\n".join(["GET", parts.path or "/", canonical_query, f"host:{parts.netloc}", "", "host",
+                                   "UNSIGNED-PAYLOAD"])
+    string_to_sign = "\n".join(["AWS4-HMAC-SHA256", timestamp, scope,
+                                hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()])
+
+    key = sign(f"AWS4{secret_key}".encode("utf-8"), f"{now:%Y%m%d}")
+    for part in (region, "s3", "aws4_request"):
+        key = sign(key, part)
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{parts.scheme}://{parts.netloc}{parts.path}?{canonical_query}&X-Amz-Signature={signature}"
+
+def resolve_url(path):
+    """
+    Function to turn an input URL into the HTTP(S) URL it is read from.
+
+    s3://bucket/key becomes a path-style URL on the configured endpoint, presigned
+    when credentials are set. HTTP(S) URLs (including presigned ones) and local
+    paths are returned as they are, so the result can always be given to a tool.
+    """
+    parts = urllib.parse.urlsplit(path)
+    if parts.scheme.lower() != "s3":
+        return path
+    endpoint = os.environ.get(S3_ENDPOINT_VARIABLE) or DEFAULT_S3_ENDPOINT
+    url = f"{endpoint.rstrip('/')}/{parts.netloc}/{urllib.parse.quote(parts.path.lstrip('/'), safe='/~')}"
+    access_key, secret_key = os.environ.get("AWS_ACCESS_KEY_ID"), os.environ.get("AWS_SECRET_ACCESS_KEY")
+    if not (access_key and secret_key):
+        return url
+    region = os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or DEFAULT_S3_REGION
+    return presign_url(url, access_key, secret_key, region, session_token=os.environ.get("AWS_SESSION_TOKEN"))
+
+def identity_url(path):
+    # URL without the signature of a presigned URL, so the caches recognize the object when it is signed again
+    parts = urllib.parse.urlsplit(path)
+    query = [(name, value) for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+             if not name.startswith("X-Amz-") and name not in ("Signature", "Expires", "AWSAccessKeyId")]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query), fragment=""))
+
+def last_modified_ns(response):
+    # Last-Modified header in nanoseconds, 0 when the server does not send it
+    value = response.getheader("Last-Modified")
+    try:
+        return int(email.utils.parsedate_to_datetime(value).timestamp()) * 1_000_000_000 if value else 0
+    except (TypeError, ValueError):
+        return 0
+
+def connect(url):
+    # HTTP(S) connection to the server of a URL, opened on the first request
+    parts = urllib.parse.urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme.lower() == "https" else http.client.HTTPConnection
+    return connection_class(parts.netloc, timeout=REQUEST_TIMEOUT)
+
+def request_target(url):
+    # Path and query of a URL, as sent in the request line
+    parts = urllib.parse.urlsplit(url)
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+class RemoteFile(io.RawIOBase):
+    """
+    Read-only, seekable file over HTTP range requests.
+
+    Opening it fetches the first READ_BLOCK bytes, which also tells the size of
+    the file, so the container signature and most headers need no further request.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path  # Input URL as given, http(s):// or s3://
+        self.url = resolve_url(path)  # HTTP(S) URL the bytes are read from
+        self.position = 0
+        self.connection = None  # Kept-alive connection reused by every ranged read
+        self.requests = 0  # Number of HTTP requests, to see how little of the file is fetched
+        self.bytes_fetched = 0  # Bytes received from the server
+        self.first_block, self.size = self.fetch(0, READ_BLOCK)  # First bytes of the file and its size in bytes
+
+    def fetch(self, offset, size):
+        """
+        Function to read size bytes at offset with one ranged GET, returns (data, size of the file).
+
+        Network and HTTP errors are raised as OSError, like errors of local files.
+        The body is only read once the status and Content-Range show it is the
+        requested range, a server ignoring Range would otherwise send the whole file.
+        """
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = connect(self.url)
+            try:
+                self.connection.request("GET", request_target(self.url), headers={"Range": f"bytes={offset}-{offset + size - 1}"})
+                response = self.connection.getresponse()
+                requested = response.status == 206 and (response.getheader("Content-Range") or "").startswith(f"bytes {offset}-")
+                data = response.read() if requested or response.status == 416 else None
+                break
+            except (http.client.HTTPException, OSError) as e:
+                # A kept-alive connection the server already closed fails once, the retry opens a new one
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise OSError(errno.EIO, f"cannot read {self.path}: {e}")
+        self.requests += 1
+        if data is None:
+            # The unread body is dropped with the connection
+            self.connection.close()
+            self.connection = None
+            if response.status == 200:
+                raise OSError(errno.EIO, f"{self.path}: the server does not support range requests")
+            if response.status == 206:
+                raise OSError(errno.EIO, f"{self.path}: got Content-Range {response.getheader('Content-Range')} for bytes {offset}-")
+            raise OSError(errno.EIO, f"{self.path}: HTTP {response.status} {response.reason}")
+        self.bytes_fetched += len(data)
+
+        if response.status == 416:  # Range starts at or after the end of the file
+            total = int(response.getheader("Content-Range", "*/0").rpartition("/")[2])
+            return b"", total
+        total = int(response.getheader("Content-Range").rpartition("/")[2])
+        remote_stats[self.path] = (total, last_modified_ns(response))
+        return data, total
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise OSError(errno.EINVAL, "negative seek position")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.size - self.position)
+        if size <= 0:
+            return 0
+        if self.position + size <= len(self.first_block):
+            data = self.first_block[self.position:self.position + size]
+        else:
+            # Small reads fetch a whole block, the buffered reader keeps the rest for the next reads
+            data = self.fetch(self.position, size)[0]
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        super().close()
+
+def open_input(path):
+    """
+    Function to open an input for reading, a local file or a remote URL (buffered, seekable).
+    """
+    if is_remote(path):
+        return io.BufferedReader(RemoteFile(path), READ_BLOCK)
+    return open(path, 'rb')
+
+def input_identity(path):
+    """
+    Function to return (path, size, mtime_ns) of an input, the identity the caches and the job journal compare.
+
+    A remote input is identified by its URL without signature, its size and its Last-Modified time.
+    """
+    if not is_remote(path):
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+        return path, stat.st_size, stat.st_mtime_ns
+    if path not in remote_stats:
+        open_input(path).close()
+    size, mtime_ns = remote_stats[path]
+    return identity_url(path), size, mtime_ns
+
+def input_size(path):
+    # Size of a local or remote input in bytes
+    return input_identity(path)[1]
+
+def open_stream(path):
+    # Plain GET of a whole remote file on its own connection, for sequential copies
+    url = resolve_url(path)
+    connection = connect(url)
+    try:
+        connection.request("GET", request_target(url))
+        response = connection.getresponse()
+    except (http.client.HTTPException, OSError) as e:
+        connection.close()
+        raise OSError(errno.EIO, f"cannot read {path}: {e}")
+    if response.status != 200:
+        connection.close()
+        raise OSError(errno.EIO, f"{path}: HTTP {response.status} {response.reason}")
+    return response
+
+def copy_stream(path, output_file):
+    """
+    Function to copy a remote file to an open binary file, returns the number of bytes copied.
+    """
+    copied = 0
+    with open_stream(path) as response:
+        expected = response.length  # Content-Length, None when the server does not send it
+        while True:
+            try:
+                chunk = response.read(STREAM_CHUNK)
+            except (http.client.HTTPException, OSError) as e:
+                raise OSError(errno.EIO, f"download of {path} failed after {copied} bytes: {e}")
+            if not chunk:
+                break
+            output_file.write(chunk)
+            copied += len(chunk)
+    # A connection closed early just ends the body, only the length tells a cut download from a complete one
+    if expected is not None and copied != expected:
+        raise OSError(errno.EIO, f"download of {path} stopped after {copied} of {expected} bytes")
+    return copied
+
+class PipeFeeder:
+    """
+    Thread streaming a remote file into a pipe, FFmpeg reads the other end as "pipe:<fd>".
+    """
+
+    def __init__(self, path):
+        self.path = path  # Input URL
+        self.read_fd, self.write_fd = os.pipe()  # read_fd is handed to FFmpeg, write_fd is written by the thread
+        self.error = None  # Download error, None when the stream was sent (or FFmpeg stopped reading)
+        self.bytes_sent = 0  # Bytes written to the pipe
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    @property
+    def ffmpeg_input(self):
+        return f"pipe:{self.read_fd}"
+
+    def run(self):
+        try:
+            with open(self.write_fd, 'wb') as pipe:
+                self.bytes_sent = copy_stream(self.path, pipe)
+        except BrokenPipeError:
+            pass  # FFmpeg exited before the end of the stream, its own result tells whether that was a failure
+        except OSError as e:
+            self.error = e.strerror or str(e)
+
+    def start(self):
+        self.thread.start()
+
+    def join(self):
+        # Wait for the thread, or close the write end when it never started
+        if self.thread.ident is not None:
+            self.thread.join()
+        else:
+            os.close(self.write_fd)
+
+class Spool:
+    """
+    Local copies of remote inputs that FFmpeg has to seek in, kept within a byte budget.
+
+    Copies are named after the URL, size and Last-Modified time of the input, so
+    a changed object is downloaded again. Using a copy refreshes its mtime, the
+    least recently used copies are removed when a new one needs the space.
+    """
+
+    def __init__(self, directory=None, budget=DEFAULT_SPOOL_BUDGET):
+        self.directory = directory or os.path.join(cache_directory(), SPOOL_DIRECTORY)  # Where the copies are kept
+        self.budget = budget  # Largest total size of the copies in bytes
+        self.downloaded_bytes = 0  # Bytes downloaded by this spool
+
+    def spool_path(self, path):
+        url, size, mtime_ns = input_identity(path)
+        name = hashlib.sha1(f"{url}\0{size}\0{mtime_ns}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + os.path.splitext(input_name(path))[1].lower()), size
+
+    def evict(self, needed, keep):
+        # Remove the least recently used copies until needed more bytes fit in the budget
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".part"):
+                continue  # Download in progress
+            entry_path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue  # Removed by another process meanwhile
+            if entry_path != keep:
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+        total = sum(size for mtime, size, entry_path in entries)
+        for mtime, size, entry_path in sorted(entries):
+            if total + needed <= self.budget:
+                break
+            try:
+                os.remove(entry_path)
+                print(f"Removed {entry_path} from the spool ({size} bytes)")
+            except OSError:
+                pass
+            total -= size
+
+    def fetch(self, path, reason):
+        """
+        Function to return a local copy of a remote input, downloading it when the spool has none.
+
+        Raises ConversionError when the input is larger than the budget or cannot be downloaded.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            local_path, size = self.spool_path(path)
+            if os.path.exists(local_path) and os.path.getsize(local_path) == size:
+                os.utime(local_path)
+                print(f"Using the spooled copy {local_path} of {path}")
+                return local_path
+            if size > self.budget:
+                raise ConversionError(f"{path} has to be spooled ({reason}) but its {size} bytes exceed the "
+                                      f"spool budget of {self.budget} bytes")
+
+            self.evict(size, local_path)
+            print(f"Spooling {path} ({size} bytes) to {local_path}: {reason}")
+            start_time = time.monotonic()
+            temporary_path = f"{local_path}.{os.getpid()}.part"
+            try:
+                with open(temporary_path, 'wb') as spool_file:
+                    copied = copy_stream(path, spool_file)
+                if copied != size:
+                    raise OSError(errno.EIO, f"{path} changed during the download, {copied} bytes instead of {size}")
+                os.replace(temporary_path, local_path)
+            finally:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+        except OSError as e:
+            raise ConversionError(f"An error occurred: {e.strerror or e}")
+        self.downloaded_bytes += size
+        print(f"Spooled {size} bytes in {time.monotonic() - start_time:.1f}s")
+        return local_path
@@ -0,0 +1,213 @@
+"""
+Parallel MP3 encoding of one long audio track, split into time segments.
+
+The track is cut on the MP3 frame grid (1152 samples per frame) using the
+duration from the probe, and every segment is encoded by its own FFmpeg run, so
+a long recording keeps every core busy instead of one. Each segment starts
+PREROLL_FRAMES frames early and stops TAIL_FRAMES frames late: around every cut
+the encoders see the same signal a single encode would, and the extra frames are
+dropped when the segments are joined. The bit reservoir is turned off so no kept
+frame borrows bytes from a dropped one.
+
+Segments are cut by sample count (atrim) rather than by seeking, because
+container timestamps (milliseconds in Matroska) are not sample accurate. Each
+run therefore decodes the track from its start, which is cheap next to encoding.
+
+The joined file keeps the ID3 tag and the LAME Info frame of the first segment,
+patched with the frame count, the sizes, the seek table and the end padding of
+the last segment, so players trim the encoder delay and padding exactly like
+for a single encode.
+"""
+import os
+import struct
+
+from videoToAudio import jobRunner
+from videoToAudio.errors import ConversionError
+
+MP3_FRAME_SAMPLES = 1152
+# MPEG-1 Layer III header tables, the only MP3 layout with 1152-sample frames
+MP3_SAMPLE_RATES = [44100, 48000, 32000]
+MP3_BITRATES = [None, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, None]
+
+PREROLL_FRAMES = 2  # Frames encoded before each cut and dropped, the encoder state settles on them
+TAIL_FRAMES = 2  # Frames encoded after each cut and dropped, the last kept frame overlaps into them
+MIN_SEGMENT_SECONDS = 60  # Shorter segments are not worth an extra decode
+DEFAULT_MAX_SEGMENTS = os.cpu_count() or 1
+
+# Offsets in the Xing/Info tag, counted from its "Info" or "Xing" identifier
+XING_FRAMES = 8
+XING_BYTES = 12
+XING_TOC = 16
+XING_TOC_SIZE = 100
+LAME_DELAY_PADDING = 141
+LAME_MUSIC_LENGTH = 148
+LAME_MUSIC_CRC = 152
+LAME_TAG_CRC = 154
+
+def segment_count(duration, sample_rate, max_segments=DEFAULT_MAX_SEGMENTS, min_segment_seconds=MIN_SEGMENT_SECONDS):
+    """
+    Function to choose how many segments a track is encoded in, 1 to encode it in a single run.
+
+    Only tracks with a known duration and an MPEG-1 sampling rate (32, 44.1 or 48 kHz,
+    which LAME keeps as is) can be segmented.
+    """
+    if not duration or sample_rate not in MP3_SAMPLE_RATES:
+        return 1
+    return max(1, min(max_segments, int(duration // min_segment_seconds)))
+
+def crc16(data, crc=0):
+    # CRC-16/ARC (reflected 0x8005), the checksum of the LAME tag
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+def info_tag_offset(frame):
+    # Offset of the "Info"/"Xing" identifier in a frame, None for an audio frame
+    side_info = 17 if (frame[3] >> 6) == 3 else 32  # Mono frames have a shorter side info
+    offset = 4 + side_info
+    return offset if frame[offset:offset + 4] in (b"Info", b"Xing") else None
+
+def split_mp3(data):
+    """
+    Function to split MP3 data into (ID3v2 tag bytes, Info frame or None, list of audio frames).
+
+    Raises ConversionError on anything but MPEG-1 Layer III frames.
+    """
+    position = 0
+    if data[:3] == b"ID3":
+        size = 0
+        for byte in data[6:10]:
+            size = size << 7 | byte  # Syncsafe integer
+        position = 10 + size + (10 if data[5] & 0x10 else 0)
+    tag = data[:position]
+
+    frames = []
+    while position + 4 <= len(data):
+        header, = struct.unpack_from(">I", data, position)
+        bitrate = MP3_BITRATES[(header >> 12) & 15]
+        rate_index = (header >> 10) & 3
+        if header >> 21 != 0x7FF or (header >> 17) & 0xF != 0xD or bitrate is None or rate_index == 3:
+            raise ConversionError(f"Unexpected data in an MP3 segment at byte {position}")
+        length = 144 * bitrate * 1000 // MP3_SAMPLE_RATES[rate_index] + ((header >> 9) & 1)
+        frames.append(data[position:position + length])
+        position += length
+
+    info = frames.pop(0) if frames and info_tag_offset(frames[0]) is not None else None
+    return tag, info, frames
+
+def patch_info_frame(info, last_info, frames):
+    """
+    Function to update the Info frame of the first segment for the joined stream.
+
+    Frame count, byte count, seek table and music length describe the joined
+    frames, the encoder delay stays the one of the first segment and the end
+    padding is taken from the last segment. The music CRC is cleared: a CRC
+    over the whole stream in Python would cost more than the parallel encode
+    saves, and players do not check it.
+    """
+    info = bytearray(info)
+    offset = info_tag_offset(info)
+    total_bytes = len(info) + sum(len(frame) for frame in frames)
+    struct.pack_into(">II", info, offset + XING_FRAMES, len(frames), total_bytes)
+
+    # Seek table: byte position of every percent of the frames, scaled to 0-255
+    positions = []
+    position = len(info)
+    for frame in frames:
+        positions.append(position)
+        position += len(frame)
+    for index in range(1, XING_TOC_SIZE):
+        frame_index = index * len(frames) // XING_TOC_SIZE
+        info[offset + XING_TOC + index] = min(256 * positions[frame_index] // total_bytes, 255)
+
+    if last_info is not None:
+        last_offset = info_tag_offset(last_info)
+        delay_padding = int.from_bytes(info[offset + LAME_DELAY_PADDING:offset + LAME_DELAY_PADDING + 3], "big")
+        padding = int.from_bytes(last_info[last_offset + LAME_DELAY_PADDING:last_offset + LAME_DELAY_PADDING + 3], "big") & 0xFFF
+        info[offset + LAME_DELAY_PADDING:offset + LAME_DELAY_PADDING + 3] = (delay_padding & 0xFFF000 | padding).to_bytes(3, "big")
+    struct.pack_into(">IH", info, offset + LAME_MUSIC_LENGTH, total_bytes, 0)
+    struct.pack_into(">H", info, offset + LAME_TAG_CRC, crc16(info[:offset + LAME_TAG_CRC]))
+    return bytes(info)
+
+class SegmentedEncode:
+    """
+    One track encoded to one MP3 file by several FFmpeg runs at once.
+    """
+
+    def __init__(self, input_file, track_order, output_file, codec_arguments, duration, sample_rate, count, timeout=None,
+                 audio_filter=None):
+        self.input_file = input_file  # Container the track is read from
+        self.track_order = track_order  # FFmpeg audio track order
+        self.output_file = output_file  # Joined MP3 file
+        self.codec_arguments = codec_arguments  # FFmpeg encoder options, e.g. ["-c:a", "libmp3lame"]
+        self.audio_filter = audio_filter  # Filter applied to the whole track before it is cut, e.g. a loudness gain
+        self.timeout = timeout  # Seconds before a segment run is killed, None to wait forever
+        # First frame of every segment on the frame grid of the whole track
+        total_frames = int(duration * sample_rate) // MP3_FRAME_SAMPLES
+        self.start_frames = [index * total_frames // count for index in range(count)]
+        self.segment_files = [f"{output_file}.part{index}.mp3" for index in range(count)]  # Written next to the output
+
+    def jobs(self):
+        """
+        Function to build one CPU job per segment.
+        """
+        jobs = []
+        last = len(self.start_frames) - 1
+        for index, start_frame in enumerate(self.start_frames):
+            trim = f"atrim=start_sample={max(start_frame - PREROLL_FRAMES, 0) * MP3_FRAME_SAMPLES}"
+            if self.audio_filter:
+                trim = f"{self.audio_filter},{trim}"
+            if index < last:
+                trim += f":end_sample={(self.start_frames[index + 1] + TAIL_FRAMES) * MP3_FRAME_SAMPLES}"
+            command = ["ffmpeg", "-y", "-i", self.input_file, "-map", f"0:a:{self.track_order}", "-af", trim]
+            command += self.codec_arguments + ["-reservoir", "0"]
+            if index > 0:
+                command += ["-id3v2_version", "0"]  # Tags are taken from the first segment only
+            if 0 < index < last:
+                command += ["-write_xing", "0"]  # Only the first (delay) and last (padding) Info frames are used
+            command += ["-f", "mp3", self.segment_files[index]]
+            jobs.append(jobRunner.Job(command, f"{self.output_file} segment {index + 1}/{len(self.start_frames)}",
+                                      jobRunner.CPU, self.timeout))
+        return jobs
+
+    def join(self):
+        """
+        Function to join the encoded segments into the output file, then remove them.
+
+        Raises ConversionError when a segment is shorter than planned or not MPEG-1 Layer III.
+        """
+        tag, info, last_info = b"", None, None
+        frames = []
+        last = len(self.start_frames) - 1
+        for index, segment_file in enumerate(self.segment_files):
+            with open(segment_file, 'rb') as segment:
+                segment_tag, segment_info, segment_frames = split_mp3(segment.read())
+            skip = min(self.start_frames[index], PREROLL_FRAMES)
+            if index == 0:
+                tag, info = segment_tag, segment_info
+            if index < last:
+                keep = self.start_frames[index + 1] - self.start_frames[index]
+                if len(segment_frames) < skip + keep:
+                    raise ConversionError(f"Segment {index + 1} of {self.output_file} is shorter than planned")
+                frames += segment_frames[skip:skip + keep]
+            else:
+                last_info = segment_info
+                frames += segment_frames[skip:]
+
+        temporary_path = f"{self.output_file}.tmp"
+        with open(temporary_path, 'wb') as output:
+            output.write(tag)
+            if info is not None:
+                output.write(patch_info_frame(info, last_info, frames))
+            for frame in frames:
+                output.write(frame)
+        os.replace(temporary_path, self.output_file)
+        self.cleanup()
+
+    def cleanup(self):
+        # Remove the segment files, also after a failed run
+        for segment_file in self.segment_files:
+            if os.path.exists(segment_file):
+                os.remove(segment_file)
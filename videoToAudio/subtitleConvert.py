@@ -0,0 +1,134 @@
+"""
+Streaming SRT/WebVTT/ASS to LRC conversion.
+
+Cues are parsed one at a time from any iterable of lines (a file or the read
+end of a pipe fed by FFmpeg), so memory use does not grow with the subtitle size.
+"""
+import re
+import sys
+
+# Subtitle formats that can become LRC, and the format FFmpeg should stream them in
+LRC_SOURCE_FORMATS = {
+    "srt": "srt",
+    "vtt": "srt",  # FFmpeg converts WebVTT cues to SubRip on the fly
+    "ass": "ass",
+    "ssa": "ass",
+}
+
+# "00:01:02,345 --> 00:01:04,000" (SRT) and "01:02.345 --> 01:04.000 align:start" (WebVTT)
+CUE_TIMING = re.compile(r"^\s*(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})\s*-->")
+# Markup removed from cue text: HTML-like tags (SRT/WebVTT) and override blocks (ASS)
+TEXT_TAGS = re.compile(r"<[^>]*>|\{[^}]*\}")
+
+def timing_to_seconds(hours, minutes, seconds, fraction):
+    # Fractions are milliseconds in SRT/WebVTT ("345") and centiseconds in ASS ("34")
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(fraction) / (10 ** len(fraction))
+
+def clean_text(lines):
+    # Join the lines of a cue into one LRC line without markup
+    text = " ".join(line.strip() for line in lines)
+    text = text.replace("\\N", " ").replace("\\n", " ").replace("\\h", " ")
+    return " ".join(TEXT_TAGS.sub("", text).split())
+
+def parse_srt(lines):
+    """
+    Function to yield (start_seconds, text) for every cue of an SRT or WebVTT stream.
+
+    Both formats separate cues with blank lines and start the timing line with
+    the cue start, so the same parser handles them.
+    """
+    start = None
+    text_lines = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        timing = CUE_TIMING.match(line)
+        if timing:
+            start = timing_to_seconds(*timing.groups())
+            text_lines = []
+        elif not line.strip():
+            if start is not None and text_lines:
+                yield start, clean_text(text_lines)
+            start = None
+            text_lines = []
+        elif start is not None:
+            text_lines.append(line)
+
+    if start is not None and text_lines:
+        yield start, clean_text(text_lines)
+
+def parse_ass(lines):
+    """
+    Function to yield (start_seconds, text) for every Dialogue line of an ASS/SSA stream.
+    """
+    in_events = False
+    fields = ["Layer", "Start", "End", "Style", "Name", "MarginL", "MarginR", "MarginV", "Effect", "Text"]
+    for line in lines:
+        line = line.strip()
+        if line.startswith("["):
+            in_events = line.lower() == "[events]"
+            continue
+        if not in_events:
+            continue
+
+        key, _, value = line.partition(":")
+        if key == "Format":
+            fields = [field.strip() for field in value.split(",")]
+        elif key == "Dialogue":
+            # The text is the last field and may itself contain commas
+            values = value.split(",", len(fields) - 1)
+            if len(values) < len(fields):
+                continue
+            event = dict(zip(fields, values))
+            timing = re.match(r"^\s*(\d+):(\d{2}):(\d{2})[.,](\d{1,3})", event.get("Start", ""))
+            if not timing:
+                continue
+            text = clean_text([event.get("Text", "")])
+            if text:
+                yield timing_to_seconds(*timing.groups()), text
+
+def format_lrc_time(seconds):
+    # LRC timestamps are [mm:ss.xx], minutes keep counting past 59
+    centiseconds = int(round(seconds * 100))
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    return f"{minutes:02d}:{centiseconds // 100:02d}.{centiseconds % 100:02d}"
+
+def write_lrc(cues, output_file):
+    """
+    Function to write (start_seconds, text) cues as LRC lines, returns the number of lines written.
+    """
+    count = 0
+    for start, text in cues:
+        if text:
+            output_file.write(f"[{format_lrc_time(start)}]{text}\n")
+            count += 1
+    return count
+
+def convert_stream_to_lrc(lines, subtitle_format, lrc_filename):
+    """
+    Function to convert an iterable of subtitle lines to an LRC file.
+
+    subtitle_format is "srt", "vtt", "ass" or "ssa". Returns the number of LRC lines written.
+    """
+    source_format = LRC_SOURCE_FORMATS.get(subtitle_format)
+    if source_format is None:
+        raise ValueError(f"Subtitle format '{subtitle_format}' cannot be converted to LRC")
+
+    cues = parse_ass(lines) if source_format == "ass" else parse_srt(lines)
+    with open(lrc_filename, 'w', encoding='utf-8') as lrc_file:
+        return write_lrc(cues, lrc_file)
+
+def convert_file_to_lrc(subtitle_filename, subtitle_format, lrc_filename):
+    # Convert a subtitle file on disk, reading it line by line
+    with open(subtitle_filename, 'r', encoding='utf-8-sig', errors='replace') as subtitle_file:
+        return convert_stream_to_lrc(subtitle_file, subtitle_format, lrc_filename)
+
+def main():
+    if len(sys.argv) != 4:
+        print("Usage: python -m videoToAudio.subtitleConvert <srt|vtt|ass|ssa> <subtitle_file> <lrc_file>")
+        sys.exit(1)
+
+    line_count = convert_file_to_lrc(sys.argv[2], sys.argv[1], sys.argv[3])
+    print(f"Wrote {line_count} line(s) to {sys.argv[3]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Track selection policy: decides which audio and subtitle tracks are extracted at all.
+
+Every rule works on fields already in the media model (language, default and
+forced flags, channels, codec, title), so selection costs no extra probing.
+Unselected tracks are left out of the FFmpeg command and are never read or encoded.
+The default policy selects every track.
+"""
+import re
+
+from videoToAudio.mediaModel import LANGUAGE_ALIASES
+from videoToAudio.mediaProbe import FFPROBE_FORMATS, FFPROBE_PROFILES
+from videoToAudio.subtitleConvert import LRC_SOURCE_FORMATS
+
+FORCED_SUBTITLE_MODES = ["include", "only", "exclude"]
+
+# Titles of commentary tracks, e.g. "Director's Commentary"
+COMMENTARY_TITLE = re.compile(r"comment", re.IGNORECASE)
+
+class SelectionPolicy:
+    def __init__(self, languages=None, subtitle_languages=None, keep_unknown_language=True, default_audio_only=False,
+                 forced_subtitles="include", min_channels=None, max_channels=None, audio_codecs=None,
+                 skip_commentary=False, best_per_language=False, lrc_subtitles_only=False):
+        self.languages = languages  # Audio languages to keep, None for every language
+        self.subtitle_languages = subtitle_languages  # Subtitle languages to keep, None to use languages
+        self.keep_unknown_language = keep_unknown_language  # Keep tracks without a language tag when filtering on language
+        self.default_audio_only = default_audio_only  # Only keep audio tracks flagged as default
+        self.forced_subtitles = forced_subtitles  # "include", "only" or "exclude" forced subtitle tracks
+        self.min_channels = min_channels  # Drop audio tracks with fewer channels
+        self.max_channels = max_channels  # Drop audio tracks with more channels
+        self.audio_codecs = audio_codecs  # Audio codecs to keep (lowercase, e.g. "aac", "mp3", "ac3"), None for all
+        self.skip_commentary = skip_commentary  # Drop tracks whose title mentions a commentary
+        self.best_per_language = best_per_language  # Keep only the best audio track of each language
+        self.lrc_subtitles_only = lrc_subtitles_only  # Only keep subtitles that can be converted to LRC
+
+def normalize_language(language):
+    # "en-US", "EN" and "eng" all become "en", missing or undetermined languages become None
+    if not language:
+        return None
+    code = language.strip().lower().replace("_", "-").split("-")[0]
+    code = LANGUAGE_ALIASES.get(code, code)
+    return None if code in ("", "und", "mul", "zxx") else code
+
+def language_rejected(track, languages, keep_unknown_language):
+    # Reason for dropping a track because of its language, None to keep it
+    if not languages:
+        return None
+    language = normalize_language(track.language)
+    if language is None:
+        return None if keep_unknown_language else "no language tag"
+    if language not in {normalize_language(wanted) for wanted in languages}:
+        return f"language {language}"
+    return None
+
+def codec_matches(track, codec):
+    # codec is a MediaInfo format ("mpeg audio", "ac-3") or an FFmpeg codec name ("mp3", "ac3", "eac3", "dts")
+    format_name = FFPROBE_FORMATS.get(codec, codec).lower()
+    profile = FFPROBE_PROFILES.get(codec)
+    return track.format_name == format_name and (profile is None or track.format_profile in (None, profile))
+
+def audio_rejected(track, policy):
+    # Reason for dropping an audio track, None to keep it
+    reason = language_rejected(track, policy.languages, policy.keep_unknown_language)
+    if reason:
+        return reason
+    if policy.default_audio_only and not track.default:
+        return "not the default track"
+    if policy.min_channels and (track.channels or 0) < policy.min_channels:
+        return f"{track.channels or 'unknown'} channel(s)"
+    if policy.max_channels and track.channels and track.channels > policy.max_channels:
+        return f"{track.channels} channels"
+    if policy.audio_codecs and not any(codec_matches(track, codec) for codec in policy.audio_codecs):
+        return f"codec {track.format_name}"
+    if policy.skip_commentary and track.title and COMMENTARY_TITLE.search(track.title):
+        return "commentary"
+    return None
+
+def subtitle_rejected(track, policy):
+    # Reason for dropping a subtitle track, None to keep it
+    languages = policy.subtitle_languages if policy.subtitle_languages is not None else policy.languages
+    reason = language_rejected(track, languages, policy.keep_unknown_language)
+    if reason:
+        return reason
+    if policy.forced_subtitles == "only" and not track.forced:
+        return "not forced"
+    if policy.forced_subtitles == "exclude" and track.forced:
+        return "forced"
+    if policy.lrc_subtitles_only and track.format_name not in LRC_SOURCE_FORMATS:
+        return f"format {track.format_name} cannot become LRC"
+    if policy.skip_commentary and track.title and COMMENTARY_TITLE.search(track.title):
+        return "commentary"
+    return None
+
+def audio_quality(track):
+    # Higher is better: more channels, then bit rate, then sampling rate, the default flag breaks ties
+    return (track.channels or 0, track.bit_rate or 0, track.sampling_rate or 0, track.default)
+
+def select_tracks(media, policy=None):
+    """
+    Function to apply a SelectionPolicy to the media model.
+
+    Returns (selected audio tracks, selected subtitle tracks, skipped) where
+    skipped is a list of (track, reason). The media model itself is not changed.
+    """
+    if policy is None:
+        return list(media.audio), list(media.text), []
+
+    skipped = []
+    audio = []
+    for track in media.audio:
+        reason = audio_rejected(track, policy)
+        if reason:
+            skipped.append((track, reason))
+        else:
+            audio.append(track)
+
+    if policy.best_per_language:
+        best = {}
+        for track in audio:
+            language = normalize_language(track.language)
+            if language not in best or audio_quality(track) > audio_quality(best[language]):
+                best[language] = track
+        kept = {id(track) for track in best.values()}
+        skipped += [(track, "better track in the same language") for track in audio if id(track) not in kept]
+        audio = [track for track in audio if id(track) in kept]
+
+    text = []
+    for track in media.text:
+        reason = subtitle_rejected(track, policy)
+        if reason:
+            skipped.append((track, reason))
+        else:
+            text.append(track)
+
+    return audio, text, skipped
+
+def split_list(value):
+    # "en, ja" -> ["en", "ja"]
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+def add_selection_arguments(parser):
+    # Command line options shared by main.py and fileAnalyzeConvert
+    parser.add_argument("--languages", type=split_list, help="comma separated audio (and subtitle) languages to keep, e.g. en,ja")
+    parser.add_argument("--subtitle-languages", type=split_list, help="comma separated subtitle languages, defaults to --languages")
+    parser.add_argument("--drop-unknown-language", action="store_true", help="drop tracks without a language tag when filtering on language")
+    parser.add_argument("--default-audio-only", action="store_true", help="only extract audio tracks flagged as default")
+    parser.add_argument("--forced-subtitles", choices=FORCED_SUBTITLE_MODES, default="include",
+                        help="keep, only keep, or drop forced subtitle tracks")
+    parser.add_argument("--min-channels", type=int, help="drop audio tracks with fewer channels")
+    parser.add_argument("--max-channels", type=int, help="drop audio tracks with more channels")
+    parser.add_argument("--audio-codecs", type=split_list, help="comma separated audio codecs to keep, FFmpeg names or MediaInfo formats, e.g. aac,opus,mp3,ac3")
+    parser.add_argument("--skip-commentary", action="store_true", help="drop commentary tracks")
+    parser.add_argument("--best-per-language", action="store_true", help="only extract the best audio track of each language")
+    parser.add_argument("--lrc-subtitles-only", action="store_true", help="only extract subtitles that can be converted to LRC")
+
+def policy_from_args(args):
+    """
+    Function to build a SelectionPolicy from parsed arguments, or None when no selection option was given.
+    """
+    policy = SelectionPolicy(
+        languages=args.languages,
+        subtitle_languages=args.subtitle_languages,
+        keep_unknown_language=not args.drop_unknown_language,
+        default_audio_only=args.default_audio_only,
+        forced_subtitles=args.forced_subtitles,
+        min_channels=args.min_channels,
+        max_channels=args.max_channels,
+        audio_codecs=args.audio_codecs,
+        skip_commentary=args.skip_commentary,
+        best_per_language=args.best_per_language,
+        lrc_subtitles_only=args.lrc_subtitles_only,
+    )
+    if vars(policy) == vars(SelectionPolicy()):
+        return None
+    return policy
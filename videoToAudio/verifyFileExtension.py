@@ -1,30 +1,288 @@
 import sys
 import os
+import struct
 
-def is_video_file(file_path):
-    # Define common video file extensions (you can add more if needed)
-    video_extensions = ['.mp4', '.mkv', '.avi', '.mov', '.flv', '.wmv', '.webm', '.m4v']
+if __package__ in (None, ""):
+    # Run as "python videoToAudio/verifyFileExtension.py": the package is imported from the folder above this file
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from videoToAudio.remoteInput import open_input
+
+# Define common video file extensions (you can add more if needed)
+video_extensions = ['.mp4', '.mkv', '.avi', '.mov', '.flv', '.wmv', '.webm', '.m4v',
+                    '.ts', '.m2ts', '.mts', '.mpg', '.mpeg', '.3gp', '.ogv', '.asf']
+# Audio containers are admitted too, their audio is remuxed or transcoded like a video's
+audio_extensions = ['.mp3', '.m4a', '.m4b', '.aac', '.flac', '.ogg', '.oga', '.opus', '.wav', '.wma', '.mka']
+
+# Bytes read from the start of a file to recognize its container
+SNIFF_BYTES = 4096
+
+# Container names reported by sniff_container -> (description, "video" or "audio")
+CONTAINERS = {
+    "matroska": ("Matroska", "video"),
+    "webm": ("WebM", "video"),
+    "mp4": ("MP4/QuickTime", "video"),
+    "m4a": ("MPEG-4 audio", "audio"),
+    "avi": ("AVI", "video"),
+    "wav": ("WAV", "audio"),
+    "flv": ("FLV", "video"),
+    "asf": ("ASF/Windows Media", "video"),
+    "mpegts": ("MPEG transport stream", "video"),
+    "mpegps": ("MPEG program stream", "video"),
+    "ogg": ("Ogg", "audio"),
+    "flac": ("FLAC", "audio"),
+    "mp3": ("MP3", "audio"),
+    "aac": ("AAC (ADTS)", "audio"),
+}
+
+# ISO-BMFF major brands of audio-only files
+AUDIO_BRANDS = {b"M4A ", b"M4B ", b"M4P ", b"F4A ", b"F4B "}
+# Top-level boxes that can start an old QuickTime file without "ftyp"
+QUICKTIME_BOXES = {b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"}
+ASF_HEADER_GUID = bytes.fromhex("3026b2758e66cf11a6d900aa0062ce6c")
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+MATROSKA_SEGMENT_ID = 0x18538067
+MATROSKA_DOCTYPE_ID = 0x4282
+
+def has_video_extension(file_path):
+    # Check if the file extension is in the list of video extensions (no output, used for directory scans)
+    file_extension = os.path.splitext(file_path)[1].lower()
+    return file_extension in video_extensions
 
-    # Get the file extension
+def has_media_extension(file_path):
+    # Video or audio extension, the cheap first filter of directory scans
     file_extension = os.path.splitext(file_path)[1].lower()
+    return file_extension in video_extensions or file_extension in audio_extensions
+
+def read_ebml_number(data, position, keep_marker):
+    # EBML variable-length integer: the leading zero bits give its length, returns (value, next position)
+    if position >= len(data) or data[position] == 0:
+        return None, position
+    length = 9 - data[position].bit_length()
+    if position + length > len(data):
+        return None, position
+    value = int.from_bytes(data[position:position + length], "big")
+    if not keep_marker:
+        value &= (1 << (7 * length)) - 1
+        if value == (1 << (7 * length)) - 1:
+            value = -1  # All ones: unknown size (live recordings)
+    return value, position + length
+
+def check_matroska(header, file_size):
+    """
+    Function to read the EBML header and the Segment size, returns (container, problem).
+    """
+    header_size, position = read_ebml_number(header, 4, False)
+    if header_size is None or header_size < 0 or position + header_size > len(header):
+        return "matroska", "truncated EBML header"
+    container = "matroska"
+    end = position + header_size
+    while position < end:
+        element_id, position = read_ebml_number(header, position, True)
+        size, position = read_ebml_number(header, position, False)
+        if element_id is None or size is None or size < 0:
+            return container, "damaged EBML header"
+        if element_id == MATROSKA_DOCTYPE_ID and header[position:position + size].rstrip(b"\0") == b"webm":
+            container = "webm"
+        position += size
+
+    segment_id, position = read_ebml_number(header, end, True)
+    segment_size, position = read_ebml_number(header, position, False)
+    if segment_id != MATROSKA_SEGMENT_ID:
+        return container, "no Segment after the EBML header"
+    if segment_size is not None and segment_size >= 0 and position + segment_size > file_size:
+        return container, f"truncated, the Segment needs {position + segment_size} bytes but the file has {file_size}"
+    return container, None
+
+def check_iso_bmff(media_file, file_size):
+    """
+    Function to walk the top-level boxes of an MP4/QuickTime file, returns a problem or None.
+
+    Only box headers are read. A box running past the end of the file or a
+    missing "moov" box means the file was not completely written.
+    """
+    position = 0
+    boxes = set()
+    while position + 8 <= file_size and len(boxes) < 1000:
+        media_file.seek(position)
+        box_header = media_file.read(16)
+        size, box_type = struct.unpack(">I4s", box_header[:8])
+        if size == 1 and len(box_header) == 16:
+            size = struct.unpack(">Q", box_header[8:16])[0]
+        elif size == 0:
+            size = file_size - position  # Box extends to the end of the file
+        if size < 8:
+            return f"damaged box header at byte {position}"
+        if position + size > file_size:
+            return f"truncated, the '{box_type.decode('latin-1')}' box needs {position + size} bytes but the file has {file_size}"
+        boxes.add(box_type)
+        position += size
+    if b"moov" not in boxes:
+        return "no 'moov' box, the file is incomplete"
+    return None
+
+# MPEG audio bit rates in kbit/s by (MPEG-1, layer) and bit rate index 1-14, index 0 (free format) and 15 are not accepted
+MPEG_AUDIO_BITRATES = {
+    (True, 1): (32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sampling rates by version bits (0 MPEG-2.5, 2 MPEG-2, 3 MPEG-1) and sampling rate index 0-2
+MPEG_AUDIO_SAMPLING_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+# Number of ADTS sampling frequency indexes in use, 13-15 are reserved
+ADTS_SAMPLING_INDEXES = 13
+
+def mpeg_audio_frame(data, position=0):
+    """
+    Function to read the MPEG audio or ADTS frame header at position.
 
-    # Check if the file extension is in the list of video extensions
-    if file_extension in video_extensions:
-        print(f"The file '{file_path}' is a video file.")
+    Returns (container, frame length in bytes, header fields that stay the same
+    from frame to frame), or None when the bytes are not a valid header.
+    """
+    if len(data) < position + 4 or data[position] != 0xFF or data[position + 1] & 0xE0 != 0xE0:
+        return None
+    second, third = data[position + 1], data[position + 2]
+    if second & 0xF6 == 0xF0:
+        # ADTS: 12 sync bits, layer 00, 13 bit frame length including the 7 or 9 byte header
+        if len(data) < position + 6 or (third >> 2 & 0x0F) >= ADTS_SAMPLING_INDEXES:
+            return None
+        frame_length = (data[position + 3] & 0x03) << 11 | data[position + 4] << 3 | data[position + 5] >> 5
+        if frame_length < (7 if second & 0x01 else 9):
+            return None
+        return "aac", frame_length, (second, third & 0xFC)
+    version, layer = second >> 3 & 0x03, 4 - (second >> 1 & 0x03)
+    bitrate_index, sampling_index = third >> 4, third >> 2 & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sampling_index == 3:
+        return None  # Reserved version or layer, free format or bad bit rate, reserved sampling rate
+    mpeg1 = version == 3
+    bit_rate = MPEG_AUDIO_BITRATES[(mpeg1, layer)][bitrate_index - 1] * 1000
+    sampling_rate = MPEG_AUDIO_SAMPLING_RATES[version][sampling_index]
+    padding = third >> 1 & 0x01
+    if layer == 1:
+        frame_length = (12 * bit_rate // sampling_rate + padding) * 4
+    else:
+        frame_length = (144 if mpeg1 or layer == 2 else 72) * bit_rate // sampling_rate + padding
+    return "mp3", frame_length, (second & 0xFE, sampling_index)
+
+def mpeg_audio_sync(data, position=0):
+    """
+    Function to recognize MPEG audio (MP1/2/3) or ADTS AAC from frame headers, returns "mp3", "aac" or None.
+
+    The header at position must be valid and be followed by a second header
+    of the same stream, unless data ends before it. Text that only starts
+    with 0xFF 0xFx, e.g. a UTF-16 byte order mark, is not taken for audio.
+    """
+    frame = mpeg_audio_frame(data, position)
+    if frame is None:
+        return None
+    container, frame_length, fields = frame
+    if len(data) >= position + frame_length + 4:
+        following = mpeg_audio_frame(data, position + frame_length)
+        if following is None or following[0] != container or following[2] != fields:
+            return None
+    return container
+
+def sniff_container(file_path):
+    """
+    Function to recognize the container of a file from its first bytes, without running any tool.
+
+    Returns (container, problem): container is a key of CONTAINERS or None when the
+    file is not a known media container, problem is None for a usable file or
+    the reason it is rejected (unreadable, not media, truncated). Remote inputs
+    (URLs) are sniffed with ranged reads, see remoteInput.
+    """
+    try:
+        with open_input(file_path) as media_file:
+            file_size = media_file.seek(0, os.SEEK_END)
+            media_file.seek(0)
+            header = media_file.read(SNIFF_BYTES)
+
+            if len(header) < 12:
+                return None, "empty or too small to be a media file"
+            if header.startswith(EBML_MAGIC):
+                return check_matroska(header, file_size)
+            if header[4:8] == b"ftyp":
+                container = "m4a" if header[8:12] in AUDIO_BRANDS else "mp4"
+                return container, check_iso_bmff(media_file, file_size)
+            if header[4:8] in QUICKTIME_BOXES:
+                return "mp4", check_iso_bmff(media_file, file_size)
+            if header.startswith(b"RIFF") and header[8:12] in (b"AVI ", b"WAVE"):
+                container = "avi" if header[8:12] == b"AVI " else "wav"
+                riff_size = struct.unpack("<I", header[4:8])[0]
+                if 0 < riff_size < 0xFFFFFFFF and riff_size + 8 > file_size:
+                    return container, f"truncated, the RIFF chunk needs {riff_size + 8} bytes but the file has {file_size}"
+                return container, None
+            if header.startswith(b"FLV\x01"):
+                return "flv", None
+            if header.startswith(ASF_HEADER_GUID):
+                header_object_size = struct.unpack("<Q", header[16:24])[0]
+                if header_object_size > file_size:
+                    return "asf", "truncated ASF header"
+                return "asf", None
+            if header.startswith(b"\x00\x00\x01\xba"):
+                return "mpegps", None
+            # Transport stream packets start with 0x47 every 188 bytes (192 with the M2TS timecode prefix)
+            for offset, packet_size in ((0, 188), (4, 192)):
+                if len(header) >= offset + 2 * packet_size + 1 and all(
+                        header[offset + index * packet_size] == 0x47 for index in range(3)):
+                    return "mpegts", None
+            if header.startswith(b"OggS"):
+                return "ogg", None
+            if header.startswith(b"fLaC"):
+                return "flac", None
+            if header.startswith(b"ID3"):
+                # An ID3v2 tag (possibly with cover art) comes before the first MPEG audio frame
+                tag_size = 0
+                for byte in header[6:10]:
+                    tag_size = tag_size << 7 | (byte & 0x7F)
+                tag_end = 10 + tag_size + (10 if header[5] & 0x10 else 0)
+                if tag_end >= file_size:
+                    return "mp3", "truncated, no audio after the ID3 tag"
+                media_file.seek(tag_end)
+                return mpeg_audio_sync(media_file.read(SNIFF_BYTES)) or "mp3", None
+            container = mpeg_audio_sync(header)
+            if container:
+                return container, None
+    except OSError as e:
+        return None, f"cannot be read: {e.strerror}"
+    return None, "not a known audio or video container"
+
+def is_media_file(file_path):
+    # Silent check used by directory scans: media extension and a usable container signature
+    return has_media_extension(file_path) and sniff_container(file_path)[1] is None
+
+def is_video_file(file_path):
+    """
+    Function to check that a file is a video (or audio) file worth probing, from its signature.
+
+    The extension is not trusted: mislabeled, truncated and non-media files are
+    rejected before MediaInfo or FFmpeg is started, audio containers are admitted.
+    """
+    container, problem = sniff_container(file_path)
+    if problem is None:
+        description, kind = CONTAINERS[container]
+        print(f"The file '{file_path}' is a valid {kind} file ({description}).")
         return True
+    elif container:
+        print(f"The file '{file_path}' looks like {CONTAINERS[container][0]} but it is {problem}.")
+        return False
     else:
-        print(f"The file '{file_path}' is not a video file.")
+        print(f"The file '{file_path}' is not a video file: {problem}.")
         return False
 
 def main():
     if len(sys.argv) != 2:
         print("Usage: python verifyFileExtension.py <file_path>")
         sys.exit(1)
-    
+
     file_path = sys.argv[1]
-    
-    # Verify if the provided file is a video file
-    is_video_file(file_path)
+
+    # Verify if the provided file is a video file, the exit code tells scripts the result
+    if not is_video_file(file_path):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
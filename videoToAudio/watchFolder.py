@@ -0,0 +1,272 @@
+"""
+Watch-folder mode: convert video files as soon as they have finished arriving in a directory.
+
+Changes are picked up with inotify on Linux and by rescanning the directory
+everywhere else. A file is only queued once its size and modification time have
+stayed the same for settle_seconds, so files still being copied are left alone.
+Conversions run on a process pool that lives as long as the watcher, so tool
+discovery and the probe cache stay warm between files. Outputs written inside
+the watched tree (e.g. watching "." with the default output directory) are
+recognized and never converted again.
+"""
+import os
+import sys
+import time
+import ctypes
+import select
+import signal
+import struct
+import ctypes.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+if __package__ in (None, ""):
+    # Run as "python videoToAudio/watchFolder.py": the package is imported from the folder above this file
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from videoToAudio import batchProcess, instrumentation, pipeline
+from videoToAudio.verifyFileExtension import has_media_extension, sniff_container
+
+DEFAULT_SETTLE_SECONDS = 5.0
+DEFAULT_POLL_INTERVAL = 2.0
+# Seconds between sweeps that forget files which are gone, so a long-running watcher does not keep growing
+PRUNE_INTERVAL = 600.0
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+INOTIFY_EVENT = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """
+    Linux inotify watch of a directory tree, through libc with ctypes.
+    """
+
+    def __init__(self, directory):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1 failed: {os.strerror(error)}")
+        self.watches = {}  # Watch descriptor -> watched directory
+        self.add_tree(directory)
+
+    def add_tree(self, directory):
+        # Watch a directory and all of its sub-directories, returns the files already in them
+        existing = []
+        for root, dirs, files in os.walk(directory):
+            watch = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if watch >= 0:
+                self.watches[watch] = root
+            existing += [os.path.join(root, name) for name in files]
+        return existing
+
+    def wait(self, timeout):
+        """
+        Function to wait up to timeout seconds for changes.
+
+        Returns the set of paths that changed, or None when events were lost and everything must be rescanned.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                watch, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b"\0")
+                offset += INOTIFY_EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if watch not in self.watches or not name:
+                    continue
+                path = os.path.join(self.watches[watch], os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # Files may have landed in the new directory before its watch existed
+                        changed.update(self.add_tree(path))
+                else:
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """
+    Fallback watcher for systems without inotify: every wait ends with a full rescan.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        return None
+
+    def close(self):
+        pass
+
+def make_watcher(directory, use_inotify=True):
+    # inotify when available, polling otherwise
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"inotify is not available ({e}), falling back to polling.")
+    return PollingWatcher(directory)
+
+def file_identity(file_path):
+    # (size, mtime_ns) of a file, None once it is gone
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def is_inside(path, folder):
+    # True when path is folder itself or anything below it, both absolute
+    return path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)
+
+def is_output_path(file_path, directory, output_root):
+    """
+    Function to tell whether a file under the watched directory is an output of the conversions.
+
+    Everything under output_root is an output when it is a sub-directory of the
+    watched one. When outputs go into the watched tree itself, a file is an
+    output when one of its folders is the output folder of an input next to it
+    (see batchProcess.output_directory_for: "a.mkv" -> "a_mkv"), which also
+    covers outputs of earlier runs.
+    """
+    path = os.path.realpath(file_path)
+    if output_root != directory:
+        return is_inside(output_root, directory) and is_inside(path, output_root)
+    folder = os.path.dirname(path)
+    while folder != directory and is_inside(folder, directory):
+        stem, _, extension = os.path.basename(folder).rpartition("_")
+        if stem and os.path.isfile(os.path.join(os.path.dirname(folder), f"{stem}.{extension}")):
+            return True
+        folder = os.path.dirname(folder)
+    return False
+
+def stop_on_sigterm(signum, frame):
+    # Let a service manager stop the watcher the same way as Ctrl+C
+    raise KeyboardInterrupt
+
+def init_watch_worker(semaphore):
+    # Ctrl+C reaches the whole process group, workers leave stopping to the watcher and finish their file
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    batchProcess.init_worker(semaphore)
+
+def watch_directory(directory, workers=batchProcess.DEFAULT_WORKERS, max_encodes=batchProcess.DEFAULT_MAX_ENCODES,
+                    output_root=".", options=None, settle_seconds=DEFAULT_SETTLE_SECONDS,
+                    poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True, metrics_jsonl=None):
+    """
+    Function to convert every video file that appears (or changes) under a directory until interrupted.
+
+    Files already present are converted first. Outputs are placed like in batch
+    mode, one folder per video under output_root, and are never queued themselves.
+    """
+    options = options or pipeline.ConvertOptions()
+    directory = os.path.realpath(directory)
+    output_root = os.path.realpath(output_root)
+    signal.signal(signal.SIGTERM, stop_on_sigterm)
+
+    watcher = make_watcher(directory, use_inotify)
+    pending = {}  # File -> (identity, monotonic time it was last seen changing), identity None until first checked
+    converted = {}  # File -> identity of the version queued or converted, so unchanged files are not redone
+    written = set()  # Files written by the conversions of this run, never queued
+    last_prune = time.monotonic()
+
+    def is_input(file_path):
+        return (has_media_extension(file_path) and os.path.realpath(file_path) not in written
+                and not is_output_path(file_path, directory, output_root))
+
+    def report(future):
+        result = future.result()
+        for output_file in result.audio_files + result.subtitle_files + result.lrc_files + [result.cover_image]:
+            if output_file:
+                written.add(os.path.realpath(output_file))
+        if result.success:
+            print(f"[OK] {result.input_path}: done in {result.elapsed:.1f}s")
+        else:
+            print(f"[FAILED] {result.input_path}: {result.error}")
+        if metrics_jsonl:
+            instrumentation.write_jsonl([result], metrics_jsonl)
+
+    # Signatures are checked once a file has settled, a file still being copied looks truncated
+    for file_path in batchProcess.find_video_files(directory, sniff=False):
+        if is_input(file_path):
+            pending[file_path] = None
+    print(f"Watching '{directory}' with {type(watcher).__name__}, {len(pending)} existing file(s) queued. Press Ctrl+C to stop.")
+
+    semaphore = multiprocessing.BoundedSemaphore(max(1, max_encodes))
+    executor = ProcessPoolExecutor(max_workers=max(1, workers), initializer=init_watch_worker, initargs=(semaphore,))
+    try:
+        while True:
+            changed = watcher.wait(poll_interval if pending or isinstance(watcher, PollingWatcher) else None)
+            if changed is None:
+                changed = batchProcess.find_video_files(directory, sniff=False)
+            for file_path in changed:
+                if file_path not in pending and is_input(file_path):
+                    pending[file_path] = None
+
+            now = time.monotonic()
+            if now - last_prune > PRUNE_INTERVAL:
+                # Forget files that were deleted or moved away since they were converted
+                for file_path in list(converted):
+                    if file_identity(file_path) is None:
+                        del converted[file_path]
+                written.difference_update([file_path for file_path in list(written) if not os.path.exists(file_path)])
+                last_prune = now
+            for file_path, seen in list(pending.items()):
+                identity = file_identity(file_path)
+                if identity is None:
+                    del pending[file_path]  # Deleted or moved away before it settled
+                    continue
+                if seen is None and converted.get(file_path) == identity:
+                    del pending[file_path]  # Rescan of a file that was already converted
+                    continue
+                if seen is None or seen[0] != identity:
+                    pending[file_path] = (identity, now)  # Still being written, wait for it to settle
+                    continue
+                if now - seen[1] < settle_seconds:
+                    continue
+
+                del pending[file_path]
+                converted[file_path] = identity  # Rejected files are retried only once they change again
+                container, problem = sniff_container(file_path)
+                if problem:
+                    print(f"Skipping {file_path}: {problem}")
+                    continue
+                print(f"Queued {file_path}")
+                output_dir = batchProcess.output_directory_for(file_path, directory, output_root)
+                executor.submit(batchProcess.process_file, file_path, output_dir, options).add_done_callback(report)
+    except KeyboardInterrupt:
+        print("\nStopping the watcher, waiting for running conversions...")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        watcher.close()
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python -m videoToAudio.watchFolder <directory>")
+        sys.exit(1)
+
+    watch_directory(sys.argv[1])
+
+if __name__ == "__main__":
+    main()